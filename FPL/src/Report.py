@@ -1,11 +1,11 @@
 # %%
 import time
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 
 import dash_bootstrap_components as dbc
 import dash_daq as daq
-import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -13,13 +13,14 @@ from dash import Dash, Input, Output, callback_context, dash_table, dcc, html
 from tqdm import tqdm
 
 from FPL.src import (
+    PicksMatrix,
     basic_player_df,
     get_league_data,
     get_player_id_dict,
     get_player_info,
     get_team_id_dict,
     get_user_leagues_id,
-    get_users,
+    get_picks_matrix,
     get_users_id,
 )
 from FPL.utils import (
@@ -28,8 +29,10 @@ from FPL.utils import (
     clear_dir_cache,
     dir_cache,
     fetch_request,
+    get_cache_stats,
     get_current_gw,
 )
+from FPL.utils.scheduler import HIGH, NORMAL
 from tools.get_lan_ip import get_lan_ip
 
 
@@ -55,12 +58,14 @@ class FPLReport:
         self.user_league_ownership_tbls: Dict = {}
         self.user_league_standing_tbls: Dict = {}
         self.user_league_ownership_graphs: Dict = {}
+        self.user_league_eo_tbls: Dict = {}
 
         self.teams_id_dict = None
 
         # weekly summary attributes
         self.overall_top_n_tbl: Dict = {}
         self.overall_top_n_bar: Dict = {}
+        self.overall_top_n_eo_tbl: pd.DataFrame = None
         self.n: int = None
 
         # player analysis attributes
@@ -69,11 +74,18 @@ class FPLReport:
         self.player_analysis_features: List[str] = None
         self.player_analysis_list: List[str] = None
 
-    def _get_league_player_ownership(
-        self, league_id: int, n: int, refresh: int = 60, max_attempts: int = 1_000
-    ) -> pd.DataFrame:
+    def _get_league_picks(
+        self,
+        league_id: int,
+        n: int,
+        refresh: int = 60,
+        max_attempts: int = 10,
+        priority: Optional[int] = None,
+        max_stale: Optional[float] = None,
+    ) -> PicksMatrix:
         """
-        Method that retrieves the ownership of players for managers belonging to a given league id
+        Method that retrieves the picks of managers belonging to a given league id, from which the ownership
+        and effective ownership tables are built
 
         Parameters
         ----------
@@ -83,35 +95,30 @@ class FPLReport:
 
         `refresh (int)`: time (minutes) to check since last save, default=60
 
-        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `priority (int)`: priority of requests in the shared client queue, if None then set from the endpoint, default=None
+
+        `max_stale (float)`: time (minutes) after `refresh` that previous league ids are used while they are
+        fetched again in the background, if None then waits for the fetch, default=None
 
         Return
         ------
-        `pd.DataFrame`: dataframe of player ownership within that specific league
+        `PicksMatrix`: picks of the top `n` managers of the league in the report's gameweek
 
         """
 
-        user_id = get_users_id(league_id=league_id, top_n=n, max_attempts=1_000)
-        users = get_users(user_id, self.gw, max_attempts=1_000)
-
-        user_players = []
-        for user in users:
-            user_players.append([player["element"] for player in user["picks"]])
-
-        user_players = np.array(user_players).ravel()
-        unique, count = np.unique(user_players, return_counts=True)
-        league_player_tbl = (
-            pd.DataFrame(
-                {
-                    "player": unique,
-                    "count": count,
-                    "ownership (%)": 100 * count / len(users),
-                }
-            )
-            .replace({"player": get_player_id_dict()})
-            .sort_values("count", ascending=False)
+        user_id = get_users_id(
+            league_id=league_id,
+            top_n=n,
+            refresh=refresh,
+            max_attempts=max_attempts,
+            priority=priority,
+            max_stale=max_stale,
+        )
+        return get_picks_matrix(
+            user_id, self.gw, max_attempts=max_attempts, priority=priority
         )
-        return league_player_tbl
 
     def generate_summary(self, refresh: int = 60):
         """
@@ -196,7 +203,11 @@ class FPLReport:
         self.pos_list = list(POS_DICT.values())
 
     def generate_top_managers(
-        self, n: int = 1000, refresh: int = 60, max_attempts: int = 1_000
+        self,
+        n: int = 1000,
+        refresh: int = 60,
+        max_attempts: int = 10,
+        max_stale: Optional[float] = None,
     ):
         """
 
@@ -206,7 +217,10 @@ class FPLReport:
 
         `refresh (int)`: time (minutes) to check since last save, default=60
 
-        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `max_stale (float)`: time (minutes) after `refresh` that the previous top managers are used while they
+        are fetched again in the background, if None then waits for the fetch, default=None
 
         Return
         ------
@@ -217,9 +231,12 @@ class FPLReport:
             refresh = 600
 
         self._top_players_flag = True
-        self.overall_top_n_tbl = self._get_league_player_ownership(
-            314, n, refresh=refresh, max_attempts=1_000
+        picks = self._get_league_picks(
+            314, n, refresh=refresh, max_attempts=max_attempts, max_stale=max_stale
         )
+        names = get_player_id_dict()
+        self.overall_top_n_tbl = picks.to_frame(names)
+        self.overall_top_n_eo_tbl = picks.effective_ownership_frame(names)
         self.overall_top_n_bar = px.bar(
             self.overall_top_n_tbl.head(30),
             # self.overall_top_n_tbl.query("count > 50"),
@@ -235,7 +252,7 @@ class FPLReport:
         gw: int = None,
         window: int = 5,
         refresh: int = 30,
-        max_attempts: int = 1_000,
+        max_attempts: int = 10,
     ):
         """
         Method to generate analysis information of premier league players
@@ -250,7 +267,7 @@ class FPLReport:
 
         `refresh (int)`: time (minutes) to check since last save, default=30
 
-        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
 
         Return
         ------
@@ -354,7 +371,7 @@ class FPLReport:
         self,
         id: Optional[List[int]] = None,
         refresh: int = 120,
-        max_attempts: int = 1_000,
+        max_attempts: int = 10,
     ):
         """
         Method to generate information on leagues
@@ -365,7 +382,7 @@ class FPLReport:
 
         `refresh (int)`: time (minutes) to check since last save. Setting to 0 will force a cache miss, default=120
 
-        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
 
         Return
         ------
@@ -377,12 +394,15 @@ class FPLReport:
             refresh = 120
 
         league_ids: List[int] = get_user_leagues_id(id, refresh=refresh)
+        # the user's own leagues go ahead of bulk requests from other sections
         league_data: List[dict] = get_league_data(
-            league_ids, refresh=refresh, max_attempts=max_attempts
+            league_ids, refresh=refresh, max_attempts=max_attempts, priority=HIGH
         )
         self.user_league_standing_tbls = {}
         self.user_league_ownership_tbls = {}
         self.user_league_ownership_graphs = {}
+        self.user_league_eo_tbls = {}
+        names = get_player_id_dict()
 
         for data in league_data:
             # check that league key exists and that there is an actual table for league
@@ -407,9 +427,10 @@ class FPLReport:
                         "event_total": "round total",
                     }
                 )
-                tbl = self._get_league_player_ownership(
-                    league_id, 300, max_attempts=1_000
+                picks = self._get_league_picks(
+                    league_id, 300, max_attempts=max_attempts, priority=NORMAL
                 )
+                tbl = picks.to_frame(names)
                 self.user_league_ownership_graphs[league_name] = px.bar(
                     tbl.head(50),
                     x="player",
@@ -417,6 +438,9 @@ class FPLReport:
                     title=f"{league_name} ownership",
                 )
                 self.user_league_ownership_tbls[league_name] = tbl
+                self.user_league_eo_tbls[league_name] = picks.effective_ownership_frame(
+                    names
+                )
 
             self._leagues_generated_flag = True
 
@@ -540,6 +564,32 @@ class FPLReport:
                 ),
             )
 
+        self.eo_tbls = {}
+        if self._top_players_flag:
+            self.eo_tbls[f"Top {self.n}"] = self.overall_top_n_eo_tbl
+        if self._leagues_generated_flag:
+            self.eo_tbls.update(self.user_league_eo_tbls)
+        if self.eo_tbls:
+            self.eo_options = list(self.eo_tbls.keys())
+            self.tab["effective_ownership"] = dcc.Tab(
+                label="Effective Ownership",
+                value="effective_ownership",
+                children=html.Div(
+                    [
+                        html.H2(f"Effective Ownership (GW {self.gw})"),
+                        dcc.Dropdown(
+                            options=self.eo_options,
+                            value=self.eo_options[0],
+                            id="eo_dropdown",
+                        ),
+                        html.Button("<- Prev", id="prev_btn_eo", n_clicks=0),
+                        html.Button("-> Next", id="next_btn_eo", n_clicks=0),
+                        dcc.Graph(id="eo_bar"),
+                        dash_table.DataTable(id="eo_tbl", page_size=10),
+                    ]
+                ),
+            )
+
         if self._player_analysis_flag:
             self.tab["player_analysis"] = dcc.Tab(
                 label="Player Analysis",
@@ -743,6 +793,35 @@ class FPLReport:
                     league_name,
                 ]
 
+        if self.eo_tbls:
+
+            @self.app.callback(
+                [
+                    Output("eo_bar", "figure"),
+                    Output("eo_tbl", "data"),
+                    Output("eo_dropdown", "value"),
+                ],
+                [
+                    Input("eo_dropdown", "value"),
+                    Input("prev_btn_eo", "n_clicks"),
+                    Input("next_btn_eo", "n_clicks"),
+                ],
+            )
+            def _effective_ownership_callback(eo_name, prev_btn_eo, next_btn_eo):
+                ctx = callback_context
+                eo_name = _dropdown(
+                    eo_name, self.eo_options, ctx, "prev_btn_eo", "next_btn_eo"
+                )
+                tbl = self.eo_tbls[eo_name].round(1)
+                eo_bar = px.bar(
+                    tbl.head(30),
+                    x="player",
+                    y=["effective ownership (%)", "ownership (%)"],
+                    barmode="group",
+                    title=f"{eo_name} effective ownership",
+                )
+                return [eo_bar, tbl.to_dict("records"), eo_name]
+
         if self._player_analysis_flag:
 
             @self.app.callback(
@@ -808,7 +887,13 @@ class FPLReport:
                 ]
 
     def full_report(
-        self, user_id: int, top_n: int = 1_000, refresh=None, max_attempts: int = 1_000
+        self,
+        user_id: int,
+        top_n: int = 1_000,
+        refresh=None,
+        max_attempts: int = 10,
+        parallel: bool = True,
+        cache_stats_path: Optional[str] = None,
     ) -> None:
         """
 
@@ -820,17 +905,71 @@ class FPLReport:
 
         `refresh (int)`: time (minutes) to check since last save, default=None
 
-        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `parallel (bool)`: run the player analysis alongside the other sections so their requests share
+        the client queue, where the user's leagues are served ahead of bulk element summaries and picks.
+        If False then sections run one after the other, default=True
+
+        `cache_stats_path (str)`: json file to write the cache statistics of each cached function to once the
+        report is built, also kept as the `cache_stats` attribute. Counts are since the process started or
+        the statistics were last reset, see `get_cache_stats`, default=None
 
         Return
         ------
         `None`
 
         """
-        self.generate_summary(refresh=refresh)
-        self.generate_player_analysis(refresh=refresh)
-        self.generate_top_managers(n=top_n, refresh=refresh)
-        self.generate_leagues(id=user_id, refresh=refresh)
+        self._build_sections(user_id, top_n, refresh, max_attempts, parallel)
+
+        stats = get_cache_stats()
+        self.cache_stats = stats.to_frame()
+        if cache_stats_path is not None:
+            stats.write(cache_stats_path)
+
+    def _build_sections(
+        self,
+        user_id: int,
+        top_n: int,
+        refresh: Optional[int],
+        max_attempts: int,
+        parallel: bool,
+    ) -> None:
+        """
+        Method generating every section of the report, see `full_report`
+        """
+        if not parallel:
+            self.generate_summary(refresh=refresh)
+            self.generate_player_analysis(refresh=refresh, max_attempts=max_attempts)
+            self.generate_top_managers(
+                n=top_n, refresh=refresh, max_attempts=max_attempts
+            )
+            self.generate_leagues(
+                id=user_id, refresh=refresh, max_attempts=max_attempts
+            )
+            return
+
+        # user facing sections run in the order they are shown, next to the bulk player analysis
+        def _user_sections():
+            self.generate_summary(refresh=refresh)
+            self.generate_leagues(
+                id=user_id, refresh=refresh, max_attempts=max_attempts
+            )
+            self.generate_top_managers(
+                n=top_n, refresh=refresh, max_attempts=max_attempts
+            )
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(_user_sections),
+                executor.submit(
+                    self.generate_player_analysis,
+                    refresh=refresh,
+                    max_attempts=max_attempts,
+                ),
+            ]
+            for future in futures:
+                future.result()
 
     def _prepare_run(self) -> None:
         """
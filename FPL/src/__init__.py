@@ -1,4 +1,14 @@
 from .players import basic_player_df, get_player_id_dict, get_player_info
 from .teams import get_team_id_dict
-from .users import get_league_data, get_user_leagues_id, get_users, get_users_id
-from .Report import FPLReport
\ No newline at end of file
+from .users import (
+    get_league_data,
+    get_picks_matrix,
+    get_user_leagues_id,
+    get_users,
+    get_users_history,
+    get_users_id,
+    iter_league_ids,
+    iter_users,
+)
+from .ownership import OwnershipAggregator, PicksMatrix
+from .Report import FPLReport
@@ -0,0 +1,591 @@
+"""
+Functions pertaining to player ownership among managers
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# counters kept per player
+OWNERSHIP_FIELDS = ("owned", "started", "captained", "vice", "benched")
+
+# squad positions 1 to 11 start, 12 to 15 are on the bench
+STARTING_POSITIONS = 11
+
+
+def _player_names(frame: pd.DataFrame, names: Optional[Dict[int, str]]) -> pd.DataFrame:
+    if names is not None:
+        frame["player"] = frame["player"].map(lambda id: names.get(id, id))
+    return frame
+
+
+def _counts_frame(
+    counts: np.ndarray, managers: int, names: Optional[Dict[int, str]] = None
+) -> pd.DataFrame:
+    """
+    Function to tabulate per player counters laid out as `OwnershipAggregator.counts`
+    """
+    (elements,) = np.nonzero(counts[0])
+    frame = pd.DataFrame(
+        {
+            "player": elements,
+            "count": counts[0, elements],
+            "ownership (%)": 100 * counts[0, elements] / max(managers, 1),
+            **{
+                field: counts[i, elements]
+                for i, field in enumerate(OWNERSHIP_FIELDS)
+                if field != "owned"
+            },
+        }
+    )
+    return _player_names(frame, names).sort_values(
+        "count", ascending=False, kind="stable"
+    )
+
+
+class OwnershipAggregator:
+    """
+    Streaming per-player counts of how many managers own, start, captain, vice-captain and bench each player.
+    Picks responses are reduced to counters as they are added, so memory stays flat however many managers
+    are aggregated. Squads carried forward by `get_users(incremental=True)` count towards ownership only.
+
+    Parameters
+    ----------
+    `n_elements (int)`: initial number of player ids to count, grown as larger ids are seen, default=1024
+
+    `buffer_size (int)`: number of picks buffered before they are added to the counters, default=100000
+
+    """
+
+    def __init__(self, n_elements: int = 1024, buffer_size: int = 100_000):
+        self.managers = 0
+        self.skipped = 0
+        self.carried = 0
+        self.buffer_size = buffer_size
+        self._counts = np.zeros((len(OWNERSHIP_FIELDS), n_elements), dtype=np.int64)
+        self._buffers: List[List[int]] = [[] for _ in OWNERSHIP_FIELDS]
+        self._buffered = 0
+
+    def add(self, user: Dict) -> None:
+        """
+        Method to count the picks of one manager
+
+        Parameters
+        ----------
+        `user (Dict)`: picks json of a manager, responses without picks (e.g. not found) are skipped and carried
+        forward squads only counted as owned
+
+        Return
+        ------
+        `None`
+
+        """
+        picks = user.get("picks") if isinstance(user, dict) else None
+        if not picks:
+            self.skipped += 1
+            return
+
+        self.managers += 1
+        self._buffered += len(picks)
+        if "carried_forward_from" in user:
+            # only the squad is known
+            self.carried += 1
+            self._buffers[0].extend(pick["element"] for pick in picks)
+        else:
+            self._add_lineup(picks)
+        if self._buffered >= self.buffer_size:
+            self._flush()
+
+    def _add_lineup(self, picks: List[Dict]) -> None:
+        owned, started, captained, vice, benched = self._buffers
+        for pick in picks:
+            element = pick["element"]
+            owned.append(element)
+            if pick["position"] <= STARTING_POSITIONS:
+                started.append(element)
+            else:
+                benched.append(element)
+            if pick.get("is_captain"):
+                captained.append(element)
+            if pick.get("is_vice_captain"):
+                vice.append(element)
+
+    def update(self, users: Iterable[Dict]) -> "OwnershipAggregator":
+        """
+        Method to count the picks of many managers, e.g. as they are streamed by `iter_users`
+
+        Parameters
+        ----------
+        `users (Iterable[Dict])`: picks json of each manager
+
+        Return
+        ------
+        `OwnershipAggregator`: self
+
+        """
+        for user in users:
+            self.add(user)
+        return self
+
+    def _flush(self) -> None:
+        largest = max((max(buffer) for buffer in self._buffers if buffer), default=-1)
+        if largest >= self._counts.shape[1]:
+            counts = np.zeros((len(OWNERSHIP_FIELDS), 2 * largest + 1), dtype=np.int64)
+            counts[:, : self._counts.shape[1]] = self._counts
+            self._counts = counts
+        size = self._counts.shape[1]
+        for i, buffer in enumerate(self._buffers):
+            if buffer:
+                self._counts[i] += np.bincount(buffer, minlength=size)
+                buffer.clear()
+        self._buffered = 0
+
+    @property
+    def counts(self) -> np.ndarray:
+        """`np.ndarray`: counters with one row per field of `OWNERSHIP_FIELDS`, indexed by player id"""
+        self._flush()
+        return self._counts
+
+    def to_frame(self, names: Optional[Dict[int, str]] = None) -> pd.DataFrame:
+        """
+        Method to tabulate the counts of every player owned at least once
+
+        Parameters
+        ----------
+        `names (Dict[int, str])`: player names keyed by id, if None then players are left as ids, default=None
+
+        Return
+        ------
+        `pd.DataFrame`: one row per player, most owned first, with "player", "count" (managers owning the
+        player), "ownership (%)" and a column per remaining field of `OWNERSHIP_FIELDS`
+
+        """
+        return _counts_frame(self.counts, self.managers, names)
+
+
+class PicksMatrix:
+    """
+    Sparse managers × players matrix of the picks of one gameweek. Rows follow `manager_ids` and columns are
+    player ids, each stored pick holds the player's squad position (1 to 15) with its multiplier alongside,
+    so ownership, effective ownership and overlaps between managers are matrix operations. Squads carried
+    forward by `get_users(incremental=True)` have position and multiplier 0, they count towards ownership
+    and overlaps but are left out of starts, captaincy and effective ownership.
+
+    Parameters
+    ----------
+    `positions (sparse.csr_matrix)`: squad position of each pick, managers × player ids
+
+    `multipliers (np.ndarray)`: multiplier of each pick, aligned with `positions.data`
+
+    `manager_ids (np.ndarray)`: id of the manager of each row
+
+    `captains (np.ndarray)`: player id captained by each manager, 0 if the manager has no picks
+
+    `vice_captains (np.ndarray)`: player id vice-captained by each manager, 0 if the manager has no picks
+
+    `chips (np.ndarray)`: chip active for each manager, "" if none
+
+    `gameweek (int)`: gameweek of the picks, default=None
+
+    `carried (np.ndarray)`: whether each row is a carried forward squad, if None then none are, default=None
+
+    """
+
+    def __init__(
+        self,
+        positions: sparse.csr_matrix,
+        multipliers: np.ndarray,
+        manager_ids: np.ndarray,
+        captains: np.ndarray,
+        vice_captains: np.ndarray,
+        chips: np.ndarray,
+        gameweek: Optional[int] = None,
+        carried: Optional[np.ndarray] = None,
+    ):
+        self.positions = positions
+        self.multipliers = multipliers
+        self.manager_ids = manager_ids
+        self.captains = captains
+        self.vice_captains = vice_captains
+        self.chips = chips
+        self.gameweek = gameweek
+        if carried is None:
+            carried = np.zeros(len(manager_ids), dtype=bool)
+        self.carried = carried
+
+    def __repr__(self) -> str:
+        return (
+            f"PicksMatrix(managers={self.n_managers}, players={self.positions.shape[1]}, "
+            f"picks={self.positions.nnz}, gameweek={self.gameweek})"
+        )
+
+    @classmethod
+    def from_users(
+        cls,
+        ids: Iterable[int],
+        users: Iterable[Dict],
+        gameweek: Optional[int] = None,
+        n_elements: Optional[int] = None,
+    ) -> "PicksMatrix":
+        """
+        Method to build the matrix from picks responses
+
+        Parameters
+        ----------
+        `ids (Iterable[int])`: id of each manager
+
+        `users (Iterable[Dict])`: picks json of each manager in the order of `ids`, e.g. from `get_users`.
+        Responses without picks leave an empty row, carried forward squads a row without lineup
+
+        `gameweek (int)`: gameweek of the picks, default=None
+
+        `n_elements (int)`: number of columns, if None then the largest player id picked plus one, default=None
+
+        Return
+        ------
+        `PicksMatrix`
+
+        """
+        manager_ids, indptr, columns, positions, multipliers = [], [0], [], [], []
+        captains, vice_captains, chips, carried = [], [], [], []
+        for id, user in zip(ids, users):
+            picks = (user.get("picks") if isinstance(user, dict) else None) or []
+            squad_only = bool(picks) and "carried_forward_from" in user
+            captain = vice = 0
+            for pick in picks:
+                columns.append(pick["element"])
+                positions.append(0 if squad_only else pick["position"])
+                multipliers.append(0 if squad_only else pick["multiplier"])
+                if pick.get("is_captain"):
+                    captain = pick["element"]
+                if pick.get("is_vice_captain"):
+                    vice = pick["element"]
+            manager_ids.append(id)
+            indptr.append(len(columns))
+            captains.append(captain)
+            vice_captains.append(vice)
+            chips.append((user.get("active_chip") if picks else None) or "")
+            carried.append(squad_only)
+
+        if n_elements is None:
+            n_elements = max(columns, default=0) + 1
+        matrix = sparse.csr_matrix(
+            (
+                np.array(positions, dtype=np.int8),
+                np.array(columns, dtype=np.int32),
+                np.array(indptr, dtype=np.int64),
+            ),
+            shape=(len(manager_ids), n_elements),
+        )
+        return cls(
+            matrix,
+            np.array(multipliers, dtype=np.int8),
+            np.array(manager_ids, dtype=np.int64),
+            np.array(captains, dtype=np.int32),
+            np.array(vice_captains, dtype=np.int32),
+            np.array(chips, dtype=str),
+            gameweek,
+            np.array(carried, dtype=bool),
+        )
+
+    @property
+    def n_managers(self) -> int:
+        """`int`: number of managers with picks"""
+        return int(np.count_nonzero(np.diff(self.positions.indptr)))
+
+    @property
+    def n_lineups(self) -> int:
+        """`int`: number of managers with picks that were fetched rather than carried forward"""
+        return self.n_managers - int(np.count_nonzero(self.carried))
+
+    def _with_data(self, data: np.ndarray) -> sparse.csr_matrix:
+        matrix = sparse.csr_matrix(
+            (data, self.positions.indices, self.positions.indptr),
+            shape=self.positions.shape,
+            # eliminate_zeros works in place on the shared index arrays
+            copy=True,
+        )
+        matrix.eliminate_zeros()
+        return matrix
+
+    @property
+    def owned(self) -> sparse.csr_matrix:
+        """`sparse.csr_matrix`: 1 for every player in a manager's squad"""
+        return self._with_data(np.ones_like(self.positions.data))
+
+    @property
+    def started(self) -> sparse.csr_matrix:
+        """`sparse.csr_matrix`: 1 for every player in a manager's starting eleven"""
+        data = self.positions.data
+        return self._with_data(
+            ((data > 0) & (data <= STARTING_POSITIONS)).astype(np.int8)
+        )
+
+    @property
+    def benched(self) -> sparse.csr_matrix:
+        """`sparse.csr_matrix`: 1 for every player on a manager's bench"""
+        return self._with_data(
+            (self.positions.data > STARTING_POSITIONS).astype(np.int8)
+        )
+
+    @property
+    def multiplier_matrix(self) -> sparse.csr_matrix:
+        """`sparse.csr_matrix`: multiplier of every player scoring for a manager, benched players dropped"""
+        return self._with_data(self.multipliers)
+
+    def _per_manager(
+        self, matrix: sparse.csr_matrix, managers: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        Method to get the percentage of `managers`, by default those with picks, summed per player
+        """
+        totals = np.asarray(matrix.sum(axis=0)).ravel()
+        return 100 * totals / max(self.n_managers if managers is None else managers, 1)
+
+    def ownership(self) -> np.ndarray:
+        """
+        Method to get the percentage of managers owning each player
+
+        Return
+        ------
+        `np.ndarray`: ownership (%) indexed by player id
+
+        """
+        return self._per_manager(self.owned)
+
+    def effective_ownership(self) -> np.ndarray:
+        """
+        Method to get the effective ownership of each player, the summed multipliers as a percentage of
+        managers, so captains count twice (three times with triple captain) and benched players not at all.
+        Carried forward squads are left out
+
+        Return
+        ------
+        `np.ndarray`: effective ownership (%) indexed by player id
+
+        """
+        return self._per_manager(self.multiplier_matrix, self.n_lineups)
+
+    def _count_elements(self, elements: np.ndarray) -> np.ndarray:
+        return np.bincount(elements[elements > 0], minlength=self.positions.shape[1])
+
+    @property
+    def counts(self) -> np.ndarray:
+        """`np.ndarray`: counters laid out as `OwnershipAggregator.counts`, one row per field of `OWNERSHIP_FIELDS`"""
+        return np.vstack(
+            [
+                np.asarray(self.owned.sum(axis=0)).ravel(),
+                np.asarray(self.started.sum(axis=0)).ravel(),
+                self._count_elements(self.captains),
+                self._count_elements(self.vice_captains),
+                np.asarray(self.benched.sum(axis=0)).ravel(),
+            ]
+        )
+
+    def to_frame(self, names: Optional[Dict[int, str]] = None) -> pd.DataFrame:
+        """
+        Method to tabulate the ownership counts of every player owned at least once, as `OwnershipAggregator.to_frame`
+
+        Parameters
+        ----------
+        `names (Dict[int, str])`: player names keyed by id, if None then players are left as ids, default=None
+
+        Return
+        ------
+        `pd.DataFrame`: one row per player, most owned first
+
+        """
+        return _counts_frame(self.counts, self.n_managers, names)
+
+    def effective_ownership_frame(
+        self, names: Optional[Dict[int, str]] = None
+    ) -> pd.DataFrame:
+        """
+        Method to tabulate the effective ownership and captaincy of every player owned at least once.
+        Multipliers already account for benched players, the captain and the bench boost and triple captain
+        chips. Ownership is of every manager with picks, the other columns only of those whose picks were
+        fetched rather than carried forward
+
+        Parameters
+        ----------
+        `names (Dict[int, str])`: player names keyed by id, if None then players are left as ids, default=None
+
+        Return
+        ------
+        `pd.DataFrame`: one row per player, highest effective ownership first, with "player", "ownership (%)",
+        "captained (%)", "triple captained (%)", "benched (%)" and "effective ownership (%)"
+
+        """
+        managers = max(self.n_managers, 1)
+        lineups = max(self.n_lineups, 1)
+        counts = self.counts
+        triple = self._count_elements(self.captains[self.chips == "3xc"])
+        eo = self.effective_ownership()
+        (elements,) = np.nonzero(counts[0])
+        frame = pd.DataFrame(
+            {
+                "player": elements,
+                "ownership (%)": 100 * counts[0, elements] / managers,
+                "captained (%)": 100 * counts[2, elements] / lineups,
+                "triple captained (%)": 100 * triple[elements] / lineups,
+                "benched (%)": 100 * counts[4, elements] / lineups,
+                "effective ownership (%)": eo[elements],
+            }
+        )
+        return _player_names(frame, names).sort_values(
+            "effective ownership (%)", ascending=False, kind="stable"
+        )
+
+    def template(self, size: int = 15) -> np.ndarray:
+        """
+        Method to get the most owned players
+
+        Parameters
+        ----------
+        `size (int)`: number of players, default=15
+
+        Return
+        ------
+        `np.ndarray`: player ids, most owned first
+
+        """
+        counts = np.asarray(self.owned.sum(axis=0)).ravel()
+        return np.argsort(-counts, kind="stable")[:size]
+
+    def template_overlap(self, template: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        Method to count the players each manager shares with a template squad
+
+        Parameters
+        ----------
+        `template (Iterable[int])`: player ids of the template, if None then uses `template()`, default=None
+
+        Return
+        ------
+        `np.ndarray`: number of template players owned by each manager, in row order
+
+        Notes
+        -----
+        Player ids outside the matrix columns are not owned by any manager, so they are ignored.
+
+        """
+        n_elements = self.positions.shape[1]
+        template = (
+            self.template()
+            if template is None
+            else np.asarray(list(template), dtype=np.int64)
+        )
+        indicator = np.zeros(n_elements, dtype=np.int64)
+        indicator[template[(template >= 0) & (template < n_elements)]] = 1
+        return self.owned @ indicator
+
+    def differentials(self, manager_id: int, max_ownership: float = 10) -> np.ndarray:
+        """
+        Method to get the players a manager owns that few others do
+
+        Parameters
+        ----------
+        `manager_id (int)`: id of manager
+
+        `max_ownership (float)`: highest ownership (%) of a differential, default=10
+
+        Return
+        ------
+        `np.ndarray`: player ids, least owned first, raises KeyError if `manager_id` is not in the matrix
+
+        """
+        rows = np.flatnonzero(self.manager_ids == manager_id)
+        if len(rows) == 0:
+            raise KeyError(manager_id)
+        row = rows[0]
+        elements = self.positions.indices[
+            self.positions.indptr[row] : self.positions.indptr[row + 1]
+        ]
+        ownership = self.ownership()[elements]
+        order = np.argsort(ownership, kind="stable")
+        return elements[order][ownership[order] <= max_ownership]
+
+    def similarity(self, manager_ids: Optional[Iterable[int]] = None) -> np.ndarray:
+        """
+        Method to count the players shared by pairs of managers
+
+        Parameters
+        ----------
+        `manager_ids (Iterable[int])`: ids of managers to compare against every manager, if None then every
+        manager, which is a dense managers × managers array so keep it to a few thousand, default=None
+
+        Return
+        ------
+        `np.ndarray`: number of shared players, one row per manager of `manager_ids` and one column per row of the
+        matrix, raises KeyError if a manager id is not in the matrix
+
+        """
+        owned = self.owned
+        rows = owned
+        if manager_ids is not None:
+            manager_ids = list(manager_ids)
+            index = pd.Index(self.manager_ids).get_indexer(manager_ids)
+            if (index < 0).any():
+                raise KeyError(manager_ids[np.flatnonzero(index < 0)[0]])
+            rows = owned[index]
+        return (rows @ owned.T).toarray()
+
+    def save(self, path: str) -> None:
+        """
+        Method to store the matrix in a compressed .npz file
+
+        Parameters
+        ----------
+        `path (str)`: path of file
+
+        Return
+        ------
+        `None`
+
+        """
+        np.savez_compressed(
+            path,
+            shape=np.array(self.positions.shape),
+            indptr=self.positions.indptr,
+            indices=self.positions.indices,
+            positions=self.positions.data,
+            multipliers=self.multipliers,
+            manager_ids=self.manager_ids,
+            captains=self.captains,
+            vice_captains=self.vice_captains,
+            chips=self.chips,
+            carried=self.carried,
+            gameweek=np.array(-1 if self.gameweek is None else self.gameweek),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "PicksMatrix":
+        """
+        Method to read a matrix stored with `save`
+
+        Parameters
+        ----------
+        `path (str)`: path of file
+
+        Return
+        ------
+        `PicksMatrix`
+
+        """
+        with np.load(path) as f:
+            positions = sparse.csr_matrix(
+                (f["positions"], f["indices"], f["indptr"]), shape=tuple(f["shape"])
+            )
+            gameweek = int(f["gameweek"])
+            return cls(
+                positions,
+                f["multipliers"],
+                f["manager_ids"],
+                f["captains"],
+                f["vice_captains"],
+                f["chips"],
+                None if gameweek < 0 else gameweek,
+                f["carried"] if "carried" in f else None,
+            )
@@ -1,14 +1,13 @@
-import asyncio
 import json
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 import pandas as pd
-from aiohttp import ClientSession
 
 from FPL.src.teams import get_team_id_dict
 from FPL.utils._get_api_url import _get_api_url
-from FPL.utils.caching import dir_cache
-from FPL.utils.fetch import fetch_request, fetch_request_async
+from FPL.utils.bootstrap import get_bootstrap
+from FPL.utils.caching import batch_cache, dir_cache
+from FPL.utils.client import fetch_all
 
 
 def basic_player_df(refresh: int = 20) -> pd.DataFrame:
@@ -27,8 +26,6 @@ def basic_player_df(refresh: int = 20) -> pd.DataFrame:
 
     @dir_cache(refresh=refresh)
     def _basic_player_df():
-        fpl_json = fetch_request(_get_api_url("bootstrap"))
-        # fpl_json = data.loads(data.content)
 
         # -- Columns we're interested in  -- #
         columns = [
@@ -47,7 +44,7 @@ def basic_player_df(refresh: int = 20) -> pd.DataFrame:
             "red_cards",
         ]
 
-        players_df = pd.DataFrame(fpl_json["elements"])
+        players_df = get_bootstrap().players
         columns = players_df.columns
         players_df = players_df.sort_values(
             by=["form"], ignore_index=True, ascending=False
@@ -70,31 +67,21 @@ def get_player_id_dict(reverse: bool = False) -> Dict[str, int] | Dict[int, str]
     `Dict`: dictionary of player and corresponding id key, value choice depends on `reverse` argument
 
     """
-    fpl_json = fetch_request(_get_api_url("bootstrap"))
-
-    # async with ClientSession() as session:
-    #     fpl_json = await fetch_request_async(_get_api_url("bootstrap"), session)
-
-    players_df = pd.DataFrame(fpl_json["elements"])
-    players_df["full_name"] = players_df["first_name"] + " " + players_df["second_name"]
-
+    snapshot = get_bootstrap()
     if reverse:
-        id_dict = pd.Series(
-            players_df["id"].values, index=players_df["full_name"].values
-        ).to_dict()
-    else:
-        id_dict = pd.Series(
-            players_df["full_name"].values, index=players_df["id"].values
-        ).to_dict()
-
-    return id_dict
+        return dict(snapshot.player_name_dict)
+    return dict(snapshot.player_id_dict)
 
 
 def get_player_info(
-    ids: List[int] | List[str] = None, refresh: int = 60, max_attempts=1_000
+    ids: List[int] | List[str] = None,
+    refresh: int = 60,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
 ) -> List[Dict]:
     """
-    Method to extract information for player(s), such as recent form.
+    Method to extract information for player(s), such as recent form. Information is cached per player, so
+    only players not already cached are fetched.
 
     Parameters
     ----------
@@ -102,7 +89,9 @@ def get_player_info(
 
     `refresh (int)`: time (minutes) to check since last save, default=60
 
-    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
 
     Return
     ------
@@ -110,24 +99,9 @@ def get_player_info(
 
     """
 
-    @dir_cache(refresh=refresh)
+    @batch_cache(refresh=refresh)
     def _get_player_info(ids: List[int | List[str]]) -> List[Dict]:
-        async def _get_player_info_async(ids: List[int]):
-            """
-            Function to retrieve information given player id
-            """
-
-            urls = [_get_api_url("element", id) for id in ids]
-            async with ClientSession() as session:
-                tasks = [
-                    fetch_request_async(url, session, max_attempts=1_000)
-                    for url in urls
-                ]
-                data = await asyncio.gather(*tasks)
-            return data
-
-        data = asyncio.run(_get_player_info_async(ids))
-
-        return data
+        urls = [_get_api_url("element", id) for id in ids]
+        return fetch_all(urls, max_attempts=max_attempts, priority=priority)
 
     return _get_player_info(ids)
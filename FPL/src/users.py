@@ -1,17 +1,32 @@
-import asyncio
-from typing import Dict, List
-
-from aiohttp import ClientSession
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
 from FPL.src import get_team_id_dict
+from FPL.src.ownership import PicksMatrix
 from FPL.utils._get_api_url import _get_api_url
-from FPL.utils.caching import dir_cache
-from FPL.utils.fetch import fetch_request, fetch_request_async
-
-
-def get_users(ids: List[int], gameweek: int, max_attempts: int = 1_000):
+from FPL.utils.caching import ExpiryPolicy, batch_cache, dir_cache
+from FPL.utils.client import fetch_all, fetch_iter
+from FPL.utils.fetch import fetch_request
+from FPL.utils.ttl import GameweekTTL
+
+# users on each page of a league's standings
+STANDINGS_PAGE_SIZE = 50
+# gameweeks looked back for a manager's cached picks in incremental mode
+CARRY_FORWARD_GAMEWEEKS = 5
+
+
+def get_users(
+    ids: List[int],
+    gameweek: int,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    refresh: Optional[float | ExpiryPolicy] = None,
+    incremental: bool = False,
+    history_refresh: float = 60,
+):
     """
-    Function to asynchronously retrieve user information
+    Function to asynchronously retrieve user information. Picks are cached per manager and gameweek, so only
+    managers not already cached are fetched
 
     Parameters
     ----------
@@ -19,32 +34,323 @@ def get_users(ids: List[int], gameweek: int, max_attempts: int = 1_000):
 
     `gameweek (int)`: gameweek up to, to retrieve manager team information for
 
-    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `refresh (float | ExpiryPolicy)`: time (minutes) to check since last save, if None then picks are kept
+    until their gameweek's deadline, briefly while it is played and forever once its data is checked
+    (see `GameweekTTL`), default=None
+
+    `incremental (bool)`: carry forward the squads of managers whose picks are cached for one of the previous
+    `CARRY_FORWARD_GAMEWEEKS` gameweeks and whose history, already cached by `get_users_history`, shows no
+    transfers or chips since, fetching picks only for the rest. History is never fetched here, so this
+    makes no more requests than fetching every manager's picks. The history does not show the starting
+    eleven or captain, so carried rows only hold the squad: their picks have "element" and "element_type"
+    alone, they are marked with the "carried_forward_from" gameweek and are not cached as the gameweek's
+    picks. `OwnershipAggregator` and `PicksMatrix` count them towards ownership only, default=False
+
+    `history_refresh (float)`: time (minutes) since the history was saved for it to be used when `incremental`, default=60
 
     Return
     ------
     `user information json`:
 
     """
+    if refresh is None:
+        refresh = GameweekTTL(gameweek="gameweek")
 
+    @batch_cache(refresh=refresh)
     def _get_users(ids: List[int], gameweek: int):
-        async def _get_users_async(ids: List[int], gameweek: int):
-            urls = [_get_api_url("picks", id, gameweek) for id in ids]
-            async with ClientSession() as session:
-                tasks = [
-                    fetch_request_async(url, session, max_attempts=max_attempts)
-                    for url in urls
-                ]
-                data = await asyncio.gather(*tasks)
-            return data
+        urls = [_get_api_url("picks", id, gameweek) for id in ids]
+        return fetch_all(urls, max_attempts=max_attempts, priority=priority)
+
+    if not incremental:
+        return _get_users(ids, gameweek)
+
+    users = _get_users.lookup(ids, gameweek)
+    previous = {}
+    remaining = [id for id in dict.fromkeys(ids) if id not in users]
+    for gw in range(gameweek - 1, max(gameweek - CARRY_FORWARD_GAMEWEEKS, 1) - 1, -1):
+        if not remaining:
+            break
+        for id, user in _get_users.lookup(remaining, gw).items():
+            if isinstance(user, dict) and user.get("picks"):
+                previous[id] = (gw, user)
+        remaining = [id for id in remaining if id not in previous]
+
+    histories = _users_history(history_refresh).lookup(list(previous))
+    for id, (gw, user) in previous.items():
+        if id in histories:
+            row = _unchanged_since(histories[id], user, gw, gameweek)
+            if row is not None:
+                users[id] = _carry_forward(user, gw, row)
+
+    missing = [id for id in dict.fromkeys(ids) if id not in users]
+    users.update(zip(missing, _get_users(missing, gameweek)))
+    return [users[id] for id in ids]
+
+
+def _unchanged_since(
+    history: Optional[Dict], user: Dict, previous: int, gameweek: int
+) -> Optional[Dict]:
+    """
+    Function to check a manager's history for transfers and chips after the gameweek of their `user` picks
+
+    Return
+    ------
+    `Dict`: history row of `gameweek` if the squad is unchanged, otherwise None
+
+    """
+    # a free hit squad reverts the following gameweek
+    if not isinstance(history, dict) or user.get("active_chip") == "freehit":
+        return None
+    rows = {row["event"]: row for row in history.get("current", [])}
+    events = range(previous + 1, gameweek + 1)
+    if any(event not in rows or rows[event]["event_transfers"] for event in events):
+        return None
+    if any(chip["event"] in events for chip in history.get("chips", [])):
+        return None
+    return rows[gameweek]
+
+
+def _carry_forward(user: Dict, previous: int, row: Dict) -> Dict:
+    """
+    Function to copy the squad of picks to a later gameweek with that gameweek's history row, leaving out
+    the lineup, captaincy and multipliers that cannot be known without fetching its picks
+    """
+    picks = [
+        {"element": pick["element"], "element_type": pick.get("element_type")}
+        for pick in user["picks"]
+    ]
+    return {
+        "active_chip": None,
+        "entry_history": row,
+        "picks": picks,
+        "carried_forward_from": previous,
+    }
+
+
+def get_users_history(
+    ids: List[int],
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    refresh: float = 60,
+) -> List[Optional[Dict]]:
+    """
+    Function to asynchronously retrieve the history of managers, their points, transfers and chips for each
+    gameweek so far. Cached per manager
+
+    Parameters
+    ----------
+    `ids (List[int])`: ids of managers
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `refresh (float)`: time (minutes) to check since last save, default=60
+
+    Return
+    ------
+    `List[Dict]`: history json of each manager, with "current" rows per gameweek and "chips" played
+
+    """
+    return _users_history(refresh, max_attempts, priority)(ids)
+
+
+def _users_history(
+    refresh: float, max_attempts: int = 10, priority: Optional[int] = None
+) -> Callable:
+    """
+    Function to build the per manager cached history fetch, whose `lookup` reads cached history alone
+    """
+
+    @batch_cache(refresh=refresh)
+    def _get_users_history(ids: List[int]):
+        urls = [_get_api_url("history", id) for id in ids]
+        return fetch_all(urls, max_attempts=max_attempts, priority=priority)
+
+    return _get_users_history
 
-        return asyncio.run(_get_users_async(ids, gameweek=gameweek))
 
-    return _get_users(ids, gameweek)
+def iter_users(
+    ids: Iterable[int],
+    gameweek: int,
+    chunk_size: int = 1000,
+    cache: bool = True,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    refresh: Optional[float | ExpiryPolicy] = None,
+) -> Iterator[Dict]:
+    """
+    Function to stream user information, holding at most `chunk_size` managers' picks at a time
+
+    Parameters
+    ----------
+    `ids (Iterable[int])`: ids of managers, can be a lazy iterable such as `iter_league_ids`
+
+    `gameweek (int)`: gameweek up to, to retrieve manager team information for
+
+    `chunk_size (int)`: number of managers fetched at a time, default=1000
+
+    `cache (bool)`: go through the per manager cache of `get_users`, in chunks. If False then picks are
+    streamed straight from the api in the order they arrive and not stored, e.g. for the top million
+    managers, default=True
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `refresh (float | ExpiryPolicy)`: time (minutes) to check since last save when `cache`, see `get_users`, default=None
+
+    Return
+    ------
+    `Iterator[Dict]`: user information json of each manager, in the order of `ids` when `cache`
+
+    """
+    ids = iter(ids)
+    if not cache:
+        urls = (_get_api_url("picks", id, gameweek) for id in ids)
+        yield from fetch_iter(
+            urls,
+            max_attempts=max_attempts,
+            priority=priority,
+            window=chunk_size,
+            ordered=False,
+        )
+        return
+
+    while chunk := list(itertools.islice(ids, chunk_size)):
+        yield from get_users(
+            chunk,
+            gameweek,
+            max_attempts=max_attempts,
+            priority=priority,
+            refresh=refresh,
+        )
+
+
+def get_picks_matrix(
+    ids: Iterable[int],
+    gameweek: int,
+    chunk_size: int = 1000,
+    n_elements: Optional[int] = None,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    refresh: Optional[float | ExpiryPolicy] = None,
+) -> PicksMatrix:
+    """
+    Function to build the sparse managers × players matrix of picks, going through the per manager cache of
+    `get_users` in chunks.
+    Store it with `PicksMatrix.save` to rerun analyses without fetching again
+
+    Parameters
+    ----------
+    `ids (Iterable[int])`: ids of managers, can be a lazy iterable such as `iter_league_ids`
+
+    `gameweek (int)`: gameweek up to, to retrieve manager team information for
+
+    `chunk_size (int)`: number of managers fetched at a time, default=1000
+
+    `n_elements (int)`: number of columns, if None then the largest player id picked plus one, default=None
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `refresh (float | ExpiryPolicy)`: time (minutes) to check since last save when `cache`, see `get_users`, default=None
+
+    Return
+    ------
+    `PicksMatrix`: one row per manager in the order of `ids`
+
+    """
+    ids = list(ids)
+    users = iter_users(
+        ids,
+        gameweek,
+        chunk_size=chunk_size,
+        max_attempts=max_attempts,
+        priority=priority,
+        refresh=refresh,
+    )
+    return PicksMatrix.from_users(ids, users, gameweek, n_elements=n_elements)
+
+
+def iter_league_ids(
+    league_id: int,
+    top_n: Optional[int] = None,
+    start_page: int = 1,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    window: int = 20,
+) -> Iterator[int]:
+    """
+    Function to stream the IDs of users within a league, page by page as the standings arrive.
+
+    Only the pages holding the first `top_n` users from `start_page` are requested, and requesting stops at
+    the first page without a next page.
+
+    Parameters
+    ----------
+    `league_id (int)`:
+
+    `top_n (int)`: number of users to retrieve, if None then every user from `start_page`, default=None
+
+    `start_page (int)`: page of the standings to start from, e.g. to resume, pages hold `STANDINGS_PAGE_SIZE` users, default=1
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `window (int)`: maximum number of pages requested ahead, default=20
+
+    Return
+    ------
+    `Iterator[int]`: ids of users in ascending rank
+
+    """
+    if start_page < 1:
+        raise ValueError("start_page must be at least 1, the standings start on page 1")
+
+    if top_n is None:
+        pages = itertools.count(start_page)
+    else:
+        n_pages = -(-top_n // STANDINGS_PAGE_SIZE)
+        pages = range(start_page, start_page + n_pages)
+    urls = (_get_api_url("standings", id=league_id, page=page) for page in pages)
+
+    n = 0
+    # slow start, so a league ending before top_n wastes few page requests
+    responses = fetch_iter(
+        urls,
+        max_attempts=max_attempts,
+        priority=priority,
+        window=window,
+        slow_start=True,
+    )
+    try:
+        for page in responses:
+            for player in page["standings"]["results"]:
+                if top_n is not None and n >= top_n:
+                    return
+                n += 1
+                yield player["entry"]
+            if not page["standings"]["has_next"]:
+                return
+    finally:
+        # cancels pages still in flight
+        responses.close()
 
 
 def get_users_id(
-    league_id: int, top_n: int = 50, refresh: int = 60, max_attempts: int = 1_000
+    league_id: int,
+    top_n: int = 50,
+    refresh: int = 60,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
+    max_stale: Optional[float] = None,
 ) -> List[int]:
     """
     Function to asynchronously get the IDs of users within a league.
@@ -57,7 +363,12 @@ def get_users_id(
 
     `refresh (int)`: time (minutes) to check since last save, default=60
 
-    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
+
+    `max_stale (float)`: time (minutes) after `refresh` that the previous ids are returned straight away while
+    they are fetched again in the background, if None then waits for the fetch, default=None
 
     Return
     ------
@@ -70,30 +381,13 @@ def get_users_id(
     2023: '314
     """
 
-    @dir_cache(refresh=refresh)
+    @dir_cache(refresh=refresh, max_stale=max_stale)
     def _get_users_id(league_id: int, top_n: int = 50) -> List[int]:
-        async def _get_top_users_id(n) -> List[int]:
-            pages = range((n // 50) + 2)
-            urls = [
-                _get_api_url("standings", id=league_id, page=page) for page in pages
-            ]
-            async with ClientSession() as session:
-                tasks = [
-                    fetch_request_async(url, session, max_attempts=max_attempts)
-                    for url in urls
-                ]
-                data = await asyncio.gather(*tasks)
-
-            return data
-
-        list_of_pages = asyncio.run(_get_top_users_id(top_n))
-        top_ids = []
-        # start from 1 as first page is always empty
-        for page in list_of_pages[1:]:
-            # Happy to make the assumption there will always be 50 players on a page
-            for player in range(len(page["standings"]["results"])):
-                top_ids.append(page.get("standings")["results"][player]["entry"])
-        return top_ids[:top_n]
+        return list(
+            iter_league_ids(
+                league_id, top_n, max_attempts=max_attempts, priority=priority
+            )
+        )
 
     return _get_users_id(league_id, top_n)
 
@@ -130,7 +424,10 @@ def get_user_leagues_id(user_id: int, refresh: int = 0) -> List[int]:
 
 
 def get_league_data(
-    ids: List[int], refresh: int = 60, max_attempts: int = 1_000
+    ids: List[int],
+    refresh: int = 60,
+    max_attempts: int = 10,
+    priority: Optional[int] = None,
 ) -> None:
     """
     Function to extract league data
@@ -141,7 +438,9 @@ def get_league_data(
 
     `refresh (int)`: time (minutes) to check since last save, default=60
 
-    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `priority (int)`: priority of requests in the shared client queue (see `FPL.utils.scheduler`), if None then set from the endpoint, default=None
 
     Return
     ------
@@ -152,16 +451,6 @@ def get_league_data(
     @dir_cache(refresh=refresh)
     def _get_league_data(ids: List[int]) -> None:
         urls = [_get_api_url("standings", id=id) for id in ids]
-
-        async def _get_league_data(urls):
-            async with ClientSession() as session:
-                tasks = [
-                    fetch_request_async(url, session, max_attempts=max_attempts)
-                    for url in urls
-                ]
-                data = await asyncio.gather(*tasks)
-            return data
-
-        return asyncio.run(_get_league_data(urls))
+        return fetch_all(urls, max_attempts=max_attempts, priority=priority)
 
     return _get_league_data(ids)
@@ -1,5 +1,20 @@
 from ._get_api_url import _get_api_url
-from .caching import clear_dir_cache, dir_cache
+from .bootstrap import BootstrapSnapshot, clear_bootstrap, get_bootstrap
+from .cache_manager import compact, list_entries, prune, set_cache_budget
+from .cache_stats import CacheStats, get_cache_stats
+from .caching import MemoryCache, clear_dir_cache, dir_cache, get_memory_cache
+from .cassette import Cassette, get_cassette, use_cassette
+from .client import (
+    FPLClient,
+    close_client,
+    fetch_all,
+    fetch_iter,
+    get_client,
+    set_client,
+)
+from .concurrency import AdaptiveLimiter
 from .definitions import POS_DICT, SOURCE_DIR
-from .fetch import fetch_request, fetch_request_async
+from .fetch import fetch_request, fetch_request_async, get_decoder, set_decoder
 from .helpers import get_current_gw
+from .telemetry import FetchTelemetry, get_telemetry
+from .ttl import GameweekTTL
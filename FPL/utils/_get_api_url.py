@@ -1,5 +1,9 @@
+import os
 from typing import Optional
 
+# base url of the api, the FPL_API_URL environment variable overrides it e.g. to point at tools/mock_server.py
+API_URL = "https://fantasy.premierleague.com/api"
+
 
 def _get_api_url(
     key: str,
@@ -38,36 +42,39 @@ def _get_api_url(
     `str`: url of api requested
 
 
+    The base url defaults to `API_URL` and can be overridden with the `FPL_API_URL` environment variable.
+
     TODO: refactor so it's DRY for gameweek_id dict
     """
+    base = os.environ.get("FPL_API_URL", API_URL).rstrip("/")
 
     static_dict = {
         # Main URL for all premier league players, teams, global gameweek summaries"
-        "bootstrap": "https://fantasy.premierleague.com/api/bootstrap-static/",
+        "bootstrap": f"{base}/bootstrap-static/",
         # A list of all 380 matches that will happen over the season
-        "fixtures": "https://fantasy.premierleague.com/api/fixtures/",
+        "fixtures": f"{base}/fixtures/",
     }
     id_dict = {
         # Remaining fixtures left for PL player as well as previous fixtures and seasons
-        "element": f"https://fantasy.premierleague.com/api/element-summary/{id}/",
+        "element": f"{base}/element-summary/{id}/",
         # Basic info on FPL Manager
-        "entry": f"https://fantasy.premierleague.com/api/entry/{id}/",
+        "entry": f"{base}/entry/{id}/",
         # A summary of a FPL Manager for each GW up until the current GW. The past season results of a FPL Manager. The chips a FPL Manager has played"
-        "history": f"https://fantasy.premierleague.com/api/entry/{id}/history/",
+        "history": f"{base}/entry/{id}/history/",
         # All transfers of given team ID
-        "transfers": f"https://fantasy.premierleague.com/api/entry/{id}/transfers/",
+        "transfers": f"{base}/entry/{id}/transfers/",
     }
     gameweek_dict = {
         # Stats of all PL players that played in GW
-        "gameweek": f"https://fantasy.premierleague.com/api/event/{gameweek}/live/",
+        "gameweek": f"{base}/event/{gameweek}/live/",
     }
     gameweek_id_dict = {
         # Squad picks of team LID for week GW. Both TID and GW should be numeric
-        "picks": f"https://fantasy.premierleague.com/api/entry/{id}/event/{gameweek}/picks/",
+        "picks": f"{base}/entry/{id}/event/{gameweek}/picks/",
     }
     standings_dict = {
         # Information about league with id such as name and standings. Add ?page_standings={P} for leagues
-        "standings": f"https://fantasy.premierleague.com/api/leagues-classic/{id}/standings/?page_new_entries=1&page_standings={page}&phase=1",
+        "standings": f"{base}/leagues-classic/{id}/standings/?page_new_entries=1&page_standings={page}&phase=1",
     }
     if key in static_dict:
         return static_dict[key]
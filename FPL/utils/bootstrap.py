@@ -0,0 +1,125 @@
+"""
+Process-wide snapshot of the bootstrap-static payload
+"""
+
+import datetime
+import threading
+import time
+from typing import Dict, Optional
+
+import pandas as pd
+
+from FPL.utils._get_api_url import _get_api_url
+from FPL.utils.cassette import Cassette, get_cassette
+from FPL.utils.fetch import JSONObject, fetch_request
+
+
+class BootstrapSnapshot:
+    """
+    Parsed bootstrap-static payload, holding the players, teams and events frames along with the id
+    dictionaries derived from them, so each consumer reads from the same parse.
+
+    Parameters
+    ----------
+    `data (JSONObject)`: bootstrap-static JSON
+
+    `fetched_at (float)`: time (seconds since epoch) payload was fetched, if None then set to now
+
+    """
+
+    def __init__(self, data: JSONObject, fetched_at: Optional[float] = None):
+        self.data = data
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+
+        self.players = pd.DataFrame(data["elements"])
+        self.teams = pd.DataFrame(data["teams"])
+        self.events = pd.DataFrame(data["events"])
+        self.element_types = pd.DataFrame(data.get("element_types", []))
+        if not self.events.empty:
+            self.events["deadline_time"] = pd.to_datetime(
+                self.events["deadline_time"], utc=True
+            )
+
+        full_name = self.players["first_name"] + " " + self.players["second_name"]
+        # dict of id: "name"
+        self.player_id_dict: Dict[int, str] = pd.Series(
+            full_name.values, index=self.players["id"].values
+        ).to_dict()
+        # dict of "name": id
+        self.player_name_dict: Dict[str, int] = pd.Series(
+            self.players["id"].values, index=full_name.values
+        ).to_dict()
+        self.team_id_dict: Dict[int, str] = pd.Series(
+            self.teams["name"].values, index=self.teams["id"].values
+        ).to_dict()
+
+    @property
+    def age(self) -> float:
+        """`float`: time (minutes) since payload was fetched"""
+        return (time.time() - self.fetched_at) / 60
+
+    def current_gw(self, now: Optional[datetime.datetime] = None) -> int:
+        """
+        Method to get the most recent gameweek whose deadline has passed
+
+        Parameters
+        ----------
+        `now (datetime)`: time to compare deadlines against, if None then uses current time, default=None
+
+        Return
+        ------
+        `int`: most recent game week
+
+        """
+        now = pd.Timestamp.now("UTC") if now is None else pd.Timestamp(now)
+        upcoming = self.events[self.events["deadline_time"] > now]
+        if upcoming.empty:
+            return int(self.events["id"].max())
+        return int(upcoming["id"].iloc[0]) - 1
+
+
+_snapshot: Optional[BootstrapSnapshot] = None
+# cassette active when the snapshot was fetched, a different cassette forces a refetch
+_snapshot_cassette: Optional[Cassette] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_bootstrap(refresh: float = 5) -> BootstrapSnapshot:
+    """
+    Function to get the shared bootstrap snapshot, fetching it when it is older than `refresh`.
+    Concurrent callers coalesce onto a single request.
+
+    Parameters
+    ----------
+    `refresh (float)`: time (minutes) a snapshot is reused for, default=5
+
+    Return
+    ------
+    `BootstrapSnapshot`: parsed bootstrap-static payload
+
+    """
+    global _snapshot, _snapshot_cassette
+    with _snapshot_lock:
+        cassette = get_cassette()
+        if (
+            _snapshot is None
+            or _snapshot.age >= refresh
+            or _snapshot_cassette is not cassette
+        ):
+            _snapshot = BootstrapSnapshot(fetch_request(_get_api_url("bootstrap")))
+            _snapshot_cassette = cassette
+        return _snapshot
+
+
+def clear_bootstrap() -> None:
+    """
+    Function to drop the shared bootstrap snapshot so the next call refetches it
+
+    Return
+    ------
+    `None`
+
+    """
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
@@ -0,0 +1,335 @@
+"""
+Housekeeping for `dir_cache` folders: listing entries, pruning to a size budget and removing debris
+"""
+
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from FPL.utils.caching import (
+    SUFFIXES,
+    _entry_idle,
+    _meta_path,
+    _read_meta,
+    _remove_entry,
+)
+
+POLICIES = ("lru", "lfu")
+
+COLUMNS = [
+    "name",
+    "function",
+    "format",
+    "size",
+    "created",
+    "last_access",
+    "age",
+    "hits",
+    "ttl",
+    "expired",
+    "base",
+]
+
+# fraction of a budget that pruning frees the folder down to, so a folder at its budget is not pruned on every write
+BUDGET_LOW_WATER = 0.9
+# time (seconds) after which the running size of a folder is measured again, e.g. to see other processes' writes
+BUDGET_RESCAN_INTERVAL = 60
+
+# cache_dir: (max_bytes, policy)
+_budgets: Dict[str, Tuple[int, str]] = {}
+# cache_dir: [size (bytes), time measured], kept for folders with a budget
+_sizes: Dict[str, List[float]] = {}
+_sizes_lock = threading.Lock()
+
+
+def _file_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+def list_entries(cache_dir: str = "./.cache") -> pd.DataFrame:
+    """
+    Function to list the entries of a cache folder
+
+    Parameters
+    ----------
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    Return
+    ------
+    `pd.DataFrame`: one row per entry with its name, cached function, storage format, size (bytes, data and
+    metadata), creation and last access times, age (minutes), hits, ttl (minutes) set by an expiry policy,
+    whether that ttl has passed and the path of the entry without suffix
+
+    """
+    rows = []
+    now = time.time()
+    if not os.path.isdir(cache_dir):
+        return pd.DataFrame(columns=COLUMNS)
+
+    for file in os.listdir(cache_dir):
+        if not file.endswith(".meta.json"):
+            continue
+        base = os.path.abspath(os.path.join(cache_dir, file[: -len(".meta.json")]))
+        meta = _read_meta(base)
+        if meta is None or not os.path.exists(os.path.join(cache_dir, meta["file"])):
+            continue
+
+        hits_path = base + ".hits"
+        hits = _file_size(hits_path)
+        last_access = os.path.getmtime(hits_path) if hits else meta["created"]
+        ttl = meta.get("ttl")
+        rows.append(
+            {
+                "name": os.path.basename(base),
+                "function": meta.get("function"),
+                "format": meta["format"],
+                "size": meta["size"] + _file_size(_meta_path(base)) + hits,
+                "created": meta["created"],
+                "last_access": max(last_access, meta["created"]),
+                "age": (now - meta["created"]) / 60,
+                "hits": hits,
+                "ttl": ttl,
+                "expired": ttl is not None and now - meta["created"] >= ttl * 60,
+                "base": base,
+            }
+        )
+
+    entries = pd.DataFrame(rows, columns=COLUMNS)
+    for column in ["created", "last_access"]:
+        entries[column] = pd.to_datetime(entries[column], unit="s")
+    return entries.sort_values("last_access", ascending=False, ignore_index=True)
+
+
+def cache_size(cache_dir: str = "./.cache") -> int:
+    """
+    Function to get the total size of a cache folder
+
+    Parameters
+    ----------
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    Return
+    ------
+    `int`: summed size (bytes) of every file in the folder
+
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    with os.scandir(cache_dir) as files:
+        return sum(_file_size(file.path) for file in files if file.is_file())
+
+
+def prune(
+    cache_dir: str = "./.cache",
+    max_bytes: Optional[int] = None,
+    max_age: Optional[float] = None,
+    expired: bool = True,
+    policy: str = "lru",
+    keep: Iterable[str] = (),
+    dry_run: bool = False,
+) -> pd.DataFrame:
+    """
+    Function to remove entries from a cache folder without prompting. Entries a thread or process is
+    writing are skipped.
+
+    Parameters
+    ----------
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    `max_bytes (int)`: size budget (bytes), entries are evicted by `policy` until the remaining entries fit,
+    if None then no budget, default=None
+
+    `max_age (float)`: remove entries created more than this many minutes ago, if None then kept, default=None
+
+    `expired (bool)`: remove entries whose expiry policy ttl has passed, default=True
+
+    `policy (str)`: eviction order for `max_bytes`, "lru" evicts the least recently used entries first and
+    "lfu" the least frequently used, default="lru"
+
+    `keep (Iterable[str])`: paths of entries, without suffix, never to remove, default=()
+
+    `dry_run (bool)`: only return the entries that would be removed, default=False
+
+    Return
+    ------
+    `pd.DataFrame`: entries removed, in the format of `list_entries`
+
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy argument must be one of {POLICIES}")
+
+    entries = list_entries(cache_dir)
+    kept = entries["base"].isin([os.path.abspath(base) for base in keep])
+    remove = pd.Series(False, index=entries.index)
+    if expired:
+        remove |= entries["expired"].astype(bool)
+    if max_age is not None:
+        remove |= entries["age"] > max_age
+    remove &= ~kept
+
+    if max_bytes is not None:
+        excess = entries.loc[~remove, "size"].sum() - max_bytes
+        order = ["last_access", "hits"] if policy == "lru" else ["hits", "last_access"]
+        candidates = entries[~remove & ~kept].sort_values(order)
+        for index, size in candidates["size"].items():
+            if excess <= 0:
+                break
+            remove[index] = True
+            excess -= size
+
+    removed = entries[remove]
+    if not dry_run:
+        removed = removed[[_remove_entry(base) for base in removed["base"]]]
+        with _sizes_lock:
+            size = _sizes.get(os.path.abspath(cache_dir))
+            if size is not None:
+                size[0] -= removed["size"].sum()
+    return removed.reset_index(drop=True)
+
+
+def compact(cache_dir: str = "./.cache", tmp_age: float = 60) -> List[str]:
+    """
+    Function to remove files in a cache folder that belong to no readable entry: temporary files left by
+    interrupted writes, data files without metadata (including entries written by older versions),
+    metadata of missing data files and hit counts and locks of removed entries
+
+    Parameters
+    ----------
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    `tmp_age (float)`: only remove temporary files older than this many minutes, default=60
+
+    Return
+    ------
+    `List[str]`: paths of files removed
+
+    """
+    if not os.path.isdir(cache_dir):
+        return []
+
+    now = time.time()
+    removed = []
+    cache_dir = os.path.abspath(cache_dir)
+    sidecars = (".meta.json", ".hits", ".lock") + tuple(SUFFIXES.values())
+
+    def _remove(path: str) -> None:
+        # e.g. already removed, or a lock file held open on windows
+        with contextlib.suppress(OSError):
+            os.remove(path)
+            removed.append(path)
+
+    bases = {}
+    for file in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, file)
+        if file.endswith(".tmp"):
+            with contextlib.suppress(FileNotFoundError):
+                if now - os.path.getmtime(path) >= tmp_age * 60:
+                    _remove(path)
+            continue
+        for suffix in sidecars:
+            if file.endswith(suffix):
+                bases.setdefault(path[: -len(suffix)], []).append(suffix)
+                break
+
+    for base, suffixes in bases.items():
+        meta = _read_meta(base)
+        if meta is not None and os.path.exists(os.path.join(cache_dir, meta["file"])):
+            continue
+        # the entry may be being written, its files are only debris once its locks are free
+        with _entry_idle(base) as idle:
+            if not idle:
+                continue
+            meta = _read_meta(base)
+            if meta is not None and os.path.exists(
+                os.path.join(cache_dir, meta["file"])
+            ):
+                continue
+            for suffix in suffixes:
+                _remove(base + suffix)
+            if ".lock" not in suffixes:
+                # created by taking the lock
+                with contextlib.suppress(OSError):
+                    os.remove(base + ".lock")
+    return removed
+
+
+def set_cache_budget(
+    max_bytes: Optional[int], cache_dir: str = "./.cache", policy: str = "lru"
+) -> None:
+    """
+    Function to keep a cache folder within a size budget, pruning it by `policy` down to `BUDGET_LOW_WATER`
+    of the budget once `dir_cache` writes take it over. The folder is measured when the budget is set and
+    every `BUDGET_RESCAN_INTERVAL` seconds after, in between writes are added to a running total
+
+    Parameters
+    ----------
+    `max_bytes (int)`: size budget (bytes), if None then removes the budget
+
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    `policy (str)`: eviction order, "lru" or "lfu" (see `prune`), default="lru"
+
+    Return
+    ------
+    `None`
+
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"policy argument must be one of {POLICIES}")
+    cache_dir = os.path.abspath(cache_dir)
+    with _sizes_lock:
+        _sizes.pop(cache_dir, None)
+    if max_bytes is None:
+        _budgets.pop(cache_dir, None)
+    else:
+        _budgets[cache_dir] = (max_bytes, policy)
+
+
+def enforce_budget(
+    cache_dir: str = "./.cache",
+    keep: Iterable[str] = (),
+    written: Optional[int] = None,
+) -> None:
+    """
+    Function to prune a cache folder back within the budget set by `set_cache_budget`, if any
+
+    Parameters
+    ----------
+    `cache_dir (str)`: folder path to cache directory, default="./.cache"
+
+    `keep (Iterable[str])`: paths of entries, without suffix, never to remove, default=()
+
+    `written (int)`: bytes just written to the folder, added to its running size. If None then the folder is
+    measured, default=None
+
+    Return
+    ------
+    `None`
+
+    """
+    cache_dir = os.path.abspath(cache_dir)
+    budget = _budgets.get(cache_dir)
+    if budget is None:
+        return
+    max_bytes, policy = budget
+    now = time.time()
+    with _sizes_lock:
+        size = _sizes.get(cache_dir)
+        if written is None or size is None or now - size[1] >= BUDGET_RESCAN_INTERVAL:
+            size = _sizes[cache_dir] = [cache_size(cache_dir), now]
+        else:
+            size[0] += written
+        if size[0] <= max_bytes:
+            return
+    prune(
+        cache_dir, max_bytes=int(max_bytes * BUDGET_LOW_WATER), policy=policy, keep=keep
+    )
+    with _sizes_lock:
+        _sizes[cache_dir] = [cache_size(cache_dir), time.time()]
@@ -0,0 +1,152 @@
+"""
+Per-function statistics of calls served by `dir_cache`
+"""
+
+import json
+import threading
+from typing import Dict, Optional
+
+import pandas as pd
+
+COUNTERS = (
+    "hits",
+    "memory_hits",
+    "stale_hits",
+    "misses",
+    "refreshes",
+    "bytes_read",
+    "bytes_written",
+    "deserialize_time",
+    "recompute_time",
+)
+
+
+class FunctionStats:
+    """
+    Counters of one cached function. `hits` include `memory_hits` and `stale_hits`, `refreshes` are
+    recomputes run in the background for stale hits, times are in seconds
+    """
+
+    def __init__(self):
+        for counter in COUNTERS:
+            setattr(self, counter, 0)
+
+    def summary(self) -> Dict[str, float]:
+        calls = self.hits + self.misses
+        disk_hits = self.hits - self.memory_hits
+        return {
+            **{counter: getattr(self, counter) for counter in COUNTERS},
+            "hit_rate": self.hits / calls if calls else 0.0,
+            "mean_deserialize_time": (
+                self.deserialize_time / disk_hits if disk_hits else 0.0
+            ),
+            "mean_recompute_time": (
+                self.recompute_time / (self.misses + self.refreshes)
+                if self.misses + self.refreshes
+                else 0.0
+            ),
+        }
+
+
+class CacheStats:
+    """
+    Thread-safe collection of `FunctionStats` keyed by the qualified name of the cached function
+    """
+
+    def __init__(self):
+        self._stats: Dict[str, FunctionStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, function: str, **counts: float) -> None:
+        """
+        Method to add to the counters of a function
+
+        Parameters
+        ----------
+        `function (str)`: qualified name of the cached function
+
+        `counts (float)`: amounts to add, keyed by the names in `COUNTERS`
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            if function not in self._stats:
+                self._stats[function] = FunctionStats()
+            stats = self._stats[function]
+            for counter, value in counts.items():
+                setattr(stats, counter, getattr(stats, counter) + value)
+
+    def summary(self, function: Optional[str] = None) -> Dict:
+        """
+        Method to summarise recorded calls
+
+        Parameters
+        ----------
+        `function (str)`: qualified name of function to summarise, if None then summarises every function, default=None
+
+        Return
+        ------
+        `Dict`: counters, hit rate and mean times, keyed by function when `function` is None
+
+        """
+        with self._lock:
+            if function is not None:
+                return self._stats.get(function, FunctionStats()).summary()
+            return {name: stats.summary() for name, stats in self._stats.items()}
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Method to tabulate recorded calls
+
+        Return
+        ------
+        `pd.DataFrame`: one row per function, indexed by its qualified name, most called first
+
+        """
+        summary = self.summary()
+        columns = list(FunctionStats().summary())
+        frame = pd.DataFrame.from_dict(summary, orient="index", columns=columns)
+        frame.index.name = "function"
+        calls = frame["hits"] + frame["misses"]
+        return frame.loc[calls.sort_values(ascending=False).index]
+
+    def write(self, path: str) -> None:
+        """
+        Method to write `summary` to a json file
+
+        Parameters
+        ----------
+        `path (str)`: path of file to write
+
+        Return
+        ------
+        `None`
+
+        """
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def reset(self) -> None:
+        """
+        Method to clear all recorded calls
+        """
+        with self._lock:
+            self._stats = {}
+
+
+cache_stats = CacheStats()
+
+
+def get_cache_stats() -> CacheStats:
+    """
+    Function to get the process-wide cache statistics
+
+    Return
+    ------
+    `CacheStats`: statistics recorded by `dir_cache` and `batch_cache`
+
+    """
+    return cache_stats
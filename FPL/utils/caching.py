@@ -1,50 +1,1231 @@
+import atexit
+import contextlib
+import functools
+import hashlib
+import inspect
+import io
+import json
 import os
 import pickle
+import tempfile
+import threading
 import time
-from typing import Callable
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
 import shutil
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - windows
+    fcntl = None
+    import msvcrt
 
-def dir_cache(refresh: int = 30, cache_dir: str = "./.cache") -> Callable:
+import numpy as np
+import pandas as pd
+
+from FPL.utils.cache_stats import cache_stats
+from FPL.utils.cassette import get_cassette
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover - pyarrow is optional
+    pa = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - zstandard is optional
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:  # pragma: no cover - lz4 is optional
+    lz4 = None
+
+# bump to invalidate every entry written with an older key or file layout
+CACHE_SCHEMA = 1
+
+# marks an omitted argument where None is meaningful
+MISSING = object()
+
+# hits counted per entry, the `.hits` file stops growing once it reaches this many bytes
+MAX_HITS = 2**16
+# time (seconds) between writes of hits served from memory
+HITS_FLUSH_INTERVAL = 60
+# entries with hits held in memory before all of them are written
+MAX_PENDING_HITS = 100_000
+
+FORMATS = ("auto", "pickle", "feather", "parquet")
+CODECS = (None, "zstd", "lz4")
+# file suffix of each storage format, probed in this order on read
+SUFFIXES = {
+    "feather": ".feather",
+    "parquet": ".parquet",
+    "numpy": ".npy",
+    "pickle": ".pkl",
+}
+
+
+def _stable_repr(obj: Any) -> bytes:
+    """
+    Function to serialise an argument to bytes that are equal across processes and runs
+
+    Parameters
+    ----------
+    `obj (Any)`: argument of cached function
+
+    Return
+    ------
+    `bytes`: canonical representation of obj
+
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return f"{type(obj).__name__}:{obj!r}".encode()
+    if isinstance(obj, (list, tuple)):
+        items = b",".join(_stable_repr(item) for item in obj)
+        return f"{type(obj).__name__}:[".encode() + items + b"]"
+    if isinstance(obj, (set, frozenset)):
+        items = b",".join(sorted(_stable_repr(item) for item in obj))
+        return b"set:{" + items + b"}"
+    if isinstance(obj, dict):
+        items = sorted(
+            _stable_repr(key) + b"=" + _stable_repr(value) for key, value in obj.items()
+        )
+        return b"dict:{" + b",".join(items) + b"}"
+    if isinstance(obj, np.ndarray):
+        return f"ndarray:{obj.dtype}:{obj.shape}:".encode() + obj.tobytes()
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        hashed = pd.util.hash_pandas_object(obj, index=True).values
+        columns = _stable_repr(list(obj.columns) if obj.ndim == 2 else [obj.name])
+        return b"pandas:" + columns + hashed.tobytes()
+    if isinstance(obj, np.generic):
+        return _stable_repr(obj.item())
+    return f"{type(obj).__qualname__}:".encode() + pickle.dumps(obj, protocol=4)
+
+
+def _bind_arguments(func: Callable, args: Tuple, kwargs: Dict) -> Dict[str, Any]:
+    """
+    Function to map the arguments of a call to their parameter names, defaults included
+    """
+    try:
+        bound = inspect.signature(func).bind(*args, **kwargs)
+        bound.apply_defaults()
+        return dict(bound.arguments)
+    except (TypeError, ValueError):
+        return {"args": args, "kwargs": kwargs}
+
+
+def cache_key(
+    func: Callable, args: Tuple = (), kwargs: Dict = None, version: int = 0
+) -> str:
+    """
+    Function to build the cache key of a call, a hash of the function's qualified name, its arguments
+    and the schema versions. Arguments are bound to the signature first, so `f(1)`, `f(x=1)` and
+    `f(1, y=<default>)` share a key.
+
+    Parameters
+    ----------
+    `func (Callable)`: cached function
+
+    `args (Tuple)`: positional arguments of call, default=()
+
+    `kwargs (Dict)`: keyword arguments of call, default=None
+
+    `version (int)`: version of the function's result format, default=0
+
+    Return
+    ------
+    `str`: hex digest identifying the call
+
+    """
+    arguments = _bind_arguments(func, args, {} if kwargs is None else kwargs)
+    digest = hashlib.sha1()
+    digest.update(f"{CACHE_SCHEMA}:{version}:".encode())
+    digest.update(f"{func.__module__}.{func.__qualname__}:".encode())
+    digest.update(_stable_repr(arguments))
+    return digest.hexdigest()
+
+
+def _shallow_copy(result: Any) -> Any:
+    """
+    Function to hand out frames held in memory as shallow copies, so a caller adding a column does not
+    change the cached frame
+    """
+    if isinstance(result, (pd.DataFrame, pd.Series)):
+        return result.copy(deep=False)
+    return result
+
+
+class MemoryCache:
+    """
+    In-process LRU tier in front of the `dir_cache` files. Entries are keyed by entry path, carry
+    the time their result was computed so each lookup can apply the caller's `refresh`, and are evicted
+    least recently used first once `max_bytes` or `max_entries` is exceeded.
+
+    Parameters
+    ----------
+    `max_bytes (int)`: budget of summed entry sizes, measured as size on disk, default=128MiB
+
+    `max_entries (int)`: maximum number of entries, default=1024
+
+    """
+
+    def __init__(self, max_bytes: int = 128 * 2**20, max_entries: int = 1024):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.nbytes = 0
+        # path: (result, size, created, expires)
+        self._entries: OrderedDict[str, Tuple[Any, int, float, Optional[float]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str, max_age: float) -> Tuple[bool, Any]:
+        """
+        Method to look up a result computed less than `max_age` seconds ago that has not expired
+
+        Parameters
+        ----------
+        `path (str)`: absolute path of cache entry, without suffix
+
+        `max_age (float)`: maximum age (seconds) of result
+
+        Return
+        ------
+        `Tuple[bool, Any]`: True and the result on a hit, otherwise False and None
+
+        """
+        hit, result, _ = self.lookup(path, max_age)
+        return hit, result
+
+    def lookup(
+        self, path: str, max_age: float, max_stale: float = 0
+    ) -> Tuple[bool, Any, bool]:
+        """
+        Method to look up a result, including one that expired less than `max_stale` seconds ago
+
+        Parameters
+        ----------
+        `path (str)`: absolute path of cache entry, without suffix
+
+        `max_age (float)`: maximum age (seconds) of a fresh result
+
+        `max_stale (float)`: time (seconds) after expiring a result can still be returned, default=0
+
+        Return
+        ------
+        `Tuple[bool, Any, bool]`: True, the result and whether it has expired on a hit, otherwise False, None and False
+
+        """
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return False, None, False
+            result, size, created, expires = entry
+            now = time.time()
+            staleness = now - created - max_age
+            if expires is not None:
+                staleness = max(staleness, now - expires)
+            if staleness >= max_stale:
+                del self._entries[path]
+                self.nbytes -= size
+                return False, None, False
+            self._entries.move_to_end(path)
+        return True, _shallow_copy(result), staleness >= 0
+
+    def put(
+        self,
+        path: str,
+        result: Any,
+        size: int,
+        created: Optional[float] = None,
+        expires: Optional[float] = None,
+    ) -> None:
+        """
+        Method to add a result, evicting least recently used entries to stay within budget
+
+        Parameters
+        ----------
+        `path (str)`: absolute path of cache entry, without suffix
+
+        `result (Any)`: result of cached function
+
+        `size (int)`: size of result in bytes
+
+        `created (float)`: time (seconds since epoch) result was computed, if None then set to now
+
+        `expires (float)`: time (seconds since epoch) result expires regardless of `max_age`, default=None
+
+        Return
+        ------
+        `None`
+
+        """
+        created = time.time() if created is None else created
+        with self._lock:
+            self._discard(path)
+            if size > self.max_bytes:
+                return
+            self._entries[path] = (result, size, created, expires)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes or len(self._entries) > self.max_entries:
+                _, (_, evicted, _, _) = self._entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def discard(self, path: str) -> None:
+        """
+        Method to drop one entry
+
+        Parameters
+        ----------
+        `path (str)`: absolute path of cache entry, without suffix
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            self._discard(path)
+
+    def _discard(self, path: str) -> None:
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self.nbytes -= entry[1]
+
+    def clear(self, cache_dir: Optional[str] = None) -> None:
+        """
+        Method to drop entries
+
+        Parameters
+        ----------
+        `cache_dir (str)`: only drop entries stored in this directory, if None then drops every entry, default=None
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            if cache_dir is None:
+                self._entries.clear()
+                self.nbytes = 0
+                return
+            folder = os.path.join(os.path.abspath(cache_dir), "")
+            for path in [path for path in self._entries if path.startswith(folder)]:
+                self._discard(path)
+
+
+memory_cache = MemoryCache()
+
+
+def get_memory_cache() -> MemoryCache:
     """
+    Function to get the process-wide in-memory cache tier
+
+    Return
+    ------
+    `MemoryCache`: memory tier shared by every `dir_cache` decorated function
+
+    """
+    return memory_cache
+
+
+def _storage_format(result: Any, fmt: str) -> str:
+    """
+    Function to choose how a result is stored, frames are columnar and numeric arrays are raw .npy files
+    when `fmt` allows it, anything else is pickled
+    """
+    if fmt == "pickle":
+        return "pickle"
+    if isinstance(result, pd.DataFrame) and pa is not None:
+        return "parquet" if fmt == "parquet" else "feather"
+    if isinstance(result, np.ndarray) and not result.dtype.hasobject:
+        return "numpy"
+    return "pickle"
+
+
+def _codec_available(codec: Optional[str]) -> bool:
+    return {None: True, "zstd": zstandard is not None, "lz4": lz4 is not None}[codec]
+
+
+def _compress(data: bytes, codec: Optional[str]) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    if codec == "lz4":
+        return lz4.frame.compress(data)
+    return data
+
+
+def _decompress(data: bytes, codec: Optional[str]) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "lz4":
+        return lz4.frame.decompress(data)
+    return data
+
+
+def _meta_path(base: str) -> str:
+    return base + ".meta.json"
+
+
+def _read_meta(base: str) -> Optional[Dict]:
+    """
+    Function to read the metadata of a cache entry
+
+    Parameters
+    ----------
+    `base (str)`: path of entry without suffix
+
+    Return
+    ------
+    `Dict`: metadata with the entry's file name, checksum, size and creation time, None if the entry does not exist
+
+    """
+    try:
+        with open(_meta_path(base), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(2**20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path: str, write: Callable[[str], None]) -> None:
+    """
+    Function to write a file through a temporary file in the same directory, moved over `path` once
+    complete so readers never see a partial file
+
+    Parameters
+    ----------
+    `path (str)`: path of file
+
+    `write (Callable[[str], None])`: function writing the contents to the path it is given
+
+    Return
+    ------
+    `None`
+
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextlib.contextmanager
+def _entry_lock(base: str, blocking: bool = True) -> Iterator[bool]:
+    """
+    Context manager holding an exclusive advisory lock on a cache entry, across threads and processes.
+    Yields whether the lock was acquired, which is always True when `blocking`.
+    """
+    with open(base + ".lock", "a+b") as f:
+        try:
+            if fcntl is not None:
+                flags = fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB)
+                fcntl.flock(f.fileno(), flags)
+            else:  # pragma: no cover - windows
+                f.seek(0)
+                mode = msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), mode, 1)
+                        break
+                    except OSError:
+                        if not blocking:
+                            raise
+        except OSError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:  # pragma: no cover - windows
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextlib.contextmanager
+def _entry_idle(base: str) -> Iterator[bool]:
+    """
+    Context manager taking an entry's lock without blocking, with the lock `batch_cache` writes its function's
+    entries under when there is one. Yields whether no other thread or process is writing the entry.
+    """
+    name = os.path.basename(base).rsplit("_", 1)[0]
+    batch_base = os.path.join(os.path.dirname(base), name + ".batch")
+    with contextlib.ExitStack() as stack:
+        idle = stack.enter_context(_entry_lock(base, blocking=False))
+        if idle and os.path.exists(batch_base + ".lock"):
+            idle = stack.enter_context(_entry_lock(batch_base, blocking=False))
+        yield idle
+
+
+def _record_hits(base: str, n: int = 1) -> None:
+    """
+    Function to add hits to an entry's `.hits` file, one byte per hit up to `MAX_HITS` with its
+    modification time marking the last access
+    """
+    try:
+        fd = os.open(base + ".hits", os.O_WRONLY | os.O_CREAT | os.O_APPEND)
+    except OSError:
+        return
+    try:
+        if os.fstat(fd).st_size < MAX_HITS:
+            os.write(fd, b"." * n)
+        else:
+            os.utime(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# hits served from memory or read in batches, written to disk at most once every `HITS_FLUSH_INTERVAL` per entry
+_pending_hits: Dict[str, List[float]] = {}
+_pending_hits_lock = threading.Lock()
+
+
+def _record_deferred_hits(bases: List[str]) -> None:
+    """
+    Function to count hits in memory, writing an entry's count to its `.hits` file when it was last written
+    over `HITS_FLUSH_INTERVAL` ago, so the first hit of an entry is written straight away
+    """
+    now = time.time()
+    due = []
+    with _pending_hits_lock:
+        for base in bases:
+            pending = _pending_hits.setdefault(base, [0, 0.0])
+            pending[0] += 1
+            if now - pending[1] >= HITS_FLUSH_INTERVAL:
+                due.append((base, int(pending[0])))
+                pending[0], pending[1] = 0, now
+        overflow = len(_pending_hits) > MAX_PENDING_HITS
+    for base, n in due:
+        _record_hits(base, n)
+    if overflow:
+        flush_hits()
+
+
+def flush_hits() -> None:
+    """
+    Function to write hits served from memory to the `.hits` files, called automatically on interpreter exit
+
+    Return
+    ------
+    `None`
+
+    """
+    with _pending_hits_lock:
+        pending = [(base, int(n)) for base, (n, _) in _pending_hits.items() if n]
+        _pending_hits.clear()
+    for base, n in pending:
+        if os.path.exists(_meta_path(base)):
+            _record_hits(base, n)
+
+
+atexit.register(flush_hits)
+
+
+def _write_entry(
+    base: str,
+    result: Any,
+    fmt: str,
+    ttl: Optional[float] = MISSING,
+    function: Optional[str] = None,
+    compression: Optional[str] = None,
+    compress_min_bytes: int = 0,
+    memory_map: bool = False,
+) -> Dict:
+    """
+    Function to store a result atomically along with its metadata, falling back to pickle if it cannot be
+    stored in a columnar format
 
     Parameters
     ----------
-    `refresh (int)`: time (minutes) to check since last save, default=30
+    `base (str)`: path of entry without suffix
+
+    `result (Any)`: result of cached function
+
+    `fmt (str)`: one of `FORMATS`
+
+    `ttl (float)`: time (minutes) an expiry policy gave the entry, None to keep it forever, not stored if omitted
+
+    `function (str)`: qualified name of the cached function, default=None
+
+    `compression (str)`: codec to compress the entry with, one of `CODECS`, default=None
+
+    `compress_min_bytes (int)`: only compress results at least this large (bytes), default=0
+
+    `memory_map (bool)`: entry is read memory mapped, feather and .npy entries are left uncompressed so they
+    can be, default=False
+
+    Return
+    ------
+    `Dict`: metadata of entry written
+
+    """
+    if not _codec_available(compression):
+        # codecs are optional dependencies, store uncompressed without them
+        compression = None
+    codec = None
+
+    def _codec_for(size: int) -> Optional[str]:
+        return compression if size >= compress_min_bytes else None
+
+    def _write_pickle(path: str) -> None:
+        nonlocal codec
+        data = pickle.dumps(result)
+        codec = _codec_for(len(data))
+        with open(path, "wb") as f:
+            f.write(_compress(data, codec))
+
+    def _write_numpy(path: str) -> None:
+        nonlocal codec
+        codec = None if memory_map else _codec_for(result.nbytes)
+        with open(path, "wb") as f:
+            if codec is None:
+                np.save(f, result, allow_pickle=False)
+            else:
+                buffer = io.BytesIO()
+                np.save(buffer, result, allow_pickle=False)
+                f.write(_compress(buffer.getvalue(), codec))
+
+    def _write_feather(path: str) -> None:
+        nonlocal codec
+        # uncompressed unless asked for, so the file can be memory mapped
+        size = result.memory_usage().sum()
+        codec = None if memory_map else _codec_for(size)
+        table = pa.Table.from_pandas(result, preserve_index=None)
+        feather.write_feather(table, path, compression=codec or "uncompressed")
+
+    def _write_parquet(path: str) -> None:
+        nonlocal codec
+        codec = _codec_for(result.memory_usage().sum())
+        table = pa.Table.from_pandas(result, preserve_index=None)
+        # parquet pages are compressed with snappy by default
+        parquet.write_table(table, path, compression=codec or "snappy")
+
+    writers = {
+        "feather": _write_feather,
+        "parquet": _write_parquet,
+        "numpy": _write_numpy,
+        "pickle": _write_pickle,
+    }
+    storage = _storage_format(result, fmt)
+    path = base + SUFFIXES[storage]
+    try:
+        _atomic_write(path, writers[storage])
+    except (pa.ArrowException if pa is not None else (), TypeError, ValueError):
+        if storage == "pickle":
+            raise
+        # e.g. mixed type object columns or non string column names
+        storage, path = "pickle", base + SUFFIXES["pickle"]
+        _atomic_write(path, _write_pickle)
+
+    meta = {
+        "function": function,
+        "file": os.path.basename(path),
+        "format": storage,
+        "codec": codec,
+        "size": os.path.getsize(path),
+        "sha256": _checksum(path),
+        "created": time.time(),
+    }
+    if ttl is not MISSING:
+        meta["ttl"] = ttl
+
+    def _write_meta(path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(meta, f)
+
+    _atomic_write(_meta_path(base), _write_meta)
+
+    # remove an older entry stored in another format
+    for suffix in SUFFIXES.values():
+        if base + suffix != path and os.path.exists(base + suffix):
+            os.remove(base + suffix)
+    return meta
+
+
+def _remove_entry(base: str) -> bool:
+    """
+    Function to delete an entry's files and drop it from memory, unless another thread or process is writing it
+
+    Parameters
+    ----------
+    `base (str)`: path of entry without suffix
+
+    Return
+    ------
+    `bool`: whether the entry was removed
+
+    """
+    with _entry_idle(base) as idle:
+        if not idle:
+            return False
+        # metadata first, so readers see a miss rather than a missing file
+        paths = [_meta_path(base)] + [base + suffix for suffix in SUFFIXES.values()]
+        for path in paths + [base + ".hits"]:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+    memory_cache.discard(base)
+    with _pending_hits_lock:
+        _pending_hits.pop(base, None)
+    return True
+
+
+def _read_entry(
+    path: str,
+    columns: Optional[List[str]] = None,
+    memory_map: bool = False,
+    codec: Optional[str] = None,
+) -> Any:
+    """
+    Function to load a stored result
+
+    Parameters
+    ----------
+    `path (str)`: path of entry file
+
+    `columns (List[str])`: columns to load from a stored frame, if None then loads every column, default=None
+
+    `memory_map (bool)`: memory map feather, parquet and .npy files instead of reading them into memory, default=False
+
+    `codec (str)`: codec the file was compressed with, columnar files are decompressed by pyarrow, default=None
+
+    Return
+    ------
+    `Any`: stored result
+
+    """
+    if path.endswith(SUFFIXES["feather"]):
+        table = feather.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
+    if path.endswith(SUFFIXES["parquet"]):
+        table = parquet.read_table(path, columns=columns, memory_map=memory_map)
+        return table.to_pandas()
+    if path.endswith(SUFFIXES["numpy"]) and codec is None:
+        return np.load(path, mmap_mode="r" if memory_map else None)
+    with open(path, "rb") as f:
+        data = _decompress(f.read(), codec)
+    if path.endswith(SUFFIXES["numpy"]):
+        return np.load(io.BytesIO(data))
+    result = pickle.loads(data)
+    return result[columns] if columns is not None else result
+
+
+def _load_entry(
+    base: str,
+    meta: Dict,
+    columns: Optional[List[str]] = None,
+    memory_map: bool = False,
+    verify: bool = True,
+) -> Tuple[bool, Any]:
+    """
+    Function to load an entry, checking it against its checksum first
+
+    Parameters
+    ----------
+    `base (str)`: path of entry without suffix
+
+    `meta (Dict)`: metadata of entry
+
+    `columns (List[str])`: columns to load from a stored frame, if None then loads every column, default=None
+
+    `memory_map (bool)`: memory map feather, parquet and .npy files, default=False
+
+    `verify (bool)`: compare the file against the checksum in `meta`, default=True
+
+    Return
+    ------
+    `Tuple[bool, Any]`: True and the result if the entry is intact, otherwise False and None
+
+    """
+    path = os.path.join(os.path.dirname(base), meta["file"])
+    try:
+        if verify and _checksum(path) != meta["sha256"]:
+            return False, None
+        return True, _read_entry(path, columns, memory_map, meta.get("codec"))
+    except Exception:
+        # missing, partially replaced or unreadable entries are recomputed
+        return False, None
+
+
+def _enforce_budget(cache_dir: str, keep: List[str], written: int) -> None:
+    """
+    Function to prune `cache_dir` back within the budget set by `set_cache_budget`, if any, after writing
+    `written` bytes to it
+    """
+    # imported here as the cache manager is built on this module
+    from FPL.utils.cache_manager import enforce_budget
+
+    enforce_budget(cache_dir, keep=keep, written=written)
+
+
+def _entry_bytes(base: str, meta: Dict) -> int:
+    """
+    Function to get the bytes an entry takes on disk, its data and metadata
+    """
+    try:
+        return meta["size"] + os.path.getsize(_meta_path(base))
+    except OSError:
+        return meta["size"]
+
+
+# policy mapping the bound arguments of a call to the time (minutes) to keep its entry, None to keep it forever
+ExpiryPolicy = Callable[[Dict[str, Any]], Optional[float]]
+
+
+def _staleness(meta: Dict, refresh: float | ExpiryPolicy) -> float:
+    """
+    Function to get the time (seconds) since an entry expired for a decorator's `refresh`, negative while it
+    is still fresh
+    """
+    age = time.time() - meta["created"]
+    if not callable(refresh):
+        return age - refresh * 60
+    # entries written with a fixed refresh carry no policy ttl
+    if "ttl" not in meta:
+        return float("inf")
+    if meta["ttl"] is None:
+        return float("-inf")
+    return age - meta["ttl"] * 60
+
+
+def _is_fresh(meta: Dict, refresh: float | ExpiryPolicy) -> bool:
+    """
+    Function to check whether an entry is still valid for a decorator's `refresh`
+    """
+    return _staleness(meta, refresh) < 0
+
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+# entries being refreshed in the background
+_refreshing: Set[str] = set()
+_refreshing_lock = threading.Lock()
+
+
+def _refresh_in_background(base: str, refresh: Callable[[], None]) -> None:
+    """
+    Function to run `refresh` on a background thread, unless `base` is already being refreshed
+    """
+    global _refresh_executor
+
+    def _run():
+        try:
+            refresh()
+        except Exception as e:
+            # the stale entry is kept and the next call tries again
+            warnings.warn(f"background refresh of {base} failed: {e!r}", RuntimeWarning)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(base)
+
+    with _refreshing_lock:
+        if base in _refreshing:
+            return
+        _refreshing.add(base)
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(
+                max_workers=4, thread_name_prefix="dir_cache-refresh"
+            )
+        _refresh_executor.submit(_run)
+
+
+def wait_for_refreshes(timeout: Optional[float] = None) -> bool:
+    """
+    Function to wait for background refreshes started by `dir_cache(max_stale=...)` to finish
+
+    Parameters
+    ----------
+    `timeout (float)`: maximum time (seconds) to wait, if None then waits until they finish, default=None
+
+    Return
+    ------
+    `bool`: True if no refresh is running
+
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _refreshing_lock:
+            if not _refreshing:
+                return True
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        time.sleep(0.01)
+
+
+def dir_cache(
+    refresh: float | ExpiryPolicy = 30,
+    cache_dir: str = "./.cache",
+    version: int = 0,
+    memory: bool = True,
+    fmt: str = "auto",
+    columns: Optional[List[str]] = None,
+    memory_map: bool = False,
+    verify: bool = True,
+    max_stale: Optional[float] = None,
+    compression: Optional[str] = None,
+    compress_min_bytes: int = 2**16,
+) -> Callable:
+    """
+
+    Parameters
+    ----------
+    `refresh (float | ExpiryPolicy)`: time (minutes) to check since last save, or a policy called with the
+    arguments of a call when its result is computed, returning the time (minutes) to keep it or None to
+    keep it forever, e.g. `GameweekTTL`, default=30
 
     `cache_dir (str)`: directory to cache results, defualt="./.cache"
 
+    `version (int)`: version of the function's result format, bump it when the result changes shape so
+    old entries are ignored, default=0
+
+    `memory (bool)`: keep results in the process-wide `MemoryCache` as well, so hot entries are served with
+    no I/O or unpickling. Results from memory are the cached objects themselves (frames are shallow
+    copies), so do not mutate them in place, default=True
+
+    `fmt (str)`: storage format, one of "auto", "pickle", "feather" or "parquet". "auto" stores DataFrame
+    results as uncompressed feather (Arrow IPC) files when pyarrow is installed and numeric arrays as .npy
+    files, anything else is pickled, default="auto"
+
+    `columns (List[str])`: only return these columns of a DataFrame result. Feather and parquet entries
+    only read these columns from disk, default=None
+
+    `memory_map (bool)`: memory map feather, parquet and .npy entries on read, so only the pages a caller
+    touches are loaded. Arrays are returned as read-only memory maps, default=False
+
+    `verify (bool)`: check entries against the checksum stored when they were written before loading them,
+    entries that fail are recomputed, default=True
+
+    `max_stale (float)`: time (minutes) after expiring that an entry is still returned straight away while it
+    is recomputed on a background thread, calls after that wait for the result, if None then expired
+    entries are always waited for, default=None
+
+    `compression (str)`: codec to compress entries with, "zstd", "lz4" or None. Pickled and .npy entries are
+    compressed whole, feather and parquet entries use pyarrow's buffer compression. Feather and .npy entries
+    read with `memory_map` are never compressed. Stored uncompressed if the codec's package (zstandard or
+    lz4) is not installed, default=None
+
+    `compress_min_bytes (int)`: only compress results at least this large (bytes), default=64KiB
+
     Return
     ------
     `Callable`
 
+    Each call is cached under its own file, keyed by the function's qualified name and its arguments
+    (see `cache_key`), so calls with different arguments keep separate entries.
+
+    Entries are safe to share between processes. Files are written to a temporary file and renamed into
+    place with a metadata file holding their checksum, and on a miss one process recomputes the entry under
+    an advisory lock while the others wait for it and read its result.
+
+    While a cassette is active (see `use_cassette`) the cache is bypassed, so every response is recorded and
+    replayed responses never mix with live entries.
+
     """
 
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt argument must be one of {FORMATS}")
+    if compression not in CODECS:
+        raise ValueError(f"compression argument must be one of {CODECS}")
+
+    policy = refresh if callable(refresh) else None
+    max_age = float("inf") if policy is not None else refresh * 60
+    stale_limit = 0 if max_stale is None else max_stale * 60
+
+    def _project(result: Any) -> Any:
+        if columns is not None and isinstance(result, pd.DataFrame):
+            return result[columns]
+        return result
+
     def _wrapper_func(func):
+        @functools.wraps(func)
         def _wrapper_inner(*args, **kwargs):
-            os.makedirs(cache_dir, exist_ok=True)
-            cache_file = f"{cache_dir}/{func.__name__}_result.pkl"
+            if get_cassette() is not None:
+                return _project(func(*args, **kwargs))
+
+            key = cache_key(func, args, kwargs, version)
+            base = os.path.abspath(f"{cache_dir}/{func.__name__}_{key[:20]}")
+            name = f"{func.__module__}.{func.__qualname__}"
+
+            def _load() -> Tuple[bool, Any, Optional[Dict], bool]:
+                meta = _read_meta(base)
+                if meta is None:
+                    return False, None, None, False
+                staleness = _staleness(meta, refresh)
+                if staleness >= stale_limit:
+                    return False, None, meta, False
+                start = time.perf_counter()
+                hit, result = _load_entry(base, meta, columns, memory_map, verify)
+                if hit:
+                    elapsed = time.perf_counter() - start
+                    cache_stats.record(
+                        name, bytes_read=meta["size"], deserialize_time=elapsed
+                    )
+                return hit, result, meta, staleness >= 0
+
+            def _compute(refreshing: bool = False) -> Tuple[Any, Dict]:
+                start = time.perf_counter()
+                result = func(*args, **kwargs)
+                elapsed = time.perf_counter() - start
+                ttl = MISSING
+                if policy is not None:
+                    ttl = policy(_bind_arguments(func, args, kwargs))
+                meta = _write_entry(
+                    base,
+                    result,
+                    fmt,
+                    ttl,
+                    name,
+                    compression,
+                    compress_min_bytes,
+                    memory_map,
+                )
+                cache_stats.record(
+                    name,
+                    misses=int(not refreshing),
+                    refreshes=int(refreshing),
+                    recompute_time=elapsed,
+                    bytes_written=meta["size"],
+                )
+                return result, meta
+
+            def _remember(result: Any, meta: Dict) -> None:
+                expires = None
+                if meta.get("ttl") is not None:
+                    expires = meta["created"] + meta["ttl"] * 60
+                memory_cache.put(base, result, meta["size"], meta["created"], expires)
+
+            def _revalidate() -> None:
+                written = 0
+                with _entry_lock(base):
+                    meta = _read_meta(base)
+                    if meta is not None and _is_fresh(meta, refresh):
+                        # refreshed by another process
+                        hit, result = _load_entry(base, meta, None, memory_map, verify)
+                    else:
+                        (result, meta), hit = _compute(refreshing=True), True
+                        written = _entry_bytes(base, meta)
+                if written:
+                    _enforce_budget(cache_dir, [base], written)
+                if memory and hit:
+                    _remember(result, meta)
+
+            if memory:
+                hit, result, stale = memory_cache.lookup(base, max_age, stale_limit)
+                if hit:
+                    _record_deferred_hits([base])
+                    cache_stats.record(
+                        name, hits=1, memory_hits=1, stale_hits=int(stale)
+                    )
+                    if stale:
+                        _refresh_in_background(base, _revalidate)
+                    return _project(result)
 
             # Try to read from cache
-            if os.path.exists(cache_file) and (
-                time.time() - os.path.getctime(cache_file)
-            ) < (refresh * 60):
-                # modification_time = os.path.getmtime(cache_file)
-                with open(cache_file, "rb") as f:
-                    result = pickle.load(f)
+            os.makedirs(cache_dir, exist_ok=True)
+            hit, result, meta, stale = _load()
+            if not hit:
+                with _entry_lock(base):
+                    # another process may have written the entry while we waited
+                    hit, result, meta, stale = _load()
+                    if not hit:
+                        # If cache doesn't exist, run the function and save the result
+                        result, meta = _compute()
+
+            if hit:
+                _record_hits(base)
+                cache_stats.record(name, hits=1, stale_hits=int(stale))
+                if stale:
+                    _refresh_in_background(base, _revalidate)
+                if columns is not None:
+                    # a projected frame is not the full entry, keep it out of memory
+                    return result
             else:
-                # If cache doesn't exist, run the function and save the result
-                result = func(*args, **kwargs)
-                with open(cache_file, "wb") as f:
-                    pickle.dump(result, f)
-            return result
+                _enforce_budget(cache_dir, [base], _entry_bytes(base, meta))
+
+            if memory:
+                _remember(result, meta)
+                return _project(_shallow_copy(result))
+            return _project(result)
 
         return _wrapper_inner
 
     return _wrapper_func
 
 
-def clear_dir_cache(cache_dir: str = "./.cache"):
+def batch_cache(
+    refresh: float | ExpiryPolicy = 30,
+    cache_dir: str = "./.cache",
+    version: int = 0,
+    memory: bool = False,
+    verify: bool = True,
+    compression: Optional[str] = None,
+    compress_min_bytes: int = 2**16,
+) -> Callable:
+    """
+    Decorator caching a function of a list of keys, such as ids, per key. The function's first argument is
+    the list of keys and it returns one result per key in the same order. On a call only the keys missing
+    from the cache are passed to the function and the result is assembled from the cached and new results.
+
+    Parameters
+    ----------
+    `refresh (float | ExpiryPolicy)`: time (minutes) to check since last save, or a policy called with the
+    arguments of a key's call, its first argument being the key, see `dir_cache`, default=30
+
+    `cache_dir (str)`: directory to cache results, defualt="./.cache"
+
+    `version (int)`: version of the function's result format, see `dir_cache`, default=0
+
+    `memory (bool)`: keep each key's result in the `MemoryCache` as well. Off by default as batches of
+    thousands of keys would evict every other entry, default=False
+
+    `verify (bool)`: check entries against their checksum before loading them, default=True
+
+    `compression (str)`: codec to compress entries with, see `dir_cache`, default=None
+
+    `compress_min_bytes (int)`: only compress results at least this large (bytes), default=64KiB
+
+    Return
+    ------
+    `Callable`
+
+    Each key is stored as its own entry in the `dir_cache` layout, keyed by the function's qualified name, the
+    key and the remaining arguments, so overlapping calls share entries. The results of a batch are written
+    under one lock of the function's folder rather than a lock per key, which `prune` and `compact` respect, hits
+    are counted in memory and written to the `.hits` files periodically (see `flush_hits`) and a size budget is
+    checked once per batch.
+    The decorated function's `lookup` method takes the same arguments and returns a dictionary of the keys
+    that are cached, without calling the function. Like `dir_cache`, the cache is bypassed while a cassette is active.
+
+    """
+    if compression not in CODECS:
+        raise ValueError(f"compression argument must be one of {CODECS}")
+
+    policy = refresh if callable(refresh) else None
+    max_age = float("inf") if policy is not None else refresh * 60
+
+    def _wrapper_func(func):
+        name = f"{func.__module__}.{func.__qualname__}"
+        lock_base = os.path.abspath(f"{cache_dir}/{func.__name__}.batch")
+
+        def _base(key, args: Tuple, kwargs: Dict) -> str:
+            # entries are keyed as the batch function called with a single key
+            digest = cache_key(func, (key,) + args, kwargs, version)
+            return os.path.abspath(f"{cache_dir}/{func.__name__}_{digest[:20]}")
+
+        def _read(bases: Dict) -> Dict:
+            results, bytes_read, elapsed, memory_hits = {}, 0, 0.0, 0
+            for key, base in bases.items():
+                if memory:
+                    hit, result = memory_cache.get(base, max_age)
+                    if hit:
+                        results[key] = result
+                        memory_hits += 1
+                        continue
+                meta = _read_meta(base)
+                if meta is None or _staleness(meta, refresh) >= 0:
+                    continue
+                start = time.perf_counter()
+                hit, result = _load_entry(base, meta, verify=verify)
+                if hit:
+                    elapsed += time.perf_counter() - start
+                    bytes_read += meta["size"]
+                    results[key] = result
+                    if memory:
+                        _remember(base, result, meta)
+            _record_deferred_hits([bases[key] for key in results])
+            cache_stats.record(
+                name,
+                hits=len(results),
+                memory_hits=memory_hits,
+                bytes_read=bytes_read,
+                deserialize_time=elapsed,
+            )
+            return results
+
+        def _remember(base: str, result: Any, meta: Dict) -> None:
+            expires = None
+            if meta.get("ttl") is not None:
+                expires = meta["created"] + meta["ttl"] * 60
+            memory_cache.put(base, result, meta["size"], meta["created"], expires)
+
+        def _write(bases: Dict, results: Dict, args: Tuple, kwargs: Dict) -> None:
+            written = 0
+            with _entry_lock(lock_base):
+                for key, base in bases.items():
+                    ttl = MISSING
+                    if policy is not None:
+                        ttl = policy(_bind_arguments(func, (key,) + args, kwargs))
+                    meta = _write_entry(
+                        base,
+                        results[key],
+                        "auto",
+                        ttl,
+                        name,
+                        compression,
+                        compress_min_bytes,
+                    )
+                    written += _entry_bytes(base, meta)
+                    if memory:
+                        _remember(base, results[key], meta)
+            cache_stats.record(name, bytes_written=written)
+            _enforce_budget(cache_dir, list(bases.values()), written)
+
+        @functools.wraps(func)
+        def _wrapper_inner(keys: List, *args, **kwargs):
+            if get_cassette() is not None:
+                unique = list(dict.fromkeys(keys))
+                results = dict(zip(unique, func(unique, *args, **kwargs)))
+                return [results[key] for key in keys]
+
+            os.makedirs(cache_dir, exist_ok=True)
+            bases = {key: _base(key, args, kwargs) for key in dict.fromkeys(keys)}
+            results = _read(bases)
+
+            missing = [key for key in bases if key not in results]
+            if missing:
+                start = time.perf_counter()
+                fetched = dict(zip(missing, func(missing, *args, **kwargs)))
+                elapsed = time.perf_counter() - start
+                cache_stats.record(name, misses=len(missing), recompute_time=elapsed)
+                _write({key: bases[key] for key in missing}, fetched, args, kwargs)
+                results.update(fetched)
+            return [results[key] for key in keys]
+
+        def _lookup(keys: List, *args, **kwargs) -> Dict:
+            if get_cassette() is not None or not os.path.isdir(cache_dir):
+                return {}
+            bases = {key: _base(key, args, kwargs) for key in dict.fromkeys(keys)}
+            return _read(bases)
+
+        _wrapper_inner.lookup = _lookup
+        return _wrapper_inner
+
+    return _wrapper_func
+
+
+def clear_dir_cache(cache_dir: str = "./.cache", confirm: bool = True):
     """
     function to clear cache folder
 
@@ -52,6 +1233,8 @@ def clear_dir_cache(cache_dir: str = "./.cache"):
     ----------
     `cache_dir (str)`: folder path to cache directory
 
+    `confirm (bool)`: ask before deleting files over 1MB, set False to delete without prompting, default=True
+
     Return
     ------
     `None`
@@ -60,9 +1243,11 @@ def clear_dir_cache(cache_dir: str = "./.cache"):
     if not os.path.isdir(cache_dir):
         raise ValueError(f"{cache_dir} is not a directory.")
 
+    memory_cache.clear(cache_dir)
+
     for file in os.listdir(cache_dir):
         file_path = os.path.join(cache_dir, file)
-        if (file_size := os.path.getsize(file_path)) > 10**6:
+        if confirm and (file_size := os.path.getsize(file_path)) > 10**6:
             del_flag: str = input(
                 f"""Are you sure you want to delete {file_path}? (file size={file_size/1000:.0f}KB) (Yes/No/All)\n
                     Choose 'All' to delete for all files \n """
@@ -0,0 +1,198 @@
+"""
+Record/replay archive of API responses, keyed by url
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zipfile
+from typing import Dict, Iterator, Optional
+
+MODES = ("record", "replay")
+
+
+class Cassette:
+    """
+    Archive of raw response bodies stored in a compressed zip file. In record mode every response passing
+    through `fetch_request`/`fetch_request_async` is added to the archive, which is written on `close`. In
+    replay mode responses are served from the archive and no network request is made.
+
+    Parameters
+    ----------
+    `path (str)`: path of zip archive
+
+    `mode (str)`: one of "record" or "replay", default="replay"
+
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in MODES:
+            raise ValueError(f"mode argument must be one of {MODES}")
+
+        self.path = path
+        self.mode = mode
+        self.recorded_at: Optional[datetime.datetime] = None
+
+        self._bodies: Dict[str, bytes] = {}
+        self._members: Dict[str, str] = {}
+        self._archive: Optional[zipfile.ZipFile] = None
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            if not os.path.exists(path):
+                raise ValueError(f"{path} does not exist, record a cassette first.")
+            self._archive = zipfile.ZipFile(path, "r")
+            index = json.loads(self._archive.read("index.json"))
+            self._members = index["urls"]
+            self.recorded_at = datetime.datetime.fromisoformat(index["recorded_at"])
+        else:
+            self.recorded_at = datetime.datetime.now(datetime.timezone.utc)
+
+    def __len__(self) -> int:
+        return len(self._members) + len(self._bodies)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._members or url in self._bodies
+
+    def __enter__(self) -> "Cassette":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def recording(self) -> bool:
+        """`bool`: True if responses are being recorded"""
+        return self.mode == "record"
+
+    @property
+    def replaying(self) -> bool:
+        """`bool`: True if responses are served from the archive"""
+        return self.mode == "replay"
+
+    def get(self, url: str) -> bytes:
+        """
+        Method to get the recorded body of url
+
+        Parameters
+        ----------
+        `url (str)`: url of request
+
+        Return
+        ------
+        `bytes`: raw response body, raises KeyError if url has not been recorded
+
+        """
+        with self._lock:
+            if url in self._bodies:
+                return self._bodies[url]
+            if self._archive is None or url not in self._members:
+                raise KeyError(url)
+            return self._archive.read(self._members[url])
+
+    def put(self, url: str, body: bytes) -> None:
+        """
+        Method to record the body of a response for url
+
+        Parameters
+        ----------
+        `url (str)`: url of request
+
+        `body (bytes)`: raw response body
+
+        Return
+        ------
+        `None`
+
+        """
+        if not self.recording:
+            raise ValueError("Cassette is not in record mode.")
+        with self._lock:
+            self._bodies[url] = body
+
+    def close(self) -> None:
+        """
+        Method to close the archive, writing recorded responses to `path` when recording
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            if self.recording and self._bodies:
+                self._write()
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+
+    def _write(self) -> None:
+        """
+        Method to write recorded responses to a temporary file and move it over `path`
+        """
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        os.close(fd)
+        try:
+            members = {}
+            with zipfile.ZipFile(tmp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for url, body in self._bodies.items():
+                    name = f"responses/{hashlib.sha1(url.encode()).hexdigest()}.json"
+                    archive.writestr(name, body)
+                    members[url] = name
+                index = {"recorded_at": self.recorded_at.isoformat(), "urls": members}
+                archive.writestr("index.json", json.dumps(index))
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+_cassette: Optional[Cassette] = None
+
+
+def get_cassette() -> Optional[Cassette]:
+    """
+    Function to get the active cassette
+
+    Return
+    ------
+    `Cassette`: cassette used by the fetch functions, None if no cassette is active
+
+    """
+    return _cassette
+
+
+@contextlib.contextmanager
+def use_cassette(path: str, mode: str = "replay") -> Iterator[Cassette]:
+    """
+    Context manager to record or replay every request made by the fetch functions
+
+    Parameters
+    ----------
+    `path (str)`: path of zip archive
+
+    `mode (str)`: one of "record" or "replay", default="replay"
+
+    Example
+    -------
+        with use_cassette("./.cassettes/gw10.zip", mode="record"):
+            FPLReport().full_report(user_id)
+
+    `dir_cache` and `batch_cache` are bypassed while a cassette is active, so every response is recorded and a
+    replay neither reads nor writes the cache of live runs.
+
+    """
+    global _cassette
+    cassette = Cassette(path, mode=mode)
+    previous, _cassette = _cassette, cassette
+    try:
+        yield cassette
+    finally:
+        _cassette = previous
+        cassette.close()
@@ -0,0 +1,582 @@
+"""
+Process-wide asynchronous client shared by the fetch helpers
+"""
+
+import asyncio
+import atexit
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Coroutine, Deque, Iterable, Iterator, List, Optional
+
+from aiohttp import ClientSession, TCPConnector
+
+from FPL.utils.concurrency import AdaptiveLimiter
+from FPL.utils.fetch import (
+    MAX_ATTEMPTS,
+    MAX_CONCURRENCY,
+    Decoder,
+    JSONObject,
+    RateLimiter,
+    fetch_request_async,
+    get_decoder,
+    ssl_context,
+)
+from FPL.utils.scheduler import RequestScheduler
+
+
+class FPLClient:
+    """
+    Long-lived client that owns one event loop, running on a background thread, and one keep-alive
+    aiohttp connection pool. Synchronous code submits coroutines to the loop so sessions, connections
+    and DNS lookups are reused between calls instead of being set up for every `asyncio.run`.
+
+    Every request goes through one `RequestScheduler` queue, so callers on different threads share the
+    concurrency limit in priority order and identical urls in flight are only requested once.
+
+    Parameters
+    ----------
+    `max_concurrency (int)`: maximum number of requests in flight across all callers, default=50
+
+    `adaptive (bool)`: adapt the number of requests in flight to throttling signals between `min_concurrency`
+    and `max_concurrency` (see `AdaptiveLimiter`), if False then `max_concurrency` is a fixed limit, default=True
+
+    `min_concurrency (int)`: lowest number of requests in flight when adapting, default=1
+
+    `breaker_threshold (int)`: consecutive throttling signals that pause every request for `cooldown`
+    seconds, never pauses if None, default=20
+
+    `cooldown (float)`: time (seconds) requests are paused once the breaker opens, default=30
+
+    `rate (float)`: maximum number of requests started per second, on top of the concurrency limit, for a hard
+    quota. If None then throughput is only bounded by the concurrency limit, default=None
+
+    `limit (int)`: maximum number of open connections in the pool, default=100
+
+    `limit_per_host (int)`: maximum number of open connections to a single host, default=50
+
+    `dns_ttl (int)`: time (seconds) to cache DNS lookups, default=300
+
+    `keepalive_timeout (float)`: time (seconds) to keep idle connections open, default=30
+
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        adaptive: bool = True,
+        min_concurrency: int = 1,
+        breaker_threshold: Optional[int] = 20,
+        cooldown: float = 30.0,
+        rate: Optional[float] = None,
+        limit: int = 100,
+        limit_per_host: int = MAX_CONCURRENCY,
+        dns_ttl: int = 300,
+        keepalive_timeout: float = 30,
+    ):
+        if max_concurrency < 1:
+            raise ValueError(
+                f"max_concurrency must be at least 1. Current Value: {max_concurrency}"
+            )
+
+        if adaptive and not 1 <= min_concurrency <= max_concurrency:
+            raise ValueError(
+                f"min_concurrency must be between 1 and max_concurrency. Current Value: {min_concurrency}"
+            )
+
+        self.max_concurrency = max_concurrency
+        self.adaptive = adaptive
+        self.min_concurrency = min_concurrency
+        self.breaker_threshold = breaker_threshold
+        self.cooldown = cooldown
+        self.rate = rate
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[ClientSession] = None
+        self._controller: Optional[AdaptiveLimiter] = None
+        self._scheduler: Optional[RequestScheduler] = None
+        self._limiter: Optional[RateLimiter] = None
+
+    def __enter__(self) -> "FPLClient":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @property
+    def closed(self) -> bool:
+        """`bool`: True if the client has no running event loop"""
+        return self._loop is None
+
+    @property
+    def scheduler(self) -> Optional[RequestScheduler]:
+        """`RequestScheduler`: request queue of the current session, None before the first request"""
+        return self._scheduler
+
+    @property
+    def controller(self) -> Optional[AdaptiveLimiter]:
+        """`AdaptiveLimiter`: concurrency limit of the current session, None before the first request"""
+        return self._controller
+
+    def _new_controller(self) -> AdaptiveLimiter:
+        """
+        Method to create the concurrency limit for a new session
+        """
+        if not self.adaptive:
+            return AdaptiveLimiter(
+                initial=self.max_concurrency,
+                min_limit=self.max_concurrency,
+                max_limit=self.max_concurrency,
+                failure_threshold=self.breaker_threshold,
+                cooldown=self.cooldown,
+            )
+        return AdaptiveLimiter(
+            min_limit=self.min_concurrency,
+            max_limit=self.max_concurrency,
+            failure_threshold=self.breaker_threshold,
+            cooldown=self.cooldown,
+        )
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        """
+        Method to start the background event loop if it is not already running
+
+        Return
+        ------
+        `asyncio.AbstractEventLoop`: running event loop owned by the client
+
+        """
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="FPLClient", daemon=True
+                )
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def run(self, coro: Coroutine):
+        """
+        Method to run a coroutine on the client's event loop and block until it finishes
+
+        Parameters
+        ----------
+        `coro (Coroutine)`: coroutine to run
+
+        Return
+        ------
+        `Any`: result of the coroutine
+
+        """
+        loop = self._start()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError(
+                "FPLClient.run cannot be called from the client's own event loop, await the coroutine instead."
+            )
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def _get_session(self) -> ClientSession:
+        """
+        Coroutine to get the shared session, creating it and the connection pool on first use
+        """
+        if self._session is None or self._session.closed:
+            connector = TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+                ssl=ssl_context,
+            )
+            self._session = ClientSession(connector=connector)
+            self._controller = self._new_controller()
+            self._scheduler = RequestScheduler()
+            self._limiter = RateLimiter(self.rate) if self.rate is not None else None
+        return self._session
+
+    async def fetch_async(
+        self,
+        url: str,
+        max_attempts: int = MAX_ATTEMPTS,
+        decoder: Optional[Decoder] = None,
+        raw: bool = False,
+        priority: Optional[int] = None,
+    ) -> JSONObject | bytes:
+        """
+        Coroutine to fetch a single url through the shared pool, must run on the client's loop
+
+        Parameters
+        ----------
+        `url (str)`: url to send request
+
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `decoder (Decoder)`: callable to decode the response body, if None then uses `get_decoder()`, default=None
+
+        `raw (bool)`: return the undecoded response body, default=False
+
+        `priority (int)`: priority of requests in the client's queue, lower values are served first, if None then set from each url's endpoint (see `default_priority`), default=None
+
+        Return
+        ------
+        `JSONObject | bytes`: JSON file of request object, or its raw bytes if `raw` is True
+
+        """
+        session = await self._get_session()
+
+        def _fetch(priority: int):
+            return fetch_request_async(
+                url,
+                session,
+                max_attempts=max_attempts,
+                limiter=self._limiter,
+                raw=True,
+                controller=self._controller,
+                priority=priority,
+            )
+
+        # callers asking for the same url share one request, each decodes its own copy
+        body = await self._scheduler.submit(url, _fetch, priority)
+        if raw:
+            return body
+        return (decoder or get_decoder())(body)
+
+    async def fetch_all_async(
+        self,
+        urls: List[str],
+        max_attempts: int = MAX_ATTEMPTS,
+        decoder: Optional[Decoder] = None,
+        raw: bool = False,
+        priority: Optional[int] = None,
+    ) -> List[JSONObject | bytes]:
+        """
+        Coroutine to fetch a list of urls through the shared pool, must run on the client's loop
+
+        Parameters
+        ----------
+        `urls (List[str])`: urls to send requests
+
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `decoder (Decoder)`: callable to decode each response body, if None then uses `get_decoder()`, default=None
+
+        `raw (bool)`: return the undecoded response bodies, default=False
+
+        `priority (int)`: priority of requests in the client's queue, lower values are served first, if None then set from each url's endpoint (see `default_priority`), default=None
+
+        Return
+        ------
+        `List[JSONObject | bytes]`: JSON (or raw bytes) of each request, in the same order as `urls`
+
+        """
+        return await asyncio.gather(
+            *[
+                self.fetch_async(
+                    url,
+                    max_attempts=max_attempts,
+                    decoder=decoder,
+                    raw=raw,
+                    priority=priority,
+                )
+                for url in urls
+            ]
+        )
+
+    def fetch(
+        self,
+        url: str,
+        max_attempts: int = MAX_ATTEMPTS,
+        decoder: Optional[Decoder] = None,
+        raw: bool = False,
+        priority: Optional[int] = None,
+    ) -> JSONObject | bytes:
+        """
+        Method to fetch a single url, see `fetch_async`
+        """
+        return self.run(
+            self.fetch_async(
+                url,
+                max_attempts=max_attempts,
+                decoder=decoder,
+                raw=raw,
+                priority=priority,
+            )
+        )
+
+    def fetch_all(
+        self,
+        urls: List[str],
+        max_attempts: int = MAX_ATTEMPTS,
+        decoder: Optional[Decoder] = None,
+        raw: bool = False,
+        priority: Optional[int] = None,
+    ) -> List[JSONObject | bytes]:
+        """
+        Method to fetch a list of urls, see `fetch_all_async`
+        """
+        return self.run(
+            self.fetch_all_async(
+                urls,
+                max_attempts=max_attempts,
+                decoder=decoder,
+                raw=raw,
+                priority=priority,
+            )
+        )
+
+    def fetch_iter(
+        self,
+        urls: Iterable[str],
+        max_attempts: int = MAX_ATTEMPTS,
+        decoder: Optional[Decoder] = None,
+        raw: bool = False,
+        priority: Optional[int] = None,
+        window: int = 100,
+        ordered: bool = True,
+        slow_start: bool = False,
+    ) -> Iterator[JSONObject | bytes]:
+        """
+        Method to fetch urls concurrently, yielding each response as it arrives. At most `window` requests are
+        submitted ahead of the consumer and `urls` is only read as they finish, so it can be a lazy or
+        unbounded iterable. Requests still in flight are cancelled when the iterator is closed early.
+
+        Parameters
+        ----------
+        `urls (Iterable[str])`: urls to send requests
+
+        `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+        `decoder (Decoder)`: callable to decode each response body, if None then uses `get_decoder()`, default=None
+
+        `raw (bool)`: yield the undecoded response bodies, default=False
+
+        `priority (int)`: priority of requests in the client's queue, lower values are served first, if None then set from each url's endpoint (see `default_priority`), default=None
+
+        `window (int)`: maximum number of requests submitted but not yet yielded, default=100
+
+        `ordered (bool)`: yield responses in the order of `urls`, if False then in the order they arrive, default=True
+
+        `slow_start (bool)`: submit one request first and grow the window by one with each response up to
+        `window`, so it doubles every round trip and requests in flight never outnumber the responses received.
+        Consumers that stop early, e.g. at the last page of a listing, waste few requests, default=False
+
+        Return
+        ------
+        `Iterator[JSONObject | bytes]`: JSON (or raw bytes) of each request
+
+        """
+        loop = self._start()
+        if threading.current_thread() is self._thread:
+            raise RuntimeError(
+                "FPLClient.fetch_iter cannot be called from the client's own event loop."
+            )
+        urls = iter(urls)
+        pending: Deque[Future] = deque()
+
+        def _submit() -> bool:
+            url = next(urls, None)
+            if url is None:
+                return False
+            coro = self.fetch_async(
+                url,
+                max_attempts=max_attempts,
+                decoder=decoder,
+                raw=raw,
+                priority=priority,
+            )
+            pending.append(asyncio.run_coroutine_threadsafe(coro, loop))
+            return True
+
+        limit, received = (1 if slow_start else window), 0
+        try:
+            while len(pending) < limit and _submit():
+                pass
+            while pending:
+                if ordered:
+                    future = pending.popleft()
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    future = next(f for f in pending if f in done)
+                    pending.remove(future)
+                result = future.result()
+                received += 1
+                # one more request in flight per response, so the window doubles every round trip
+                limit = min(window, max(limit, received))
+                while len(pending) < limit and _submit():
+                    pass
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self) -> None:
+        """
+        Method to close the connection pool and stop the event loop. The client restarts on next use.
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None:
+                return
+
+            async def _close_session():
+                if self._session is not None and not self._session.closed:
+                    await self._session.close()
+
+            asyncio.run_coroutine_threadsafe(_close_session(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+            self._loop = self._thread = None
+            self._session = self._controller = self._limiter = None
+            self._scheduler = None
+
+
+_client: Optional[FPLClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> FPLClient:
+    """
+    Function to get the process-wide client, creating it on first use
+
+    Return
+    ------
+    `FPLClient`: client shared by all fetch helpers
+
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = FPLClient()
+        return _client
+
+
+def set_client(client: Optional[FPLClient]) -> Optional[FPLClient]:
+    """
+    Function to replace the process-wide client, for example to change concurrency settings
+
+    Parameters
+    ----------
+    `client (FPLClient)`: client to be shared by all fetch helpers, if None then a default client is created on next use
+
+    Return
+    ------
+    `FPLClient`: previous client, which is left open
+
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
+
+
+def close_client() -> None:
+    """
+    Function to close the process-wide client, called automatically on interpreter exit
+
+    Return
+    ------
+    `None`
+
+    """
+    with _client_lock:
+        client = _client
+    if client is not None:
+        client.close()
+
+
+atexit.register(close_client)
+
+
+def fetch_all(
+    urls: List[str],
+    max_attempts: int = MAX_ATTEMPTS,
+    decoder: Optional[Decoder] = None,
+    raw: bool = False,
+    priority: Optional[int] = None,
+) -> List[JSONObject | bytes]:
+    """
+    Function to fetch a list of urls concurrently through the process-wide client
+
+    Parameters
+    ----------
+    `urls (List[str])`: urls to send requests
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `decoder (Decoder)`: callable to decode each response body, if None then uses `get_decoder()`, default=None
+
+    `raw (bool)`: return the undecoded response bodies, default=False
+
+    `priority (int)`: priority of requests in the client's queue, lower values are served first, if None then set from each url's endpoint (see `default_priority`), default=None
+
+    Return
+    ------
+    `List[JSONObject | bytes]`: JSON (or raw bytes) of each request, in the same order as `urls`
+
+    """
+    return get_client().fetch_all(
+        urls, max_attempts=max_attempts, decoder=decoder, raw=raw, priority=priority
+    )
+
+
+def fetch_iter(
+    urls: Iterable[str],
+    max_attempts: int = MAX_ATTEMPTS,
+    decoder: Optional[Decoder] = None,
+    raw: bool = False,
+    priority: Optional[int] = None,
+    window: int = 100,
+    ordered: bool = True,
+    slow_start: bool = False,
+) -> Iterator[JSONObject | bytes]:
+    """
+    Function to fetch urls concurrently through the process-wide client, yielding each response as it
+    arrives, see `FPLClient.fetch_iter`
+
+    Parameters
+    ----------
+    `urls (Iterable[str])`: urls to send requests
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `decoder (Decoder)`: callable to decode each response body, if None then uses `get_decoder()`, default=None
+
+    `raw (bool)`: yield the undecoded response bodies, default=False
+
+    `priority (int)`: priority of requests in the client's queue, lower values are served first, if None then set from each url's endpoint (see `default_priority`), default=None
+
+    `window (int)`: maximum number of requests submitted but not yet yielded, default=100
+
+    `ordered (bool)`: yield responses in the order of `urls`, if False then in the order they arrive, default=True
+
+    `slow_start (bool)`: submit one request first and grow the window by one with each response up to `window`, default=False
+
+    Return
+    ------
+    `Iterator[JSONObject | bytes]`: JSON (or raw bytes) of each request
+
+    """
+    return get_client().fetch_iter(
+        urls,
+        max_attempts=max_attempts,
+        decoder=decoder,
+        raw=raw,
+        priority=priority,
+        window=window,
+        ordered=ordered,
+        slow_start=slow_start,
+    )
@@ -0,0 +1,203 @@
+"""
+Adaptive concurrency control for the asynchronous fetch path
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from typing import List, Optional, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit that adapts to throttling signals (AIMD) with a circuit breaker.
+
+    Each success raises the limit by `increase / limit`, so roughly `increase` per window of `limit`
+    requests. A throttling signal (429, 5xx, html error page or timeout) multiplies the limit by `decrease`,
+    at most once every `decrease_interval` seconds so a burst of concurrent failures counts once.
+
+    After `failure_threshold` consecutive throttling signals the breaker opens and every caller waits
+    `cooldown` seconds. The breaker then lets a single request through (half-open) and closes again on
+    success, or reopens on failure.
+
+    The limiter belongs to the event loop it is first used on and is not thread-safe.
+
+    Parameters
+    ----------
+    `initial (float)`: starting limit, if None then set to `min(10, max_limit)`, default=None
+
+    `min_limit (int)`: lowest allowed limit, default=1
+
+    `max_limit (int)`: highest allowed limit, default=50
+
+    `increase (float)`: additive increase per window of successful requests, default=1
+
+    `decrease (float)`: multiplicative decrease on throttling, default=0.5
+
+    `decrease_interval (float)`: minimum time (seconds) between two decreases, default=1
+
+    `failure_threshold (int)`: consecutive throttling signals that open the breaker, never opens if None, default=20
+
+    `cooldown (float)`: time (seconds) the breaker stays open, default=30
+
+    """
+
+    def __init__(
+        self,
+        initial: Optional[float] = None,
+        min_limit: int = 1,
+        max_limit: int = 50,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        decrease_interval: float = 1.0,
+        failure_threshold: Optional[int] = 20,
+        cooldown: float = 30.0,
+    ):
+        if not 1 <= min_limit <= max_limit:
+            raise ValueError(
+                f"limits must satisfy 1 <= min_limit <= max_limit. Current Value: {min_limit=}, {max_limit=}"
+            )
+        if not 0 < decrease <= 1:
+            raise ValueError(f"decrease must be in (0, 1]. Current Value: {decrease}")
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(10, max_limit) if initial is None else initial)
+        self.limit = min(max(self.limit, min_limit), max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.decrease_interval = decrease_interval
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+
+        self.state = CLOSED
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self._opened_until = 0.0
+        self._last_decrease = float("-inf")
+        # heap of (priority, arrival, future) of callers waiting for a slot
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._arrivals = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def waiting(self) -> int:
+        """`int`: number of callers waiting for a slot"""
+        return sum(not future.done() for _, _, future in self._waiters)
+
+    def _allowed(self) -> int:
+        """
+        Method to get the number of requests allowed in flight in the current state
+        """
+        if self.state == HALF_OPEN:
+            return 1
+        return max(self.min_limit, int(self.limit))
+
+    def _take(self) -> bool:
+        """
+        Method to take a slot if the breaker and the current limit allow it
+        """
+        if self.state == OPEN:
+            if time.monotonic() < self._opened_until:
+                return False
+            self.state = HALF_OPEN
+        if self.in_flight < self._allowed():
+            self.in_flight += 1
+            return True
+        return False
+
+    def _wake(self) -> None:
+        """
+        Method to hand free slots to waiting callers in priority order
+        """
+        while self._waiters:
+            if self._waiters[0][2].done():
+                # caller was cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            if not self._take():
+                break
+            heapq.heappop(self._waiters)[2].set_result(None)
+
+        if self._waiters and self.state == OPEN and self._timer is None:
+            delay = max(0.0, self._opened_until - time.monotonic())
+            self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._wake()
+
+    async def acquire(self, priority: int = 0) -> None:
+        """
+        Coroutine that waits for a free slot, and for the breaker to close, then takes the slot. Waiting
+        callers are served lowest `priority` first, in arrival order within a priority.
+
+        Parameters
+        ----------
+        `priority (int)`: priority of caller, lower values are served first, default=0
+
+        Return
+        ------
+        `None`
+
+        """
+        if not self._waiters and self._take():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._arrivals), future))
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # slot was handed over as the caller was cancelled, pass it on
+                self.in_flight -= 1
+                self._wake()
+            raise
+
+    async def release(self, throttled: Optional[bool] = None) -> None:
+        """
+        Coroutine to give back a slot taken with `acquire` and adapt the limit to the outcome
+
+        Parameters
+        ----------
+        `throttled (bool)`: True on a throttling signal, False on success, None to leave the limit unchanged, default=None
+
+        Return
+        ------
+        `None`
+
+        """
+        self.in_flight -= 1
+        if throttled is True:
+            self._on_throttle()
+        elif throttled is False:
+            self._on_success()
+        self._wake()
+
+    def _on_success(self) -> None:
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            self.state = CLOSED
+            self.limit = float(self.min_limit)
+        self.limit = min(self.max_limit, self.limit + self.increase / self.limit)
+
+    def _on_throttle(self) -> None:
+        now = time.monotonic()
+        self.consecutive_failures += 1
+        if now - self._last_decrease >= self.decrease_interval:
+            self.limit = max(self.min_limit, self.limit * self.decrease)
+            self._last_decrease = now
+
+        if self.state == HALF_OPEN or (
+            self.failure_threshold is not None
+            and self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = OPEN
+            self._opened_until = now + self.cooldown
@@ -1,19 +1,46 @@
 # %%
 import asyncio
 import json
+import random
 import ssl
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import certifi
 import requests
-from aiohttp import ClientSession, client_exceptions
+import requests.adapters
+from aiohttp import ClientSession, ClientTimeout, client_exceptions
+
+from FPL.utils.cassette import Cassette, get_cassette
+from FPL.utils.concurrency import AdaptiveLimiter
+from FPL.utils.telemetry import endpoint_class, telemetry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
 
 # %%
 # -- Define Types -- #
 JSON = int | str | float | bool | None
 JSONObject = dict[str, JSON]
+Decoder = Callable[[bytes], Any]
 
 ssl_context = ssl.create_default_context(cafile=certifi.where())
 
+# -- Fetch engine defaults -- #
+MAX_ATTEMPTS = 10
+MAX_CONCURRENCY = 50
+RATE_LIMIT = 50.0
+BACKOFF = 0.5
+MAX_BACKOFF = 30.0
+TIMEOUT = 30.0
+
+# status codes that signal throttling or a transient server side failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
 
 class FetchError(Exception):
     """Exception Error from failing to fetch a request, in order to distinguish from regular exceptions"""
@@ -22,50 +49,538 @@ class FetchError(Exception):
         super().__init__(message)
 
 
-def fetch_request(url: str) -> JSONObject:
+def _default_decoder() -> Decoder:
+    """
+    Function to get the fastest available JSON decoder, orjson if installed otherwise the standard library
+    """
+    return orjson.loads if orjson is not None else json.loads
+
+
+_decoder: Decoder = _default_decoder()
+
+
+def get_decoder() -> Decoder:
+    """
+    Function to get the JSON decoder used by the fetch functions
+
+    Return
+    ------
+    `Decoder`: callable that turns response bytes into python objects
+
+    """
+    return _decoder
+
+
+def set_decoder(decoder: Optional[Decoder] = None) -> Decoder:
+    """
+    Function to set the JSON decoder used by the fetch functions
+
+    Parameters
+    ----------
+    `decoder (Decoder)`: callable that turns response bytes into python objects, if None then reset to the default (orjson if installed)
+
+    Return
+    ------
+    `Decoder`: previous decoder
+
+    """
+    global _decoder
+    previous = _decoder
+    _decoder = _default_decoder() if decoder is None else decoder
+    return previous
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter shared between coroutines
+
+    Parameters
+    ----------
+    `rate (float)`: number of tokens (requests) added to the bucket per second
+
+    `capacity (float)`: maximum number of tokens the bucket can hold i.e. largest allowed burst, if None then set to `rate`
+
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive. Current Value: {rate}")
+
+        self.rate = rate
+        self.capacity = rate if capacity is None else capacity
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self) -> None:
+        """
+        Coroutine that waits until a token is available and consumes it
+
+        Return
+        ------
+        `None`
+
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def _backoff_delay(
+    attempt: int, backoff: float = BACKOFF, max_backoff: float = MAX_BACKOFF
+) -> float:
+    """
+    Function to calculate exponential backoff with full jitter
+
+    Parameters
+    ----------
+    `attempt (int)`: number of attempts made so far, starting from 0
+
+    `backoff (float)`: base delay (seconds), default=0.5
+
+    `max_backoff (float)`: cap on delay (seconds), default=30
+
+    Return
+    ------
+    `float`: number of seconds to wait before the next attempt
+
+    """
+    return random.uniform(0, min(max_backoff, backoff * 2**attempt))
+
+
+def _retry_after(response) -> Optional[float]:
+    """
+    Function to read the Retry-After header (seconds) of a response, if present
+    """
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+class ValidatorStore:
+    """
+    Bounded store of HTTP validators (ETag / Last-Modified) and the response body they belong to, keyed by url
+
+    Parameters
+    ----------
+    `max_entries (int)`: maximum number of urls to keep, least recently used are dropped first, default=256
+
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[Optional[str], Optional[str], bytes]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, url: str) -> Optional[Tuple[Optional[str], Optional[str], bytes]]:
+        """
+        Method to get `(etag, last_modified, body)` stored for url, None if url has not been stored
+        """
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+            return entry
+
+    def set(
+        self,
+        url: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        body: bytes,
+    ) -> None:
+        """
+        Method to store the validators and body of a response for url
+        """
+        with self._lock:
+            self._entries[url] = (etag, last_modified, body)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Method to remove all stored validators
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+validator_store = ValidatorStore()
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Function to get the process-wide pooled requests session, creating it on first use
+
+    Return
+    ------
+    `requests.Session`: session with a keep-alive connection pool
+
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(
+                pool_connections=10, pool_maxsize=MAX_CONCURRENCY
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+        return _session
+
+
+def _replay(cassette: Cassette, url: str) -> bytes:
+    """
+    Function to get the recorded body of url from a cassette in replay mode
+    """
+    try:
+        return cassette.get(url)
+    except KeyError as err:
+        raise FetchError(f"{url} has not been recorded in {cassette.path}.") from err
+
+
+def _fetch_body(url: str, timeout: float, conditional: bool) -> Tuple[bytes, bool]:
+    """
+    Function to get the response body of url through the pooled session, or the active cassette
+
+    Return
+    ------
+    `Tuple[bytes, bool]`: response body and whether it was reused (304 or cassette replay) rather than downloaded
+
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return _replay(cassette, url), True
+
+    headers = {}
+    stored = validator_store.get(url) if conditional else None
+    if stored is not None:
+        etag, last_modified, _ = stored
+        if etag is not None:
+            headers["If-None-Match"] = etag
+        if last_modified is not None:
+            headers["If-Modified-Since"] = last_modified
+
+    response = get_session().get(url, headers=headers, timeout=timeout)
+    cache_hit = response.status_code == 304 and stored is not None
+    if cache_hit:
+        body = stored[2]
+    else:
+        body = response.content
+        if conditional and response.status_code == 200:
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag is not None or last_modified is not None:
+                validator_store.set(url, etag, last_modified, body)
+
+    if cassette is not None and cassette.recording:
+        cassette.put(url, body)
+    return body, cache_hit
+
+
+def fetch_request(
+    url: str,
+    timeout: float = TIMEOUT,
+    conditional: bool = True,
+    decoder: Optional[Decoder] = None,
+    raw: bool = False,
+) -> JSONObject | bytes:
     """
     Function to fetch and load JSON from url
 
+    Requests go through a pooled keep-alive session. When `conditional` is True the ETag / Last-Modified
+    validators of the previous response are sent back, and the stored body is reused if the server replies
+    304 Not Modified, so an unchanged payload costs a round trip rather than a full download.
+
     Parameters
     ----------
     `url (str)`: url to send request
+
+    `timeout (float)`: timeout (seconds) of the request, default=30
+
+    `conditional (bool)`: send conditional request and store validators of the response, default=True
+
+    `decoder (Decoder)`: callable to decode the response body, if None then uses `get_decoder()`, default=None
+
+    `raw (bool)`: return the undecoded response body, default=False
+
+    Return
+    ------
+    `JSONObject | bytes`: JSON file of request object, or its raw bytes if `raw` is True
+
+    When a cassette is active (see `use_cassette`) responses are recorded to it, or served from it with no
+    network access.
     """
-    response = requests.get(url)
-    return response.json()
+    endpoint = telemetry.start(url)
+    start = time.perf_counter()
+    body, cache_hit = None, False
+    try:
+        body, cache_hit = _fetch_body(url, timeout, conditional)
+    finally:
+        telemetry.finish(
+            endpoint,
+            time.perf_counter() - start,
+            n_bytes=0 if body is None else len(body),
+            error=body is None,
+            cache_hit=cache_hit,
+        )
+
+    if raw:
+        return body
+    return (decoder or _decoder)(body)
 
 
 async def fetch_request_async(
     url: str,
     session: ClientSession,
-    max_attempts: int = 1000,
-) -> JSONObject:
+    max_attempts: int = MAX_ATTEMPTS,
+    limiter: Optional[RateLimiter] = None,
+    backoff: float = BACKOFF,
+    max_backoff: float = MAX_BACKOFF,
+    timeout: float = TIMEOUT,
+    decoder: Optional[Decoder] = None,
+    raw: bool = False,
+    controller: Optional[AdaptiveLimiter] = None,
+    priority: int = 0,
+) -> JSONObject | bytes:
     """
     Coroutine to fetch request from url
 
+    Throttling (429), server errors (5xx), timeouts, dropped connections and html error pages are retried
+    with exponential backoff and jitter. A Retry-After header is honoured when the server sends one.
+
     Parameters
     ----------
     `url (str)`: url to send request
 
     `session (ClientSession)`: open aiohttp ClientSession
 
-    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 1000
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `limiter (RateLimiter)`: optional rate limiter to acquire a token from before every attempt, default=None
+
+    `backoff (float)`: base delay (seconds) between attempts, default=0.5
+
+    `max_backoff (float)`: maximum delay (seconds) between attempts, default=30
+
+    `timeout (float)`: total timeout (seconds) of a single attempt, default=30
+
+    `decoder (Decoder)`: callable to decode the response body, if None then uses `get_decoder()`, default=None
+
+    `raw (bool)`: return the undecoded response body, default=False
+
+    `controller (AdaptiveLimiter)`: optional adaptive concurrency limit to take a slot from for every attempt and to report throttling signals to, default=None
+
+    `priority (int)`: priority used when waiting for a slot of `controller`, lower values are served first, default=0
+
+    Return
+    ------
+    `JSONObject | bytes`: JSON file of request object, or its raw bytes if `raw` is True
+
+    When a cassette is active (see `use_cassette`) responses are recorded to it, or served from it with no
+    network access.
+    """
+    cassette = get_cassette()
+    replaying = cassette is not None and cassette.replaying
+    endpoint = endpoint_class(url)
+    # seconds holding a slot and waiting for one, summed over attempts, and attempts made after the first
+    progress = {"latency": 0.0, "queue_wait": 0.0, "retries": 0}
+    body = None
+    try:
+        if replaying:
+            telemetry.enter(endpoint)
+            start = time.perf_counter()
+            try:
+                body = _replay(cassette, url)
+            finally:
+                progress["latency"] = time.perf_counter() - start
+                telemetry.exit(endpoint)
+        else:
+            body, _ = await _request_with_retries(
+                url,
+                session,
+                max_attempts,
+                limiter,
+                backoff,
+                max_backoff,
+                timeout,
+                controller,
+                priority,
+                progress,
+            )
+    finally:
+        telemetry.record(
+            endpoint,
+            progress["latency"],
+            n_bytes=0 if body is None else len(body),
+            retries=progress["retries"],
+            error=body is None,
+            cache_hit=replaying,
+            queue_wait=progress["queue_wait"],
+        )
+
+    if cassette is not None and cassette.recording:
+        cassette.put(url, body)
+    if raw:
+        return body
+    return (decoder or _decoder)(body)
+
+
+async def _request_with_retries(
+    url: str,
+    session: ClientSession,
+    max_attempts: int,
+    limiter: Optional[RateLimiter],
+    backoff: float,
+    max_backoff: float,
+    timeout: float,
+    controller: Optional[AdaptiveLimiter] = None,
+    priority: int = 0,
+    progress: Optional[Dict[str, float]] = None,
+) -> Tuple[bytes, int]:
+    """
+    Coroutine to get the response body of url, retrying as described in `fetch_request_async`. Each attempt
+    is marked in flight in the telemetry only once it holds its slot and rate limit token, the time spent
+    holding them is added to `progress["latency"]` and the time waiting for them to `progress["queue_wait"]`.
+    `progress["retries"]` is the number of attempts started after the first, also when an attempt raises or
+    is cancelled
 
     Return
     ------
-    `JSONObject`: JSON file of request object
+    `Tuple[bytes, int]`: response body and number of attempts made after the first
+
     """
-    attempt_count = 0
+    if progress is None:
+        progress = {"latency": 0.0, "queue_wait": 0.0, "retries": 0}
+    endpoint = endpoint_class(url)
+    for attempt in range(max_attempts):
+        progress["retries"] = attempt
+        queued = time.perf_counter()
+        # slot is held for the attempt only, not while backing off
+        if controller is not None:
+            await controller.acquire(priority)
 
-    # make sure condition is eventually met
-    while True:
+        delay, throttled, start = None, None, None
         try:
-            async with session.get(url, ssl=ssl_context) as response:
-                return await response.json()
+            if limiter is not None:
+                await limiter.acquire()
+            start = time.perf_counter()
+            progress["queue_wait"] += start - queued
+            telemetry.enter(endpoint)
 
-        except client_exceptions.ContentTypeError as e:
-            attempt_count += 1
+            async with session.get(
+                url, ssl=ssl_context, timeout=ClientTimeout(total=timeout)
+            ) as response:
+                # FPL API serves an html page instead of JSON when it is busy or being updated
+                if response.status not in RETRY_STATUSES and "json" in (
+                    response.content_type
+                ):
+                    body = await response.read()
+                    throttled = False
+                    return body, attempt
+                throttled = True
+                if response.status == 429:
+                    delay = _retry_after(response)
 
-        if attempt_count > max_attempts:
-            raise FetchError(
-                f"Maximum number of attempts ({max_attempts}) to fetch request reached."
+        except (
+            asyncio.TimeoutError,
+            client_exceptions.ClientConnectionError,
+            client_exceptions.ClientPayloadError,
+        ):
+            # a body cut short by the server is retried like a dropped connection
+            throttled = True
+        finally:
+            if start is not None:
+                progress["latency"] += time.perf_counter() - start
+                telemetry.exit(endpoint)
+            if controller is not None:
+                await controller.release(throttled)
+
+        if attempt + 1 < max_attempts:
+            if delay is None:
+                delay = _backoff_delay(attempt, backoff, max_backoff)
+            await asyncio.sleep(delay)
+
+    raise FetchError(
+        f"Maximum number of attempts ({max_attempts}) to fetch request reached for {url}."
+    )
+
+
+async def fetch_all_async(
+    urls: List[str],
+    session: ClientSession,
+    max_concurrency: int = MAX_CONCURRENCY,
+    rate: Optional[float] = RATE_LIMIT,
+    max_attempts: int = MAX_ATTEMPTS,
+    decoder: Optional[Decoder] = None,
+    raw: bool = False,
+) -> List[JSONObject | bytes]:
+    """
+    Coroutine to fetch a list of urls with a bounded number of requests in flight
+
+    Parameters
+    ----------
+    `urls (List[str])`: urls to send requests
+
+    `session (ClientSession)`: open aiohttp ClientSession
+
+    `max_concurrency (int)`: maximum number of requests in flight at once, default=50
+
+    `rate (float)`: maximum number of requests started per second, no limit if None, default=50
+
+    `max_attempts (int)`: maximum number of attempts to try fetch request, default = 10
+
+    `decoder (Decoder)`: callable to decode each response body, if None then uses `get_decoder()`, default=None
+
+    `raw (bool)`: return the undecoded response bodies, default=False
+
+    Return
+    ------
+    `List[JSONObject | bytes]`: JSON (or raw bytes) of each request, in the same order as `urls`
+
+    """
+    if max_concurrency < 1:
+        raise ValueError(
+            f"max_concurrency must be at least 1. Current Value: {max_concurrency}"
+        )
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limiter = RateLimiter(rate) if rate is not None else None
+
+    async def _fetch(url: str) -> JSONObject | bytes:
+        async with semaphore:
+            return await fetch_request_async(
+                url,
+                session,
+                max_attempts=max_attempts,
+                limiter=limiter,
+                decoder=decoder,
+                raw=raw,
             )
+
+    return await asyncio.gather(*[_fetch(url) for url in urls])
@@ -1,11 +1,11 @@
-import datetime
-
-from FPL.utils import _get_api_url, fetch_request
+from FPL.utils.bootstrap import get_bootstrap
+from FPL.utils.cassette import get_cassette
 
 
 def get_current_gw() -> int:
     """
-    Function to call FPL API and get the most recent gameweek
+    Function to call FPL API and get the most recent gameweek. When replaying a cassette the gameweek is
+    taken at the time it was recorded.
 
     Return
     ------
@@ -13,18 +13,9 @@ def get_current_gw() -> int:
 
     """
 
-    url = _get_api_url(key="bootstrap")
-    data = fetch_request(url)
-
-    current_time = datetime.datetime.now()
-
-    for gameweek in data["events"]:
-        deadline_time = datetime.datetime.strptime(
-            gameweek["deadline_time"], "%Y-%m-%dT%H:%M:%SZ"
-        )
-        if deadline_time > current_time:
-            current_gameweek = gameweek["id"] - 1
-            break
+    cassette = get_cassette()
+    now = cassette.recorded_at if cassette is not None and cassette.replaying else None
+    current_gameweek = get_bootstrap().current_gw(now)
 
     print(f"current gameweek is {current_gameweek}.")
 
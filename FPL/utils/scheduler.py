@@ -0,0 +1,118 @@
+"""
+Priority scheduling and de-duplication of requests made through `FPLClient`
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+
+from FPL.utils.telemetry import endpoint_class
+
+# lower values are served first
+HIGH = 0
+NORMAL = 10
+BULK = 20
+
+# default priority of each endpoint class (see `endpoint_class`), cheap requests the user sees first go
+# ahead of bulk fan-outs of picks and element summaries
+ENDPOINT_PRIORITY = {
+    "bootstrap": HIGH,
+    "fixtures": HIGH,
+    "entry": HIGH,
+    "gameweek": HIGH,
+    "standings": NORMAL,
+    "history": NORMAL,
+    "transfers": NORMAL,
+    "element": BULK,
+    "picks": BULK,
+}
+
+
+def default_priority(url: str) -> int:
+    """
+    Function to get the default priority of a request from its endpoint class
+
+    Parameters
+    ----------
+    `url (str)`: url of request
+
+    Return
+    ------
+    `int`: one of `HIGH`, `NORMAL` or `BULK`, `NORMAL` if the endpoint is not recognised
+
+    """
+    return ENDPOINT_PRIORITY.get(endpoint_class(url), NORMAL)
+
+
+class RequestScheduler:
+    """
+    Queue shared by every caller of one `FPLClient`. Requests wait for a slot of the client's
+    `AdaptiveLimiter` in priority order, and a url requested again while it is still queued or in flight
+    joins the pending request instead of being sent twice. A request is cancelled once every caller
+    waiting for it has been cancelled.
+
+    Must only be used from the client's event loop.
+    """
+
+    def __init__(self):
+        self._pending: Dict[str, asyncio.Future] = {}
+        # number of callers waiting for each pending request
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self.coalesced = 0
+
+    @property
+    def pending(self) -> int:
+        """`int`: number of distinct urls queued or in flight"""
+        return len(self._pending)
+
+    async def submit(
+        self,
+        url: str,
+        fetch: Callable[[int], Awaitable[bytes]],
+        priority: Optional[int] = None,
+    ) -> bytes:
+        """
+        Coroutine to fetch the body of url once however many callers ask for it concurrently
+
+        Parameters
+        ----------
+        `url (str)`: url of request, used as the de-duplication key
+
+        `fetch (Callable[[int], Awaitable[bytes]])`: coroutine function taking the priority and returning the raw response body
+
+        `priority (int)`: priority of request, lower values are served first, if None then uses `default_priority(url)`, default=None
+
+        Return
+        ------
+        `bytes`: raw response body
+
+        """
+        task = self._pending.get(url)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            if priority is None:
+                priority = default_priority(url)
+            task = asyncio.ensure_future(fetch(priority))
+            self._pending[url] = task
+            self._waiters[task] = 0
+            task.add_done_callback(lambda task: self._done(url, task))
+
+        self._waiters[task] += 1
+        try:
+            # shield so a cancelled caller does not cancel the request for the others
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(task) == 1:
+                task.cancel()
+            raise
+        finally:
+            if task in self._waiters:
+                self._waiters[task] -= 1
+
+    def _done(self, url: str, task: asyncio.Future) -> None:
+        if self._pending.get(url) is task:
+            del self._pending[url]
+        self._waiters.pop(task, None)
+        if not task.cancelled():
+            # mark the exception as retrieved in case every caller was cancelled
+            task.exception()
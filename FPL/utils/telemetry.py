@@ -0,0 +1,382 @@
+"""
+Per-endpoint telemetry of requests made by the fetch functions
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# (endpoint class, pattern) checked in order, names follow the keys of `_get_api_url`
+ENDPOINT_PATTERNS = [
+    ("bootstrap", re.compile(r"/bootstrap-static/")),
+    ("fixtures", re.compile(r"/fixtures/")),
+    ("element", re.compile(r"/element-summary/\d+/")),
+    ("picks", re.compile(r"/entry/\d+/event/\d+/picks/")),
+    ("history", re.compile(r"/entry/\d+/history/")),
+    ("transfers", re.compile(r"/entry/\d+/transfers/")),
+    ("entry", re.compile(r"/entry/\d+/")),
+    ("standings", re.compile(r"/leagues-classic/\d+/standings/")),
+    ("gameweek", re.compile(r"/event/\d+/live/")),
+]
+
+# upper bounds (seconds) of latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def endpoint_class(url: str) -> str:
+    """
+    Function to get the endpoint class of an FPL api url
+
+    Parameters
+    ----------
+    `url (str)`: url of request
+
+    Return
+    ------
+    `str`: one of the keys of `_get_api_url` e.g. "bootstrap", "picks" or "standings", "other" if not recognised
+
+    """
+    for name, pattern in ENDPOINT_PATTERNS:
+        if pattern.search(url):
+            return name
+    return "other"
+
+
+class EndpointStats:
+    """
+    Counters and latency distribution of one endpoint class
+
+    Parameters
+    ----------
+    `sample_size (int)`: number of most recent latencies kept to calculate percentiles, default=10000
+
+    """
+
+    def __init__(self, sample_size: int = 10_000):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+        self.cache_hits = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_sum = 0.0
+        self.queue_wait_sum = 0.0
+        self.latency_buckets = [0] * len(LATENCY_BUCKETS)
+        self.latencies = deque(maxlen=sample_size)
+
+    def percentiles(self, q: List[float] = (50, 90, 99)) -> Dict[str, float]:
+        """
+        Method to calculate latency percentiles (seconds) over the recent sample
+
+        Parameters
+        ----------
+        `q (List[float])`: percentiles to calculate, default=(50, 90, 99)
+
+        Return
+        ------
+        `Dict[str, float]`: dictionary of "p<q>" and latency, empty if nothing has been recorded
+
+        """
+        if not self.latencies:
+            return {}
+        values = np.percentile(np.fromiter(self.latencies, dtype=float), q)
+        return {f"p{p:g}": float(value) for p, value in zip(q, values)}
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "cache_hits": self.cache_hits,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "mean_latency": self.latency_sum / self.requests if self.requests else 0.0,
+            "mean_queue_wait": (
+                self.queue_wait_sum / self.requests if self.requests else 0.0
+            ),
+            **self.percentiles(),
+        }
+
+
+class FetchTelemetry:
+    """
+    Thread-safe collection of `EndpointStats` keyed by endpoint class
+
+    Parameters
+    ----------
+    `sample_size (int)`: number of most recent latencies kept per endpoint to calculate percentiles, default=10000
+
+    """
+
+    def __init__(self, sample_size: int = 10_000):
+        self.sample_size = sample_size
+        self._stats: Dict[str, EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint: str) -> EndpointStats:
+        if endpoint not in self._stats:
+            self._stats[endpoint] = EndpointStats(self.sample_size)
+        return self._stats[endpoint]
+
+    def start(self, url: str) -> str:
+        """
+        Method to mark a request to url as in flight
+
+        Parameters
+        ----------
+        `url (str)`: url of request
+
+        Return
+        ------
+        `str`: endpoint class of url, to be passed to `finish`
+
+        """
+        endpoint = endpoint_class(url)
+        self.enter(endpoint)
+        return endpoint
+
+    def enter(self, endpoint: str) -> None:
+        """
+        Method to mark an attempt of an endpoint class as in flight, once it holds its concurrency slot
+
+        Parameters
+        ----------
+        `endpoint (str)`: endpoint class, see `endpoint_class`
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            stats = self._get(endpoint)
+            stats.in_flight += 1
+            stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+
+    def exit(self, endpoint: str) -> None:
+        """
+        Method to mark an attempt marked with `enter` as no longer in flight
+
+        Parameters
+        ----------
+        `endpoint (str)`: endpoint class, see `endpoint_class`
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            self._get(endpoint).in_flight -= 1
+
+    def finish(
+        self,
+        endpoint: str,
+        latency: float,
+        n_bytes: int = 0,
+        retries: int = 0,
+        error: bool = False,
+        cache_hit: bool = False,
+    ) -> None:
+        """
+        Method to record a finished request started with `start`, marking it as no longer in flight
+
+        Parameters
+        ----------
+        `endpoint (str)`: endpoint class returned by `start`
+
+        `latency (float)`: time (seconds) from the first attempt until the request returned, including retries
+
+        `n_bytes (int)`: size of response body, default=0
+
+        `retries (int)`: number of attempts after the first, default=0
+
+        `error (bool)`: True if the request failed, default=False
+
+        `cache_hit (bool)`: True if the body was reused rather than downloaded (304 or cassette replay), default=False
+
+        Return
+        ------
+        `None`
+
+        """
+        self.exit(endpoint)
+        self.record(endpoint, latency, n_bytes, retries, error, cache_hit)
+
+    def record(
+        self,
+        endpoint: str,
+        latency: float,
+        n_bytes: int = 0,
+        retries: int = 0,
+        error: bool = False,
+        cache_hit: bool = False,
+        queue_wait: float = 0.0,
+    ) -> None:
+        """
+        Method to record a finished request whose attempts were marked in flight with `enter` and `exit`
+
+        Parameters
+        ----------
+        `endpoint (str)`: endpoint class, see `endpoint_class`
+
+        `latency (float)`: time (seconds) the request's attempts held a concurrency slot, summed over retries
+
+        `n_bytes (int)`: size of response body, default=0
+
+        `retries (int)`: number of attempts after the first, default=0
+
+        `error (bool)`: True if the request failed, default=False
+
+        `cache_hit (bool)`: True if the body was reused rather than downloaded (304 or cassette replay), default=False
+
+        `queue_wait (float)`: time (seconds) the request's attempts waited for a concurrency slot or rate limit
+        token, default=0
+
+        Return
+        ------
+        `None`
+
+        """
+        with self._lock:
+            stats = self._get(endpoint)
+            stats.requests += 1
+            stats.errors += int(error)
+            stats.retries += retries
+            stats.bytes += n_bytes
+            stats.cache_hits += int(cache_hit)
+            stats.latency_sum += latency
+            stats.queue_wait_sum += queue_wait
+            stats.latencies.append(latency)
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.latency_buckets[i] += 1
+                    break
+
+    def summary(self, endpoint: Optional[str] = None) -> Dict:
+        """
+        Method to summarise recorded requests
+
+        Parameters
+        ----------
+        `endpoint (str)`: endpoint class to summarise, if None then summarises every endpoint, default=None
+
+        Return
+        ------
+        `Dict`: counters and latency percentiles, keyed by endpoint class when `endpoint` is None
+
+        """
+        with self._lock:
+            if endpoint is not None:
+                return self._get(endpoint).summary()
+            return {name: stats.summary() for name, stats in self._stats.items()}
+
+    def reset(self) -> None:
+        """
+        Method to clear all recorded requests, requests still in flight are kept as in flight
+        """
+        with self._lock:
+            stats = {}
+            for name, old in self._stats.items():
+                stats[name] = EndpointStats(self.sample_size)
+                stats[name].in_flight = old.in_flight
+            self._stats = stats
+
+    def to_prometheus(self, prefix: str = "fpl_fetch") -> str:
+        """
+        Method to render recorded requests in the Prometheus text exposition format
+
+        Parameters
+        ----------
+        `prefix (str)`: prefix of metric names, default="fpl_fetch"
+
+        Return
+        ------
+        `str`: metrics text
+
+        """
+        counters = [
+            ("requests_total", "requests", "Requests completed"),
+            ("errors_total", "errors", "Requests that failed after all attempts"),
+            ("retries_total", "retries", "Attempts made after the first"),
+            ("bytes_total", "bytes", "Bytes of response bodies"),
+            ("cache_hits_total", "cache_hits", "Bodies reused rather than downloaded"),
+            (
+                "queue_wait_seconds_total",
+                "queue_wait_sum",
+                "Time waiting for a concurrency slot or rate limit token",
+            ),
+        ]
+        lines = []
+        with self._lock:
+            stats = sorted(self._stats.items())
+            for metric, attr, help in counters:
+                lines.append(f"# HELP {prefix}_{metric} {help}")
+                lines.append(f"# TYPE {prefix}_{metric} counter")
+                for name, s in stats:
+                    lines.append(
+                        f'{prefix}_{metric}{{endpoint="{name}"}} {getattr(s, attr)}'
+                    )
+
+            lines.append(f"# HELP {prefix}_in_flight Requests currently in flight")
+            lines.append(f"# TYPE {prefix}_in_flight gauge")
+            for name, s in stats:
+                lines.append(f'{prefix}_in_flight{{endpoint="{name}"}} {s.in_flight}')
+
+            lines.append(f"# HELP {prefix}_latency_seconds Request latency")
+            lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+            for name, s in stats:
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, s.latency_buckets):
+                    cumulative += count
+                    lines.append(
+                        f'{prefix}_latency_seconds_bucket{{endpoint="{name}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'{prefix}_latency_seconds_bucket{{endpoint="{name}",le="+Inf"}} {s.requests}'
+                )
+                lines.append(
+                    f'{prefix}_latency_seconds_sum{{endpoint="{name}"}} {s.latency_sum}'
+                )
+                lines.append(
+                    f'{prefix}_latency_seconds_count{{endpoint="{name}"}} {s.requests}'
+                )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str, prefix: str = "fpl_fetch") -> None:
+        """
+        Method to write `to_prometheus` output to a file, e.g. for the node exporter textfile collector
+
+        Parameters
+        ----------
+        `path (str)`: path of file to write
+
+        `prefix (str)`: prefix of metric names, default="fpl_fetch"
+
+        Return
+        ------
+        `None`
+
+        """
+        with open(path, "w") as f:
+            f.write(self.to_prometheus(prefix))
+
+
+telemetry = FetchTelemetry()
+
+
+def get_telemetry() -> FetchTelemetry:
+    """
+    Function to get the process-wide fetch telemetry
+
+    Return
+    ------
+    `FetchTelemetry`: telemetry recorded by `fetch_request` and `fetch_request_async`
+
+    """
+    return telemetry
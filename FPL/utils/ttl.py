@@ -0,0 +1,142 @@
+"""
+Cache expiry policies driven by the FPL event calendar
+"""
+
+import datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from FPL.utils.bootstrap import get_bootstrap
+from FPL.utils.cassette import get_cassette
+
+
+def _calendar_now() -> pd.Timestamp:
+    """
+    Function to get the time to compare deadlines against, the recording time when replaying a cassette
+    """
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        return pd.Timestamp(cassette.recorded_at)
+    return pd.Timestamp.now("UTC")
+
+
+class GameweekTTL:
+    """
+    Expiry policy for `dir_cache` that follows the gameweek calendar (`events[].deadline_time`, `finished`
+    and `data_checked` of bootstrap-static), to pass as the `refresh` argument.
+
+    With `gameweek` set to the name of an argument of the cached function, entries for that gameweek are
+    kept until its deadline when it is upcoming, expire after `live` minutes while it is being played,
+    after `checking` minutes once finished while the data is checked, and are kept forever once the data
+    has been checked.
+
+    Without `gameweek`, or when the argument is None, the entry follows the current phase of the season:
+    `live` minutes while a gameweek is in progress or within `deadline_window` minutes of the next
+    deadline, otherwise up to `idle` minutes but never past the start of the next deadline window.
+
+    Parameters
+    ----------
+    `gameweek (str)`: name of the argument holding the gameweek of the cached data, default=None
+
+    `live (float)`: time (minutes) to keep entries while data changes quickly, default=5
+
+    `checking (float)`: time (minutes) to keep entries of a finished gameweek whose data is not checked, default=30
+
+    `idle (float)`: longest time (minutes) to keep entries between gameweeks, default=360
+
+    `deadline_window (float)`: time (minutes) before a deadline from which entries are treated as live, default=120
+
+    """
+
+    def __init__(
+        self,
+        gameweek: Optional[str] = None,
+        live: float = 5,
+        checking: float = 30,
+        idle: float = 360,
+        deadline_window: float = 120,
+    ):
+        self.gameweek = gameweek
+        self.live = live
+        self.checking = checking
+        self.idle = idle
+        self.deadline_window = deadline_window
+
+    def __repr__(self) -> str:
+        return (
+            f"GameweekTTL(gameweek={self.gameweek!r}, live={self.live}, checking={self.checking}, "
+            f"idle={self.idle}, deadline_window={self.deadline_window})"
+        )
+
+    def __call__(
+        self,
+        arguments: Optional[Dict[str, Any]] = None,
+        now: Optional[datetime.datetime] = None,
+    ) -> Optional[float]:
+        """
+        Method to get the time an entry computed now should be kept for
+
+        Parameters
+        ----------
+        `arguments (Dict[str, Any])`: arguments of the cached call, bound to their names, default=None
+
+        `now (datetime)`: time entry is computed, if None then uses current time, default=None
+
+        Return
+        ------
+        `float`: time (minutes) to keep the entry, None to keep it forever, `live` if the calendar cannot be fetched
+
+        """
+        try:
+            events = get_bootstrap().events
+        except Exception:
+            # calendar unavailable, keep the entry for the shortest time
+            return self.live
+        now = _calendar_now() if now is None else pd.Timestamp(now)
+        gameweek = (arguments or {}).get(self.gameweek) if self.gameweek else None
+        if gameweek is not None:
+            return self.gameweek_ttl(int(gameweek), events, now)
+        return self.calendar_ttl(events, now)
+
+    def gameweek_ttl(
+        self, gameweek: int, events: pd.DataFrame, now: pd.Timestamp
+    ) -> Optional[float]:
+        """
+        Method to get the time (minutes) to keep data of one gameweek, None to keep it forever
+        """
+        event = events[events["id"] == gameweek]
+        if event.empty:
+            return self.idle
+        event = event.iloc[0]
+
+        if now < event["deadline_time"]:
+            until_deadline = (event["deadline_time"] - now).total_seconds() / 60
+            return min(self.idle, until_deadline)
+        if not event["finished"]:
+            return self.live
+        if not event.get("data_checked", False):
+            return self.checking
+        return None
+
+    def calendar_ttl(self, events: pd.DataFrame, now: pd.Timestamp) -> float:
+        """
+        Method to get the time (minutes) to keep data that changes with every gameweek
+        """
+        started = events[events["deadline_time"] <= now]
+        if not started.empty:
+            current = started.iloc[-1]
+            if not current["finished"]:
+                return self.live
+            if not current.get("data_checked", False):
+                return self.checking
+
+        upcoming = events[events["deadline_time"] > now]
+        if upcoming.empty:
+            return self.idle
+        until_window = (
+            upcoming["deadline_time"].iloc[0] - now
+        ).total_seconds() / 60 - self.deadline_window
+        if until_window <= 0:
+            return self.live
+        return max(self.live, min(self.idle, until_window))
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from typing import Dict, Optional
+
+import pytest
+from aiohttp import web
+
+from FPL.utils import clear_bootstrap
+from tools.mock_server import MockFPLData, MockFPLServer
+
+
+@pytest.fixture
+def local_server():
+    """
+    Fixture factory that serves an aiohttp handler on every path from a background thread and returns the base url
+    """
+    servers = []
+
+    def _serve(handler) -> str:
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+        servers.append((loop, runner, thread))
+        return f"http://127.0.0.1:{port}"
+
+    yield _serve
+
+    for loop, runner, thread in servers:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+    """
+    Fixture factory that starts a `MockFPLServer`, with `data` given as `MockFPLData` arguments and any other
+    argument passed to the server, and points the FPL helpers at it. The last server started is the one in use.
+    """
+    servers = []
+
+    def _serve(data: Optional[Dict] = None, **kwargs) -> MockFPLServer:
+        server = MockFPLServer(data=MockFPLData(**(data or {})), **kwargs).start()
+        servers.append(server)
+        monkeypatch.setenv("FPL_API_URL", server.url)
+        clear_bootstrap()
+        return server
+
+    yield _serve
+
+    for server in servers:
+        server.stop()
+    clear_bootstrap()
+
+
+@pytest.fixture
+def mock_api(request, monkeypatch, tmp_path, mock_server):
+    """
+    Fixture pointing the FPL helpers at a mock server, caching into a temporary folder. Parametrize it
+    indirectly with `mock_server` arguments, `data` updates the default {"league_size": 500, "current_gw": 5}
+    """
+    monkeypatch.chdir(tmp_path)
+    kwargs = dict(getattr(request, "param", {}))
+    data = {"league_size": 500, "current_gw": 5, **kwargs.pop("data", {})}
+    return mock_server(data=data, **kwargs)
@@ -0,0 +1,255 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from FPL.src import FPLReport, get_picks_matrix, iter_league_ids, iter_users
+from FPL.src.ownership import OWNERSHIP_FIELDS, OwnershipAggregator, PicksMatrix
+
+
+def user(elements, captain, vice):
+    return {
+        "picks": [
+            {
+                "element": element,
+                "position": position,
+                "multiplier": 1 if position <= 11 else 0,
+                "is_captain": element == captain,
+                "is_vice_captain": element == vice,
+            }
+            for position, element in enumerate(elements, start=1)
+        ]
+    }
+
+
+class TestOwnershipAggregator:
+    def test_counts(self):
+        users = [
+            user(range(1, 16), captain=1, vice=2),
+            user(range(2, 17), captain=2, vice=1),
+            {"detail": "Not found."},
+        ]
+        ownership = OwnershipAggregator(n_elements=4, buffer_size=10).update(users)
+        assert ownership.managers == 2
+        assert ownership.skipped == 1
+
+        frame = ownership.to_frame({1: "A", 2: "B"}).set_index("player")
+        assert frame.loc["B", "count"] == 2
+        assert frame.loc["B", "ownership (%)"] == 100
+        assert frame.loc["A", "ownership (%)"] == 50
+        assert frame.loc["A", ["captained", "vice"]].tolist() == [1, 0]
+        assert frame.loc["B", ["captained", "vice"]].tolist() == [1, 1]
+        # 12 starts for one manager and is benched by the other
+        assert frame.loc[12, ["started", "benched"]].tolist() == [1, 1]
+        assert frame.loc[16, ["started", "benched"]].tolist() == [0, 1]
+        assert len(frame) == 16
+        assert list(frame.columns) == [
+            "count",
+            "ownership (%)",
+            "started",
+            "captained",
+            "vice",
+            "benched",
+        ]
+
+    def test_ragged_and_large_ids(self):
+        ownership = OwnershipAggregator(n_elements=2)
+        ownership.add(user([700, 5], captain=700, vice=5))
+        ownership.add(user([5], captain=5, vice=None))
+        counts = ownership.counts
+        assert counts.shape == (len(OWNERSHIP_FIELDS), 1401)
+        assert counts[0, 5] == 2 and counts[2, 700] == 1
+
+    def test_matches_unique(self):
+        rng = np.random.default_rng(0)
+        users = [
+            user(rng.choice(600, 15, replace=False) + 1, captain=None, vice=None)
+            for _ in range(500)
+        ]
+        frame = OwnershipAggregator(buffer_size=1000).update(users).to_frame()
+        elements = np.array([[p["element"] for p in u["picks"]] for u in users])
+        unique, count = np.unique(elements, return_counts=True)
+        result = frame.set_index("player")["count"]
+        assert result.loc[unique].tolist() == count.tolist()
+
+    def test_empty(self):
+        assert OwnershipAggregator().to_frame().empty
+
+
+class TestPicksMatrix:
+    @pytest.fixture
+    def matrix(self):
+        users = [
+            user(range(1, 16), captain=1, vice=2),
+            user(range(2, 17), captain=2, vice=1),
+            {"detail": "Not found."},
+            user(range(30, 45), captain=30, vice=31),
+        ]
+        users[1]["picks"][0]["multiplier"] = 3
+        users[1]["active_chip"] = "3xc"
+        return PicksMatrix.from_users([10, 20, 30, 40], users, gameweek=5)
+
+    def test_structure(self, matrix):
+        assert matrix.positions.shape == (4, 45)
+        assert matrix.n_managers == 3
+        assert matrix.captains.tolist() == [1, 2, 0, 30]
+        assert matrix.chips.tolist() == ["", "3xc", "", ""]
+        # bench positions and multipliers are both kept
+        assert matrix.positions[0, 15] == 15
+        assert matrix.multiplier_matrix[0, 15] == 0
+        assert matrix.started.sum() == 33
+
+    def test_ownership(self, matrix):
+        ownership = matrix.ownership()
+        assert ownership[2] == pytest.approx(200 / 3)
+        assert ownership[16] == pytest.approx(100 / 3)
+        eo = matrix.effective_ownership()
+        # started by one manager and triple captained by another
+        assert eo[2] == pytest.approx(400 / 3)
+        assert eo[16] == 0
+
+    def test_template(self, matrix):
+        template = matrix.template()
+        assert template.tolist() == list(range(2, 16)) + [1]
+        assert matrix.template_overlap().tolist() == [15, 14, 0, 0]
+        assert matrix.template_overlap([1, 16, 30]).tolist() == [1, 1, 0, 1]
+        n_elements = matrix.positions.shape[1]
+        assert matrix.template_overlap([1, n_elements, 1000]).tolist() == [1, 0, 0, 0]
+        assert matrix.template_overlap([]).tolist() == [0, 0, 0, 0]
+
+    def test_differentials(self, matrix):
+        assert matrix.differentials(20, max_ownership=40).tolist() == [16]
+        assert len(matrix.differentials(40)) == 0
+        with pytest.raises(KeyError, match="99"):
+            matrix.differentials(99)
+
+    def test_similarity(self, matrix):
+        similarity = matrix.similarity()
+        assert similarity.shape == (4, 4)
+        assert similarity[0].tolist() == [15, 14, 0, 0]
+        assert matrix.similarity([40]).tolist() == [[0, 0, 0, 15]]
+        with pytest.raises(KeyError, match="99"):
+            matrix.similarity([99])
+
+    def test_save_load(self, matrix, tmp_path):
+        matrix.save(tmp_path / "picks.npz")
+        loaded = PicksMatrix.load(tmp_path / "picks.npz")
+        assert (loaded.positions != matrix.positions).nnz == 0
+        for attr in ["multipliers", "manager_ids", "captains", "vice_captains"]:
+            np.testing.assert_array_equal(getattr(loaded, attr), getattr(matrix, attr))
+        assert loaded.chips.tolist() == matrix.chips.tolist()
+        assert loaded.gameweek == 5
+        np.testing.assert_array_equal(loaded.carried, matrix.carried)
+        np.testing.assert_allclose(
+            loaded.effective_ownership(), matrix.effective_ownership()
+        )
+
+    def test_empty(self):
+        matrix = PicksMatrix.from_users([], [])
+        assert matrix.n_managers == 0
+        assert matrix.ownership().tolist() == [0]
+
+
+@pytest.mark.parametrize("mock_api", [{"data": {"league_size": 100}}], indirect=True)
+class TestStreaming:
+    def test_cached_and_uncached_agree(self, mock_api):
+        ids = range(1, 101)
+        cached = OwnershipAggregator().update(iter_users(ids, 5, chunk_size=32))
+        streamed = OwnershipAggregator().update(
+            iter_users(iter_league_ids(314), 5, chunk_size=32, cache=False)
+        )
+        assert cached.managers == streamed.managers == 100
+        np.testing.assert_array_equal(cached.counts, streamed.counts)
+        assert mock_api.requests["picks"] == 200
+
+
+def test_picks_matrix_matches_aggregator(mock_api):
+    ids = range(1, 51)
+    matrix = get_picks_matrix(ids, 5, chunk_size=20)
+    ownership = OwnershipAggregator().update(iter_users(ids, 5))
+    counts = np.asarray(matrix.owned.sum(axis=0)).ravel()
+    np.testing.assert_array_equal(counts, ownership.counts[0, : len(counts)])
+    assert matrix.manager_ids.tolist() == list(ids)
+    # the second pass is served from the per manager cache
+    assert mock_api.requests["picks"] == 50
+
+
+class TestEffectiveOwnership:
+    def test_chips(self):
+        users = [user(range(1, 16), captain=1, vice=2) for _ in range(4)]
+        # triple captain
+        users[1]["picks"][0]["multiplier"] = 3
+        users[1]["active_chip"] = "3xc"
+        # bench boost
+        users[2]["active_chip"] = "bboost"
+        for pick in users[2]["picks"]:
+            pick["multiplier"] = 2 if pick["is_captain"] else 1
+        for u in (users[0], users[3]):
+            u["picks"][0]["multiplier"] = 2
+        matrix = PicksMatrix.from_users(range(4), users)
+
+        frame = matrix.effective_ownership_frame({1: "A"}).set_index("player")
+        assert frame.loc["A", "effective ownership (%)"] == 225
+        assert frame.loc["A", "captained (%)"] == 100
+        assert frame.loc["A", "triple captained (%)"] == 25
+        assert frame.loc[2, "effective ownership (%)"] == 100
+        # benched by three managers, bench boosted by one
+        assert frame.loc[12, "benched (%)"] == 100
+        assert frame.loc[12, "effective ownership (%)"] == 25
+        assert frame.index[0] == "A"
+
+    def test_carried_squads(self):
+        users = [user(range(1, 16), captain=1, vice=2) for _ in range(2)]
+        for u in users:
+            u["picks"][0]["multiplier"] = 2
+        carried = {
+            "carried_forward_from": 3,
+            "picks": [{"element": e, "element_type": 1} for e in range(1, 16)],
+        }
+        users.append(carried)
+        matrix = PicksMatrix.from_users(range(3), users)
+        assert matrix.carried.tolist() == [False, False, True]
+        assert matrix.n_managers == 3 and matrix.n_lineups == 2
+        assert matrix.ownership()[1] == 100
+        # captaincy and effective ownership are of the fetched lineups only
+        frame = matrix.effective_ownership_frame().set_index("player")
+        assert frame.loc[1, "effective ownership (%)"] == 200
+        assert frame.loc[1, "captained (%)"] == 100
+        assert frame.loc[12, "benched (%)"] == 100
+        assert matrix.similarity()[2].tolist() == [15, 15, 15]
+
+        aggregator = OwnershipAggregator().update(users)
+        assert aggregator.carried == 1
+        pd.testing.assert_frame_equal(
+            matrix.to_frame().reset_index(drop=True),
+            aggregator.to_frame().reset_index(drop=True),
+        )
+
+    def test_matches_aggregator(self):
+        rng = np.random.default_rng(1)
+        users = [
+            user(rng.choice(600, 15, replace=False) + 1, captain=None, vice=None)
+            for _ in range(300)
+        ]
+        for u in users:
+            u["picks"][0]["is_captain"] = u["picks"][1]["is_vice_captain"] = True
+        users.append({"detail": "Not found."})
+        matrix = PicksMatrix.from_users(range(len(users)), users)
+        aggregator = OwnershipAggregator().update(users)
+        pd.testing.assert_frame_equal(
+            matrix.to_frame().reset_index(drop=True),
+            aggregator.to_frame().reset_index(drop=True),
+        )
+
+
+def test_report_effective_ownership_tab(mock_api):
+    report = FPLReport(gw=5)
+    report.generate_top_managers(n=40)
+    assert report.overall_top_n_tbl["count"].max() <= 40
+    eo = report.overall_top_n_eo_tbl
+    assert eo["effective ownership (%)"].is_monotonic_decreasing
+    # every manager has a captain
+    assert eo["captained (%)"].sum() == pytest.approx(100)
+
+    report._prepare_run()
+    assert "effective_ownership" in report.tab
+    assert report.eo_options == ["Top 40"]
@@ -0,0 +1,31 @@
+import os
+
+from FPL.utils.caching import dir_cache
+from tools.manage_cache import main
+
+
+class TestManageCache:
+    def test_commands(self, tmp_path, capsys):
+        cache_dir = str(tmp_path / "cache")
+
+        @dir_cache(cache_dir=cache_dir)
+        def f(i):
+            return [i] * 100
+
+        for i in range(3):
+            f(i)
+
+        main(["--cache-dir", cache_dir, "list"])
+        assert capsys.readouterr().out.count("test_commands.<locals>.f") == 3
+
+        main(["--cache-dir", cache_dir, "prune", "--max-age", "0", "--dry-run"])
+        assert "would remove 3 entries" in capsys.readouterr().out
+
+        main(["--cache-dir", cache_dir, "compact"])
+        assert "removed 0 files" in capsys.readouterr().out
+
+        main(["--cache-dir", cache_dir, "prune", "--max-age", "0"])
+        assert "removed 3 entries" in capsys.readouterr().out
+
+        main(["--cache-dir", cache_dir, "clear"])
+        assert os.listdir(cache_dir) == []
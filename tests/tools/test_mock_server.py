@@ -0,0 +1,125 @@
+import pytest
+
+from FPL.src import (
+    get_player_info,
+    get_users,
+    get_users_history,
+    get_users_id,
+    iter_league_ids,
+)
+from FPL.utils import fetch_request, get_current_gw
+from FPL.utils._get_api_url import _get_api_url
+from tools.mock_server import MockFPLData
+
+
+class TestMockFPLData:
+    def test_picks_consistent_with_history(self):
+        data = MockFPLData(league_size=10, current_gw=12)
+        history = data.history(3)["current"]
+        for gw in range(1, 13):
+            picks = data.picks(3, gw)
+            assert len(picks["picks"]) == 15
+            assert picks["entry_history"] == history[gw - 1]
+
+    def test_transfers_change_squad(self):
+        data = MockFPLData(league_size=10, current_gw=12)
+        for transfer in data.transfers(5):
+            gw = transfer["event"]
+            before = {p["element"] for p in data.picks(5, gw - 1)["picks"]}
+            after = {p["element"] for p in data.picks(5, gw)["picks"]}
+            assert transfer["element_in"] in after
+            assert before != after
+
+    def test_unknown_entry(self):
+        assert MockFPLData(league_size=10).entry(11) is None
+
+
+class TestMockFPLServer:
+    def test_helpers(self, mock_api):
+        assert get_current_gw() == 5
+        ids = get_users_id(314, top_n=120, refresh=0)
+        assert ids == list(range(1, 121))
+        users = get_users(ids[:10], 5)
+        assert all(len(user["picks"]) == 15 for user in users)
+        players = get_player_info([1, 2, 3], refresh=0)
+        assert [p["history"][0]["element"] for p in players] == [1, 2, 3]
+        assert mock_api.requests["picks"] == 10
+
+    def test_only_missing_entities_fetched(self, mock_api):
+        get_users(list(range(1, 11)), 5)
+        users = get_users(list(range(6, 16)), 5)
+        assert [user["entry_history"]["event"] for user in users] == [5] * 10
+        assert mock_api.requests["picks"] == 15
+        # another gameweek is another entity
+        get_users([1], 4)
+        assert mock_api.requests["picks"] == 16
+
+        get_player_info([1, 2, 3])
+        players = get_player_info([3, 4, 3])
+        assert [p["history"][0]["element"] for p in players] == [3, 4, 3]
+        assert mock_api.requests["element"] == 4
+
+    def test_incremental_picks(self, mock_api):
+        data = MockFPLData(league_size=500, current_gw=5)
+        ids = list(range(1, 41))
+        get_users(ids, 1)
+        # without cached history every manager's picks are fetched, and nothing else
+        get_users(ids, 2, incremental=True)
+        assert mock_api.requests["picks"] == 2 * len(ids)
+        assert mock_api.requests["history"] == 0
+
+        get_users_history(ids)
+        fetched = 0
+        for gw in range(3, 6):
+            users = get_users(ids, gw, incremental=True)
+            carried = 0
+            for id, user in zip(ids, users):
+                assert user["entry_history"]["event"] == gw
+                if "carried_forward_from" in user:
+                    carried += 1
+                    actual = {p["element"] for p in data.picks(id, gw)["picks"]}
+                    assert {p["element"] for p in user["picks"]} == actual
+                    # the lineup and captaincy are not known
+                    assert set(user["picks"][0]) == {"element", "element_type"}
+            assert 0 < carried < len(ids)
+            fetched += len(ids) - carried
+        assert mock_api.requests["history"] == len(ids)
+        assert mock_api.requests["picks"] == 2 * len(ids) + fetched
+
+        # carried squads are not cached as the gameweek's picks
+        users = get_users(ids, 5)
+        assert all("carried_forward_from" not in user for user in users)
+        assert mock_api.requests["picks"] == 2 * len(ids) + fetched + carried
+
+    def test_exact_standings_pages(self, mock_api):
+        assert get_users_id(314, top_n=120, refresh=0) == list(range(1, 121))
+        assert mock_api.requests["standings"] == 3
+
+        # stops at the last page of the league
+        assert len(get_users_id(314, top_n=10_000, refresh=0)) == 500
+        # pages past the last are only those in flight, the slow start window is at most the pages fetched
+        assert 3 + 10 <= mock_api.requests["standings"] <= 3 + 10 + 10
+
+    def test_stream_league_ids(self, mock_api):
+        ids = iter_league_ids(314, start_page=3)
+        assert next(ids) == 101
+        ids.close()
+        assert list(iter_league_ids(314, top_n=5, start_page=10)) == list(
+            range(451, 456)
+        )
+        assert list(iter_league_ids(314, start_page=9)) == list(range(401, 501))
+        with pytest.raises(ValueError):
+            next(iter_league_ids(314, start_page=0))
+
+    def test_not_found(self, mock_api):
+        assert fetch_request(_get_api_url("entry", 10_000)) == {"detail": "Not found."}
+
+    @pytest.mark.parametrize(
+        "mock_api",
+        [{"data": {"league_size": 100}, "error_rate": 0.2, "throttle": 200}],
+        indirect=True,
+    )
+    def test_errors_and_throttling_are_retried(self, mock_api):
+        users = get_users(list(range(1, 101)), 3, max_attempts=20)
+        assert len(users) == 100
+        assert all("picks" in user for user in users)
@@ -0,0 +1,68 @@
+import threading
+import time
+
+import pytest
+
+from FPL.utils import bootstrap
+from FPL.utils.bootstrap import BootstrapSnapshot, clear_bootstrap, get_bootstrap
+
+
+@pytest.fixture
+def bootstrap_json():
+    return {
+        "elements": [
+            {"id": 1, "first_name": "Erling", "second_name": "Haaland", "team": 1},
+            {"id": 2, "first_name": "Mohamed", "second_name": "Salah", "team": 2},
+        ],
+        "teams": [{"id": 1, "name": "Man City"}, {"id": 2, "name": "Liverpool"}],
+        "events": [
+            {"id": 1, "deadline_time": "2000-08-11T17:30:00Z"},
+            {"id": 2, "deadline_time": "2000-08-18T17:30:00Z"},
+            {"id": 3, "deadline_time": "2999-08-25T17:30:00Z"},
+        ],
+    }
+
+
+@pytest.fixture
+def counted_fetch(monkeypatch, bootstrap_json):
+    calls = []
+
+    def _fetch_request(url):
+        calls.append(url)
+        time.sleep(0.05)
+        return bootstrap_json
+
+    monkeypatch.setattr(bootstrap, "fetch_request", _fetch_request)
+    clear_bootstrap()
+    yield calls
+    clear_bootstrap()
+
+
+class TestBootstrapSnapshot:
+    def test_id_dicts(self, bootstrap_json):
+        snapshot = BootstrapSnapshot(bootstrap_json)
+        assert snapshot.player_id_dict == {1: "Erling Haaland", 2: "Mohamed Salah"}
+        assert snapshot.player_name_dict == {"Erling Haaland": 1, "Mohamed Salah": 2}
+        assert snapshot.team_id_dict == {1: "Man City", 2: "Liverpool"}
+
+    def test_current_gw(self, bootstrap_json):
+        assert BootstrapSnapshot(bootstrap_json).current_gw() == 2
+
+    def test_single_flight(self, counted_fetch):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(get_bootstrap()))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(counted_fetch) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_refresh(self, counted_fetch):
+        get_bootstrap()
+        get_bootstrap(refresh=0)
+        assert len(counted_fetch) == 2
@@ -0,0 +1,230 @@
+import os
+import time
+
+import pytest
+
+from FPL.utils import cache_manager
+from FPL.utils.cache_manager import (
+    compact,
+    list_entries,
+    prune,
+    set_cache_budget,
+)
+from FPL.utils.caching import (
+    _entry_lock,
+    batch_cache,
+    dir_cache,
+    flush_hits,
+    get_memory_cache,
+)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    folder = str(tmp_path / "cache")
+    yield folder
+    set_cache_budget(None, folder)
+
+
+def make_entries(cache_dir, n, size=1000, **kwargs):
+    calls = []
+
+    @dir_cache(cache_dir=cache_dir, **kwargs)
+    def f(i):
+        calls.append(i)
+        return b"x" * size
+
+    for i in range(n):
+        f(i)
+    return f, calls
+
+
+def age(cache_dir, name, seconds):
+    """
+    Function to move the last access of an entry into the past
+    """
+    path = os.path.join(cache_dir, name + ".hits")
+    if not os.path.exists(path):
+        open(path, "wb").close()
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+class TestListEntries:
+    def test_hits_and_function(self, cache_dir):
+        f, _ = make_entries(cache_dir, 2, memory=False)
+        for _ in range(3):
+            f(0)
+        entries = list_entries(cache_dir).set_index("hits")
+        assert sorted(entries.index) == [0, 3]
+        assert entries.loc[3, "function"].endswith("make_entries.<locals>.f")
+        assert (entries["size"] > 1000).all()
+
+    def test_memory_hits_flushed(self, cache_dir):
+        f, calls = make_entries(cache_dir, 1)
+        for _ in range(5):
+            f(0)
+        flush_hits()
+        assert calls == [0]
+        assert list_entries(cache_dir)["hits"].tolist() == [5]
+
+    def test_missing_folder(self, tmp_path):
+        assert list_entries(str(tmp_path / "missing")).empty
+
+
+class TestPrune:
+    def test_lru(self, cache_dir):
+        make_entries(cache_dir, 4, memory=False)
+        names = list_entries(cache_dir)["name"].tolist()
+        for i, name in enumerate(names):
+            age(cache_dir, name, 100 * (i + 1))
+        entries = list_entries(cache_dir)
+
+        removed = prune(cache_dir, max_bytes=entries["size"].sum() - 1)
+        # least recently used entry goes
+        assert removed["name"].tolist() == [names[-1]]
+        assert len(list_entries(cache_dir)) == 3
+
+    def test_lfu(self, cache_dir):
+        f, _ = make_entries(cache_dir, 3, memory=False)
+        for i, n in [(0, 3), (1, 1), (2, 2)]:
+            for _ in range(n):
+                f(i)
+        removed = prune(cache_dir, max_bytes=1, policy="lfu", dry_run=True)
+        assert sorted(removed["hits"]) == [1, 2, 3]
+        assert len(list_entries(cache_dir)) == 3
+
+        removed = prune(
+            cache_dir, max_bytes=list_entries(cache_dir)["size"].max() + 1, policy="lfu"
+        )
+        assert list_entries(cache_dir)["hits"].tolist() == [3]
+
+    def test_max_age_and_expired(self, cache_dir):
+        make_entries(cache_dir, 2, refresh=lambda arguments: arguments["i"] / 60)
+        bases = list_entries(cache_dir)["base"].tolist()
+        time.sleep(0.01)
+        # entry 0 expired immediately, entry 1 after a second
+        removed = prune(cache_dir)
+        assert len(removed) == 1
+        assert len(prune(cache_dir, max_age=0)) == 1
+        assert list_entries(cache_dir).empty
+        # dropped from memory too
+        for base in bases:
+            assert get_memory_cache().get(base, float("inf")) == (False, None)
+
+    def test_removed_entry_recomputed(self, cache_dir):
+        f, calls = make_entries(cache_dir, 1)
+        prune(cache_dir, max_age=0)
+        f(0)
+        assert calls == [0, 0]
+
+    def test_locked_entry_skipped(self, cache_dir):
+        make_entries(cache_dir, 1)
+        base = list_entries(cache_dir)["base"].iloc[0]
+        with _entry_lock(base):
+            assert prune(cache_dir, max_age=0).empty
+        assert len(prune(cache_dir, max_age=0)) == 1
+
+    def test_batch_hits_counted(self, cache_dir):
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids):
+            return [b"x" * 1000 for _ in ids]
+
+        f(list(range(10)))
+        time.sleep(0.01)
+        for _ in range(2):
+            f(list(range(5)))
+        # without flush_hits, as in a long running process
+        entries = list_entries(cache_dir)
+        read = entries["hits"] > 0
+        assert read.sum() == 5
+        prune(cache_dir, max_bytes=entries.loc[read, "size"].sum())
+        assert len(list_entries(cache_dir)) == 5
+        assert len(f.lookup(list(range(5)))) == 5
+
+    def test_batch_write_skipped(self, cache_dir):
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids):
+            return list(ids)
+
+        f([1, 2])
+        with _entry_lock(os.path.join(cache_dir, "f.batch")):
+            assert prune(cache_dir, max_age=0).empty
+        assert len(prune(cache_dir, max_age=0)) == 2
+
+    def test_invalid_policy(self, cache_dir):
+        with pytest.raises(ValueError):
+            prune(cache_dir, policy="fifo")
+
+
+class TestBudget:
+    def test_budget_enforced_on_write(self, cache_dir):
+        set_cache_budget(3500, cache_dir)
+        f, calls = make_entries(cache_dir, 6, memory=False)
+        entries = list_entries(cache_dir)
+        assert len(entries) < 6
+        assert cache_manager.cache_size(cache_dir) <= 3500
+        # entry just written is kept
+        f(5)
+        assert calls == list(range(6))
+
+    def test_budget_running_size(self, cache_dir, monkeypatch):
+        scans = []
+        cache_size = cache_manager.cache_size
+        monkeypatch.setattr(
+            cache_manager,
+            "cache_size",
+            lambda folder: scans.append(folder) or cache_size(folder),
+        )
+        set_cache_budget(10**6, cache_dir)
+        make_entries(cache_dir, 50, memory=False)
+        # measured on the first write only, later writes add to the running size
+        assert len(scans) == 1
+
+        set_cache_budget(20_000, cache_dir)
+        make_entries(cache_dir, 10, memory=False, version=1)
+        # pruned down to the low water mark
+        assert cache_size(cache_dir) <= 20_000 * cache_manager.BUDGET_LOW_WATER + 1300
+        assert len(scans) < 10
+
+    def test_budget_removed(self, cache_dir):
+        set_cache_budget(1, cache_dir)
+        set_cache_budget(None, cache_dir)
+        make_entries(cache_dir, 3)
+        assert len(list_entries(cache_dir)) == 3
+
+
+class TestCompact:
+    def test_debris_removed(self, cache_dir):
+        make_entries(cache_dir, 1)
+        names = set(os.listdir(cache_dir))
+        debris = {
+            "old_result.pkl": b"x",
+            "f_0123.meta.json": b'{"file": "f_0123.pkl"}',
+            "gone.hits": b"...",
+            "gone.lock": b"",
+            "leftover.tmp": b"x",
+            "fresh.tmp": b"x",
+        }
+        for name, content in debris.items():
+            with open(os.path.join(cache_dir, name), "wb") as f:
+                f.write(content)
+        past = time.time() - 7200
+        os.utime(os.path.join(cache_dir, "leftover.tmp"), (past, past))
+
+        removed = {os.path.basename(path) for path in compact(cache_dir)}
+        assert removed == set(debris) - {"fresh.tmp"}
+        assert set(os.listdir(cache_dir)) == names | {"fresh.tmp"}
+
+    def test_batch_write_in_progress(self, cache_dir):
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids):
+            return list(ids)
+
+        f([1])
+        (base,) = list_entries(cache_dir)["base"]
+        # data file renamed into place, metadata not written yet
+        os.remove(base + ".meta.json")
+        with _entry_lock(os.path.join(cache_dir, "f.batch")):
+            assert compact(cache_dir) == []
+        assert base + ".pkl" in compact(cache_dir)
@@ -0,0 +1,90 @@
+import json
+import time
+
+import pytest
+
+from FPL.utils.cache_stats import CacheStats, get_cache_stats
+from FPL.utils.caching import batch_cache, dir_cache, wait_for_refreshes
+
+
+@pytest.fixture
+def stats():
+    stats = get_cache_stats()
+    stats.reset()
+    yield stats
+    stats.reset()
+
+
+def name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class TestCacheStats:
+    def test_hits_and_misses(self, stats, tmp_path):
+        @dir_cache(cache_dir=str(tmp_path))
+        def f(x):
+            time.sleep(0.01)
+            return [x] * 1000
+
+        @dir_cache(cache_dir=str(tmp_path), memory=False)
+        def g(x):
+            return [x] * 1000
+
+        for x in [1, 1, 1, 2]:
+            f(x)
+            g(x)
+
+        summary = stats.summary(name(f))
+        assert summary["hits"] == summary["memory_hits"] == 2
+        assert summary["misses"] == 2
+        assert summary["hit_rate"] == 0.5
+        assert summary["recompute_time"] >= 0.02
+        assert summary["bytes_written"] > 0
+        assert summary["bytes_read"] == 0
+
+        summary = stats.summary(name(g))
+        assert summary["hits"] == 2 and summary["memory_hits"] == 0
+        assert summary["bytes_read"] == summary["bytes_written"]
+        assert summary["mean_deserialize_time"] > 0
+
+    def test_stale_hits_and_refreshes(self, stats, tmp_path):
+        @dir_cache(refresh=0.001, max_stale=1, cache_dir=str(tmp_path))
+        def f():
+            return 1
+
+        f()
+        time.sleep(0.1)
+        f()
+        assert wait_for_refreshes(5)
+        summary = stats.summary(name(f))
+        assert summary["stale_hits"] == 1
+        assert summary["refreshes"] == 1
+        assert summary["misses"] == 1
+
+    def test_batch_counts_keys(self, stats, tmp_path):
+        @batch_cache(cache_dir=str(tmp_path))
+        def f(ids):
+            return ids
+
+        f([1, 2])
+        f([2, 3])
+        summary = stats.summary(name(f))
+        assert summary["misses"] == 3
+        assert summary["hits"] == 1
+
+    def test_frame_and_write(self, tmp_path):
+        stats = CacheStats()
+        stats.record("a", hits=1)
+        stats.record("b", hits=3, misses=1, recompute_time=2.0)
+        frame = stats.to_frame()
+        assert frame.index.tolist() == ["b", "a"]
+        assert frame.loc["b", "mean_recompute_time"] == 2.0
+
+        path = str(tmp_path / "stats.json")
+        stats.write(path)
+        with open(path) as f:
+            assert json.load(f)["b"]["hits"] == 3
+
+        stats.reset()
+        assert stats.summary() == {}
+        assert stats.to_frame().empty
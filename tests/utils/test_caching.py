@@ -1,4 +1,9 @@
+import json
 import os
+import pickle
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import shutil
 
 import numpy as np
@@ -6,7 +11,16 @@ import pandas as pd
 import pytest
 from pandas.testing import assert_frame_equal
 
-from FPL.utils.caching import clear_dir_cache, dir_cache
+from FPL.utils.caching import (
+    MemoryCache,
+    batch_cache,
+    cache_key,
+    clear_dir_cache,
+    dir_cache,
+    flush_hits,
+    get_memory_cache,
+    wait_for_refreshes,
+)
 
 
 @pytest.fixture
@@ -22,9 +36,20 @@ def data():
     )
 
 
+def entries(cache_dir):
+    """
+    Function to list cache entry files, without their metadata, lock and hit files
+    """
+    return [
+        file
+        for file in os.listdir(cache_dir)
+        if not file.endswith((".meta.json", ".lock", ".hits"))
+    ]
+
+
 @pytest.fixture(scope="function")
-def cache_dir():
-    folder = "./.cache_folder_test"
+def cache_dir(tmp_path):
+    folder = str(tmp_path / ".cache_folder_test")
     os.makedirs(folder, exist_ok=True)
     return folder
 
@@ -46,3 +71,496 @@ class TestCaching:
         result_cached = f()
         assert_frame_equal(result_cached, result)
         shutil.rmtree(cache_dir)
+
+    def test_dir_cache_keys_on_arguments(self, cache_dir):
+        calls = []
+
+        @dir_cache(cache_dir=cache_dir)
+        def f(league_id, top_n=50):
+            calls.append((league_id, top_n))
+            return [league_id] * top_n
+
+        assert f(1, 2) == [1, 1]
+        assert f(2, 2) == [2, 2]
+        # same call spelt differently hits the same entry
+        assert f(league_id=1, top_n=2) == [1, 1]
+        assert f(3) == f(3, top_n=50)
+        assert calls == [(1, 2), (2, 2), (3, 50)]
+        assert len(entries(cache_dir)) == 3
+        shutil.rmtree(cache_dir)
+
+    def test_dir_cache_version(self, cache_dir):
+        calls = []
+
+        def make(version):
+            @dir_cache(cache_dir=cache_dir, version=version)
+            def f():
+                calls.append(version)
+                return version
+
+            return f
+
+        assert make(1)() == 1
+        assert make(1)() == 1
+        # same function and arguments, new result format
+        assert make(2)() == 2
+        assert calls == [1, 2]
+        shutil.rmtree(cache_dir)
+
+    def test_cache_key(self, data):
+        def f(ids, frame=None):
+            pass
+
+        def g(ids, frame=None):
+            pass
+
+        assert cache_key(f, ([1, 2],)) == cache_key(f, (), {"ids": [1, 2]})
+        assert cache_key(f, ([1, 2],)) != cache_key(f, ([2, 1],))
+        assert cache_key(f, ([1, 2],)) != cache_key(g, ([1, 2],))
+        assert cache_key(f, ([1],), {"frame": data}) == cache_key(
+            f, ([1],), {"frame": data.copy()}
+        )
+        assert cache_key(f, ({"a": 1, "b": 2},)) == cache_key(f, ({"b": 2, "a": 1},))
+
+
+class TestMemoryCache:
+    def test_memory_hit_skips_disk(self, cache_dir):
+        calls = []
+
+        @dir_cache(cache_dir=cache_dir)
+        def f(x):
+            calls.append(x)
+            return {"x": x}
+
+        first = f(1)
+        shutil.rmtree(cache_dir)
+        # served from memory with the file gone
+        assert f(1) is first
+        assert calls == [1]
+
+    def test_memory_disabled(self, cache_dir):
+        @dir_cache(cache_dir=cache_dir, memory=False)
+        def f():
+            return {"x": 1}
+
+        assert f() is not f()
+        shutil.rmtree(cache_dir)
+
+    def test_frames_not_mutated(self, data, cache_dir):
+        @dir_cache(cache_dir=cache_dir)
+        def f():
+            return data.copy()
+
+        frame = f()
+        frame["new"] = 1
+        assert "new" not in f().columns
+        shutil.rmtree(cache_dir)
+
+    def test_refresh_applies_to_memory(self, cache_dir):
+        calls = []
+
+        def g(refresh):
+            @dir_cache(refresh=refresh, cache_dir=cache_dir)
+            def f():
+                calls.append(1)
+                return len(calls)
+
+            return f()
+
+        assert g(30) == 1
+        assert g(30) == 1
+        assert g(0) == 2
+        shutil.rmtree(cache_dir)
+
+    def test_lru_budget(self):
+        cache = MemoryCache(max_bytes=100, max_entries=3)
+        for i in range(4):
+            cache.put(f"/c/{i}", i, 10)
+        assert len(cache) == 3
+        assert cache.get("/c/0", 60) == (False, None)
+        # touching 1 makes 2 the least recently used
+        assert cache.get("/c/1", 60) == (True, 1)
+        cache.put("/c/big", "big", 80)
+        assert cache.get("/c/2", 60) == (False, None)
+        assert cache.get("/c/1", 60) == (True, 1)
+        assert cache.nbytes <= 100
+        cache.put("/c/huge", "huge", 1000)
+        assert cache.get("/c/huge", 60) == (False, None)
+
+    def test_clear_by_dir(self):
+        cache = MemoryCache()
+        cache.put(os.path.abspath("./a/x.pkl"), 1, 1)
+        cache.put(os.path.abspath("./b/x.pkl"), 2, 1)
+        cache.clear("./a")
+        assert len(cache) == 1
+        assert cache.nbytes == 1
+
+
+class TestColumnarFormat:
+    def test_frame_stored_as_feather(self, data, cache_dir):
+        pytest.importorskip("pyarrow")
+        frame = data.set_index("x1")
+
+        @dir_cache(cache_dir=cache_dir, memory=False)
+        def f():
+            return frame
+
+        assert_frame_equal(f(), frame)
+        files = entries(cache_dir)
+        assert len(files) == 1 and files[0].endswith(".feather")
+        assert_frame_equal(f(), frame)
+
+    def test_parquet_and_projection(self, data, cache_dir):
+        pytest.importorskip("pyarrow")
+
+        def g(columns):
+            @dir_cache(cache_dir=cache_dir, fmt="parquet", columns=columns)
+            def f():
+                return data
+
+            return f()
+
+        assert_frame_equal(g(None), data)
+        assert entries(cache_dir)[0].endswith(".parquet")
+        get_memory_cache().clear()
+        assert_frame_equal(g(["x2", "x3"]), data[["x2", "x3"]])
+        # projection also applies to memory hits
+        g(None)
+        assert_frame_equal(g(["x8"]), data[["x8"]])
+
+    def test_unsupported_frame_pickled(self, cache_dir):
+        pytest.importorskip("pyarrow")
+        frame = pd.DataFrame({"mixed": [1, "a", None]})
+
+        @dir_cache(cache_dir=cache_dir, memory=False)
+        def f():
+            return frame
+
+        assert_frame_equal(f(), frame)
+        assert_frame_equal(f(), frame)
+        assert entries(cache_dir)[0].endswith(".pkl")
+
+    def test_array_memory_map(self, cache_dir):
+        array = np.arange(1000, dtype=float)
+
+        @dir_cache(cache_dir=cache_dir, memory=False, memory_map=True)
+        def f():
+            return array
+
+        f()
+        cached = f()
+        assert isinstance(cached, np.memmap)
+        np.testing.assert_array_equal(cached, array)
+
+    def test_format_change_replaces_entry(self, data, cache_dir):
+        pytest.importorskip("pyarrow")
+
+        def g(fmt):
+            @dir_cache(refresh=0, cache_dir=cache_dir, fmt=fmt)
+            def f():
+                return data
+
+            return f()
+
+        g("pickle")
+        g("feather")
+        files = entries(cache_dir)
+        assert len(files) == 1 and files[0].endswith(".feather")
+
+    def test_invalid_format(self):
+        with pytest.raises(ValueError):
+            dir_cache(fmt="csv")
+
+
+def _slow_count(cache_dir, counter):
+    @dir_cache(cache_dir=cache_dir, memory=False)
+    def f():
+        with open(counter, "a") as file:
+            file.write("x")
+        time.sleep(0.3)
+        return list(range(100))
+
+    return f()
+
+
+class TestMultiProcess:
+    def test_corrupt_entry_recomputed(self, cache_dir):
+        calls = []
+
+        @dir_cache(cache_dir=cache_dir, memory=False)
+        def f():
+            calls.append(1)
+            return {"x": len(calls)}
+
+        assert f() == {"x": 1}
+        (path,) = entries(cache_dir)
+        with open(os.path.join(cache_dir, path), "r+b") as file:
+            file.seek(-2, os.SEEK_END)
+            file.write(b"\x00\x00")
+        assert f() == {"x": 2}
+        assert f() == {"x": 2}
+
+    def test_entry_without_metadata_is_miss(self, cache_dir):
+        calls = []
+
+        @dir_cache(cache_dir=cache_dir, memory=False)
+        def f():
+            calls.append(1)
+            return 1
+
+        f()
+        for file in os.listdir(cache_dir):
+            if file.endswith(".meta.json"):
+                os.remove(os.path.join(cache_dir, file))
+        f()
+        assert len(calls) == 2
+
+    def test_no_temporary_files_left(self, cache_dir):
+        @dir_cache(cache_dir=cache_dir)
+        def f():
+            return list(range(10))
+
+        f()
+        assert not [file for file in os.listdir(cache_dir) if file.endswith(".tmp")]
+
+    def test_single_recompute_across_threads(self, cache_dir, tmp_path):
+        counter = str(tmp_path / "counter")
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            results = list(
+                executor.map(lambda _: _slow_count(cache_dir, counter), range(6))
+            )
+        assert all(result == list(range(100)) for result in results)
+        with open(counter) as file:
+            assert file.read() == "x"
+
+    def test_single_recompute_across_processes(self, cache_dir, tmp_path):
+        counter = str(tmp_path / "counter")
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(_slow_count, cache_dir, counter) for _ in range(3)
+            ]
+            results = [future.result() for future in futures]
+        assert all(result == list(range(100)) for result in results)
+        with open(counter) as file:
+            assert file.read() == "x"
+
+
+class TestStaleWhileRevalidate:
+    @pytest.mark.parametrize("memory", [True, False])
+    def test_stale_returned_then_refreshed(self, cache_dir, memory):
+        calls = []
+        release = threading.Event()
+
+        @dir_cache(refresh=0.001, max_stale=1, cache_dir=cache_dir, memory=memory)
+        def f():
+            if calls:
+                release.wait(5)
+            calls.append(1)
+            return len(calls)
+
+        assert f() == 1
+        time.sleep(0.1)
+        # expired, served straight away while a single refresh runs
+        assert f() == 1
+        assert f() == 1
+        release.set()
+        assert wait_for_refreshes(5)
+        assert len(calls) == 2
+        assert f() == 2
+
+    def test_blocks_past_max_stale(self, cache_dir):
+        calls = []
+
+        @dir_cache(refresh=0.001, max_stale=0.001, cache_dir=cache_dir)
+        def f():
+            calls.append(1)
+            return len(calls)
+
+        assert f() == 1
+        time.sleep(0.2)
+        assert f() == 2
+
+    def test_failed_refresh_keeps_entry(self, cache_dir):
+        calls = []
+
+        @dir_cache(refresh=0.001, max_stale=1, cache_dir=cache_dir, memory=False)
+        def f():
+            calls.append(1)
+            if len(calls) > 1:
+                raise ConnectionError("down")
+            return 1
+
+        assert f() == 1
+        time.sleep(0.1)
+        with pytest.warns(RuntimeWarning, match="background refresh"):
+            assert f() == 1
+            assert wait_for_refreshes(5)
+            # still served, and refreshed again
+            assert f() == 1
+            assert wait_for_refreshes(5)
+        assert len(calls) == 3
+
+
+def read_meta(cache_dir):
+    (file,) = [file for file in os.listdir(cache_dir) if file.endswith(".meta.json")]
+    with open(os.path.join(cache_dir, file)) as f:
+        return json.load(f)
+
+
+class TestCompression:
+    @pytest.mark.parametrize("codec", ["zstd", "lz4"])
+    def test_pickle_compressed(self, cache_dir, codec):
+        picks = [
+            {"picks": [{"element": i, "position": i, "multiplier": 1}] * 15}
+            for i in range(500)
+        ]
+
+        @dir_cache(
+            cache_dir=cache_dir, memory=False, compression=codec, compress_min_bytes=0
+        )
+        def f():
+            return picks
+
+        assert f() == picks
+        assert f() == picks
+        meta = read_meta(cache_dir)
+        assert meta["codec"] == codec
+        assert meta["size"] < len(pickle.dumps(picks)) / 2
+
+    def test_below_threshold_uncompressed(self, cache_dir):
+        @dir_cache(cache_dir=cache_dir, memory=False, compression="zstd")
+        def f():
+            return [1, 2, 3]
+
+        assert f() == [1, 2, 3]
+        assert read_meta(cache_dir)["codec"] is None
+
+    def test_frame_and_array(self, data, cache_dir):
+        @dir_cache(
+            cache_dir=cache_dir, memory=False, compression="zstd", compress_min_bytes=0
+        )
+        def frame():
+            return data
+
+        @dir_cache(
+            cache_dir=cache_dir, memory=False, compression="lz4", compress_min_bytes=0
+        )
+        def array():
+            return np.zeros(10_000)
+
+        frame()
+        assert_frame_equal(frame(), data)
+        array()
+        np.testing.assert_array_equal(array(), np.zeros(10_000))
+        codecs = {}
+        for file in os.listdir(cache_dir):
+            if file.endswith(".meta.json"):
+                with open(os.path.join(cache_dir, file)) as f:
+                    meta = json.load(f)
+                codecs[meta["format"]] = meta["codec"]
+        assert codecs == {"feather": "zstd", "numpy": "lz4"}
+
+    def test_memory_mapped_uncompressed(self, cache_dir):
+        @dir_cache(
+            cache_dir=cache_dir,
+            memory=False,
+            memory_map=True,
+            compression="zstd",
+            compress_min_bytes=0,
+        )
+        def f():
+            return np.arange(1000)
+
+        f()
+        assert isinstance(f(), np.memmap)
+        assert read_meta(cache_dir)["codec"] is None
+
+    def test_invalid_codec(self):
+        with pytest.raises(ValueError):
+            dir_cache(compression="gzip")
+
+
+class TestBatchCache:
+    def test_only_missing_keys_computed(self, cache_dir):
+        batches = []
+
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids, scale=1):
+            batches.append(list(ids))
+            return [id * scale for id in ids]
+
+        assert f([1, 2, 3]) == [1, 2, 3]
+        assert f([3, 4, 2, 4]) == [3, 4, 2, 4]
+        assert f([1, 2], scale=10) == [10, 20]
+        assert batches == [[1, 2, 3], [4], [1, 2]]
+        assert f([4, 3, 2, 1]) == [4, 3, 2, 1]
+        assert len(batches) == 3
+
+    def test_lookup(self, cache_dir):
+        batches = []
+
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids, gw):
+            batches.append(list(ids))
+            return [(id, gw) for id in ids]
+
+        f([1, 2], 1)
+        assert f.lookup([2, 3, 1], 1) == {2: (2, 1), 1: (1, 1)}
+        assert f.lookup([1], 2) == {}
+        assert batches == [[1, 2]]
+
+    def test_policy_sees_key(self, cache_dir):
+        batches = []
+
+        @batch_cache(
+            refresh=lambda arguments: None if arguments["gw"] < 3 else 0,
+            cache_dir=cache_dir,
+        )
+        def f(ids, gw):
+            batches.append(list(ids))
+            return [(id, gw) for id in ids]
+
+        f([1, 2], 1)
+        f([1, 2], 5)
+        f([1, 2], 1)
+        f([1, 2], 5)
+        assert batches == [[1, 2], [1, 2], [1, 2]]
+
+    def test_separate_functions(self, cache_dir):
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids):
+            return ["f"] * len(ids)
+
+        @batch_cache(cache_dir=cache_dir)
+        def g(ids):
+            return ["g"] * len(ids)
+
+        assert f([1]) == ["f"]
+        assert g([1]) == ["g"]
+
+    def test_batched_writes(self, cache_dir, monkeypatch):
+        budget_passes = []
+        monkeypatch.setattr(
+            "FPL.utils.caching._enforce_budget",
+            lambda *args, **kwargs: budget_passes.append(args),
+        )
+
+        @batch_cache(cache_dir=cache_dir)
+        def f(ids):
+            return list(ids)
+
+        def hits():
+            files = [file for file in os.listdir(cache_dir) if file.endswith(".hits")]
+            return [os.path.getsize(os.path.join(cache_dir, file)) for file in files]
+
+        f(list(range(50)))
+        assert hits() == []
+        # first hit of each entry written straight away, later ones periodically
+        f(list(range(50)))
+        f(list(range(50)))
+        files = os.listdir(cache_dir)
+        assert len(budget_passes) == 1
+        assert [file for file in files if file.endswith(".lock")] == ["f.batch.lock"]
+        assert hits() == [1] * 50
+        flush_hits()
+        assert hits() == [2] * 50
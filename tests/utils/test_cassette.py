@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from FPL.src import get_player_info, get_users, get_users_id
+from FPL.utils import clear_bootstrap, get_current_gw
+from FPL.utils.cassette import Cassette, get_cassette, use_cassette
+from FPL.utils.fetch import FetchError, fetch_request
+
+
+@pytest.fixture
+def recorded(mock_api, tmp_path):
+    """
+    Fixture recording a small report's worth of requests against the mock server, which is then shut down
+    """
+    path = str(tmp_path / "cassette.zip")
+    with use_cassette(path, mode="record") as cassette:
+        gw = get_current_gw()
+        ids = get_users_id(314, top_n=60, refresh=0)
+        users = get_users(ids, gw)
+        players = get_player_info([1, 2], refresh=0)
+    mock_api.stop()
+    clear_bootstrap()
+    n_requests = sum(mock_api.requests.values())
+    return path, len(cassette), n_requests, (gw, ids, users, players)
+
+
+class TestCassette:
+    def test_replay_without_network(self, recorded):
+        path, n_recorded, n_requests, expected = recorded
+        assert n_recorded == n_requests
+        assert get_cassette() is None
+
+        with use_cassette(path, mode="replay"):
+            gw = get_current_gw()
+            ids = get_users_id(314, top_n=60, refresh=0)
+            users = get_users(ids, gw)
+            players = get_player_info([1, 2], refresh=0)
+        assert (gw, ids, users, players) == expected
+
+    def test_cache_bypassed(self, recorded, mock_server, monkeypatch):
+        path, _, _, (gw, ids, users, players) = recorded
+        recorded_url = os.environ["FPL_API_URL"]
+        # nothing from the recording reaches the live cache
+        assert not os.path.isdir(".cache") or not os.listdir(".cache")
+
+        mock_server(data={"seed": 1})
+        live_players = get_player_info([1, 2], refresh=30)
+        live_users = get_users(ids[:5], gw)
+        assert live_users != users[:5]
+        monkeypatch.setenv("FPL_API_URL", recorded_url)
+
+        # replay is served from the cassette, not the live cache
+        with use_cassette(path, mode="replay"):
+            assert get_player_info([1, 2], refresh=30) == players
+            assert get_users(ids[:5], gw) == users[:5]
+        # and leaves the live entries as they were
+        assert get_player_info([1, 2], refresh=30) == live_players
+        assert get_users(ids[:5], gw) == live_users
+
+    def test_replay_missing_url(self, recorded):
+        path = recorded[0]
+        with use_cassette(path, mode="replay"):
+            with pytest.raises(FetchError):
+                fetch_request("http://127.0.0.1:1/api/entry/1/")
+
+    def test_replay_missing_file(self, tmp_path):
+        with pytest.raises(ValueError):
+            Cassette(str(tmp_path / "missing.zip"))
+
+    def test_invalid_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            Cassette(str(tmp_path / "cassette.zip"), mode="rewind")
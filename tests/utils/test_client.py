@@ -0,0 +1,88 @@
+import itertools
+import time
+
+import pytest
+from aiohttp import web
+
+from FPL.utils.client import FPLClient, get_client, set_client
+
+
+@pytest.fixture
+def server_url(local_server):
+    """
+    Fixture serving JSON on every path, records the client port of each request
+    """
+    peers = []
+
+    async def handler(request):
+        peers.append(request.transport.get_extra_info("peername")[1])
+        return web.json_response({"path": request.path})
+
+    return local_server(handler), peers
+
+
+class TestFPLClient:
+    def test_fetch_all_order(self, server_url):
+        url, _ = server_url
+        with FPLClient(max_concurrency=5, rate=None) as client:
+            data = client.fetch_all([f"{url}/{i}" for i in range(20)])
+        assert [d["path"] for d in data] == [f"/{i}" for i in range(20)]
+
+    def test_connections_reused(self, server_url):
+        url, peers = server_url
+        with FPLClient(max_concurrency=2, rate=None) as client:
+            for _ in range(3):
+                client.fetch_all([f"{url}/{i}" for i in range(10)])
+        # 30 requests over at most 2 concurrent keep-alive connections
+        assert len(peers) == 30
+        assert len(set(peers)) <= 2
+
+    def test_close_and_restart(self, server_url):
+        url, _ = server_url
+        client = FPLClient(rate=None)
+        assert client.closed
+        client.fetch(f"{url}/a")
+        assert not client.closed
+        client.close()
+        assert client.closed
+        assert client.fetch(f"{url}/b") == {"path": "/b"}
+        client.close()
+
+    def test_fetch_iter_window(self, server_url):
+        url, peers = server_url
+        with FPLClient(rate=None) as client:
+            urls = (f"{url}/{i}" for i in itertools.count())
+            responses = client.fetch_iter(urls, window=5)
+            paths = [next(responses)["path"] for _ in range(10)]
+            responses.close()
+        assert paths == [f"/{i}" for i in range(10)]
+        # only the window is requested ahead of the consumer
+        assert len(peers) <= 15
+
+    def test_fetch_iter_unordered(self, server_url):
+        url, _ = server_url
+        with FPLClient(rate=None) as client:
+            data = client.fetch_iter([f"{url}/{i}" for i in range(20)], ordered=False)
+            paths = sorted(d["path"] for d in data)
+        assert paths == sorted(f"/{i}" for i in range(20))
+
+    def test_no_rate_limit_by_default(self, server_url):
+        url, _ = server_url
+        with FPLClient() as client:
+            start = time.perf_counter()
+            client.fetch_all([f"{url}/{i}" for i in range(150)])
+            # a 50 req/s cap would take at least 3 seconds
+            assert time.perf_counter() - start < 2
+        assert FPLClient().rate is None
+
+    def test_set_client(self):
+        client = FPLClient()
+        previous = set_client(client)
+        try:
+            assert get_client() is client
+        finally:
+            set_client(previous)
+
+    def test_invalid_concurrency(self):
+        with pytest.raises(ValueError):
+            FPLClient(max_concurrency=0)
@@ -0,0 +1,134 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+from FPL.utils.client import FPLClient
+from FPL.utils.concurrency import CLOSED, HALF_OPEN, OPEN, AdaptiveLimiter
+from FPL.utils.fetch import FetchError
+
+
+def _outcomes(limiter, outcomes):
+    async def run():
+        for throttled in outcomes:
+            await limiter.acquire()
+            await limiter.release(throttled)
+
+    asyncio.run(run())
+
+
+class TestAdaptiveLimiter:
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=4, max_limit=50, failure_threshold=None)
+        _outcomes(limiter, [False] * 4)
+        # one window of `limit` successes raises the limit by roughly one
+        assert 4.9 < limiter.limit < 5.0
+
+    def test_increase_capped(self):
+        limiter = AdaptiveLimiter(initial=5, max_limit=5)
+        _outcomes(limiter, [False] * 20)
+        assert limiter.limit == 5
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter(
+            initial=16, decrease_interval=0, failure_threshold=None
+        )
+        _outcomes(limiter, [True, True])
+        assert limiter.limit == 4
+
+    def test_decrease_interval(self):
+        limiter = AdaptiveLimiter(
+            initial=16, decrease_interval=60, failure_threshold=None
+        )
+        _outcomes(limiter, [True] * 5)
+        # a burst of failures only halves the limit once
+        assert limiter.limit == 8
+
+    def test_decrease_floor(self):
+        limiter = AdaptiveLimiter(initial=4, min_limit=3, decrease_interval=0)
+        _outcomes(limiter, [True] * 3)
+        assert limiter.limit == 3
+
+    def test_neutral_release(self):
+        limiter = AdaptiveLimiter(initial=4)
+        _outcomes(limiter, [None] * 3)
+        assert limiter.limit == 4
+        assert limiter.in_flight == 0
+
+    def test_in_flight_bounded(self):
+        limiter = AdaptiveLimiter(initial=3, max_limit=3)
+        peak = 0
+
+        async def task():
+            nonlocal peak
+            await limiter.acquire()
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+            await limiter.release(None)
+
+        async def run():
+            await asyncio.gather(*[task() for _ in range(12)])
+
+        asyncio.run(run())
+        assert peak == 3
+
+    def test_breaker_opens_and_recovers(self):
+        limiter = AdaptiveLimiter(initial=8, failure_threshold=3, cooldown=0.2)
+        _outcomes(limiter, [True] * 3)
+        assert limiter.state == OPEN
+
+        async def probe():
+            start = time.monotonic()
+            await limiter.acquire()
+            waited = time.monotonic() - start
+            state = limiter.state
+            await limiter.release(False)
+            return waited, state
+
+        waited, state = asyncio.run(probe())
+        assert waited >= 0.15
+        assert state == HALF_OPEN
+        assert limiter.state == CLOSED
+        assert limiter.consecutive_failures == 0
+
+    def test_half_open_failure_reopens(self):
+        limiter = AdaptiveLimiter(failure_threshold=1, cooldown=0.05)
+        _outcomes(limiter, [True])
+        time.sleep(0.06)
+        _outcomes(limiter, [True])
+        assert limiter.state == OPEN
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(min_limit=5, max_limit=2)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(decrease=1.5)
+
+
+class TestClientAdaptive:
+    def test_throttling_reduces_limit(self, local_server):
+        calls = 0
+
+        async def handler(request):
+            nonlocal calls
+            calls += 1
+            if calls % 2:
+                return web.Response(status=429, headers={"Retry-After": "0"})
+            return web.json_response({"path": request.path})
+
+        url = local_server(handler)
+        with FPLClient(max_concurrency=20, rate=None, breaker_threshold=None) as client:
+            data = client.fetch_all([f"{url}/{i}" for i in range(10)])
+            assert [d["path"] for d in data] == [f"/{i}" for i in range(10)]
+            assert client.controller.limit < 10
+
+    def test_fixed_concurrency(self, local_server):
+        async def handler(request):
+            return web.Response(status=503)
+
+        url = local_server(handler)
+        with FPLClient(max_concurrency=4, adaptive=False, rate=None) as client:
+            with pytest.raises(FetchError):
+                client.fetch(f"{url}/a", max_attempts=2)
+            assert client.controller.limit == 4
@@ -1,6 +1,36 @@
+import asyncio
+import time
+
 import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from FPL.utils.fetch import (
+    FetchError,
+    RateLimiter,
+    ValidatorStore,
+    fetch_all_async,
+    fetch_request,
+    fetch_request_async,
+    get_decoder,
+    set_decoder,
+    validator_store,
+)
+
 
-from FPL.utils.fetch import fetch_request, fetch_request_async
+def _run_with_server(handler, coro_fn):
+    """
+    Helper to run `coro_fn(server, session)` against a local aiohttp server serving `handler` on every path
+    """
+
+    async def _main():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        async with TestServer(app) as server:
+            async with ClientSession() as session:
+                return await coro_fn(server, session)
+
+    return asyncio.run(_main())
 
 
 def test_fetch_request():
@@ -9,3 +39,197 @@ def test_fetch_request():
 
 def test_fetch_request_async():
     pass
+
+
+class TestFetchEngine:
+    def test_retry_on_server_error(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request.path)
+            if len(calls) < 3:
+                return web.Response(status=503)
+            return web.json_response({"ok": True})
+
+        async def _fetch(server, session):
+            return await fetch_request_async(
+                str(server.make_url("/x")), session, max_attempts=5, backoff=0.01
+            )
+
+        assert _run_with_server(handler, _fetch) == {"ok": True}
+        assert len(calls) == 3
+
+    def test_retry_on_html_page(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request.path)
+            if len(calls) == 1:
+                return web.Response(
+                    text="<html>updating</html>", content_type="text/html"
+                )
+            return web.json_response({"ok": True})
+
+        async def _fetch(server, session):
+            return await fetch_request_async(
+                str(server.make_url("/x")), session, max_attempts=5, backoff=0.01
+            )
+
+        assert _run_with_server(handler, _fetch) == {"ok": True}
+        assert len(calls) == 2
+
+    def test_retry_on_truncated_body(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request.path)
+            if len(calls) == 1:
+                response = web.StreamResponse(headers={"Content-Length": "100"})
+                response.content_type = "application/json"
+                await response.prepare(request)
+                await response.write(b'{"ok": ')
+                request.transport.close()
+                return response
+            return web.json_response({"ok": True})
+
+        async def _fetch(server, session):
+            return await fetch_request_async(
+                str(server.make_url("/x")), session, max_attempts=5, backoff=0.01
+            )
+
+        assert _run_with_server(handler, _fetch) == {"ok": True}
+        assert len(calls) == 2
+
+    def test_max_attempts(self):
+        async def handler(request):
+            return web.Response(status=429, headers={"Retry-After": "0"})
+
+        async def _fetch(server, session):
+            return await fetch_request_async(
+                str(server.make_url("/x")), session, max_attempts=3, backoff=0.01
+            )
+
+        with pytest.raises(FetchError):
+            _run_with_server(handler, _fetch)
+
+    def test_fetch_all_bounded_concurrency(self):
+        in_flight = {"now": 0, "max": 0}
+
+        async def handler(request):
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+            await asyncio.sleep(0.01)
+            in_flight["now"] -= 1
+            return web.json_response({"path": request.path})
+
+        async def _fetch(server, session):
+            urls = [str(server.make_url(f"/{i}")) for i in range(40)]
+            return await fetch_all_async(urls, session, max_concurrency=4, rate=None)
+
+        data = _run_with_server(handler, _fetch)
+        assert [d["path"] for d in data] == [f"/{i}" for i in range(40)]
+        assert in_flight["max"] <= 4
+
+    def test_rate_limiter(self):
+        async def _acquire():
+            limiter = RateLimiter(rate=100, capacity=1)
+            start = time.monotonic()
+            for _ in range(11):
+                await limiter.acquire()
+            return time.monotonic() - start
+
+        assert asyncio.run(_acquire()) >= 0.09
+
+    def test_rate_limiter_invalid_rate(self):
+        with pytest.raises(ValueError):
+            RateLimiter(rate=0)
+
+
+class TestConditionalRequest:
+    def test_etag_revalidation(self, local_server):
+        calls = []
+
+        async def handler(request):
+            calls.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return web.Response(status=304, headers={"ETag": '"v1"'})
+            return web.json_response({"events": [1, 2]}, headers={"ETag": '"v1"'})
+
+        url = f"{local_server(handler)}/bootstrap"
+        validator_store.clear()
+        assert fetch_request(url) == {"events": [1, 2]}
+        assert fetch_request(url) == {"events": [1, 2]}
+        assert calls == [None, '"v1"']
+
+    def test_last_modified_revalidation(self, local_server):
+        stamp = "Wed, 21 Oct 2026 07:28:00 GMT"
+        calls = []
+
+        async def handler(request):
+            calls.append(request.headers.get("If-Modified-Since"))
+            if request.headers.get("If-Modified-Since") == stamp:
+                return web.Response(status=304)
+            return web.json_response({"id": 1}, headers={"Last-Modified": stamp})
+
+        url = f"{local_server(handler)}/entry"
+        validator_store.clear()
+        fetch_request(url)
+        assert fetch_request(url) == {"id": 1}
+        assert calls == [None, stamp]
+
+    def test_unconditional(self, local_server):
+        calls = []
+
+        async def handler(request):
+            calls.append(request.headers.get("If-None-Match"))
+            return web.json_response({}, headers={"ETag": '"v1"'})
+
+        url = f"{local_server(handler)}/fixtures"
+        validator_store.clear()
+        fetch_request(url, conditional=False)
+        fetch_request(url, conditional=False)
+        assert calls == [None, None]
+        assert len(validator_store) == 0
+
+    def test_validator_store_bounded(self):
+        store = ValidatorStore(max_entries=2)
+        for i in range(3):
+            store.set(f"url{i}", f"etag{i}", None, b"{}")
+        assert len(store) == 2
+        assert store.get("url0") is None
+        assert store.get("url2") == ("etag2", None, b"{}")
+
+
+class TestDecoder:
+    def test_raw_bytes(self):
+        async def handler(request):
+            return web.json_response({"picks": []})
+
+        async def _fetch(server, session):
+            return await fetch_request_async(
+                str(server.make_url("/x")), session, raw=True
+            )
+
+        assert _run_with_server(handler, _fetch) == b'{"picks": []}'
+
+    def test_custom_decoder(self, local_server):
+        async def handler(request):
+            return web.json_response({"picks": [1, 2, 3]})
+
+        url = f"{local_server(handler)}/picks"
+        assert fetch_request(url, decoder=lambda body: len(body)) == len(
+            b'{"picks": [1, 2, 3]}'
+        )
+
+    def test_set_decoder(self, local_server):
+        async def handler(request):
+            return web.json_response({"a": 1})
+
+        url = f"{local_server(handler)}/x"
+        previous = set_decoder(lambda body: "decoded")
+        try:
+            assert get_decoder()(b"") == "decoded"
+            assert fetch_request(url, conditional=False) == "decoded"
+        finally:
+            set_decoder(previous)
+        assert fetch_request(url, conditional=False) == {"a": 1}
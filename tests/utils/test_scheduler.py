@@ -0,0 +1,122 @@
+import asyncio
+from collections import Counter
+
+from aiohttp import web
+
+from FPL.utils._get_api_url import _get_api_url
+from FPL.utils.client import FPLClient
+from FPL.utils.concurrency import AdaptiveLimiter
+from FPL.utils.scheduler import BULK, HIGH, NORMAL, RequestScheduler, default_priority
+
+
+class TestPriority:
+    def test_default_priority(self):
+        assert default_priority(_get_api_url("bootstrap")) == HIGH
+        assert default_priority(_get_api_url("standings", 314, 1)) == NORMAL
+        assert default_priority(_get_api_url("picks", 1, 1)) == BULK
+        assert default_priority(_get_api_url("element", 1)) == BULK
+        assert default_priority("https://example.com/") == NORMAL
+
+    def test_waiters_served_by_priority(self):
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+        order = []
+
+        async def task(name, priority):
+            await limiter.acquire(priority)
+            order.append(name)
+            await asyncio.sleep(0)
+            await limiter.release(None)
+
+        async def run():
+            await limiter.acquire()
+            tasks = [
+                asyncio.create_task(task("bulk-1", BULK)),
+                asyncio.create_task(task("bulk-2", BULK)),
+                asyncio.create_task(task("normal", NORMAL)),
+                asyncio.create_task(task("high", HIGH)),
+            ]
+            await asyncio.sleep(0)
+            await limiter.release(None)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["high", "normal", "bulk-1", "bulk-2"]
+
+    def test_cancelled_waiter(self):
+        limiter = AdaptiveLimiter(initial=1, max_limit=1)
+
+        async def run():
+            await limiter.acquire()
+            cancelled = asyncio.create_task(limiter.acquire(HIGH))
+            waiting = asyncio.create_task(limiter.acquire(BULK))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            await asyncio.sleep(0)
+            await limiter.release(None)
+            await asyncio.wait_for(waiting, 1)
+
+        asyncio.run(run())
+        assert limiter.in_flight == 1
+        assert limiter.waiting == 0
+
+
+class TestDeduplication:
+    def test_identical_urls_fetched_once(self, local_server):
+        hits = Counter()
+
+        async def handler(request):
+            hits[request.path] += 1
+            await asyncio.sleep(0.05)
+            return web.json_response({"path": request.path})
+
+        url = local_server(handler)
+        urls = [f"{url}/{i % 3}" for i in range(12)]
+        with FPLClient(rate=None) as client:
+            data = client.fetch_all(urls)
+            assert client.scheduler.coalesced == 9
+            assert client.scheduler.pending == 0
+
+        assert [d["path"] for d in data] == [f"/{i % 3}" for i in range(12)]
+        assert hits == {"/0": 1, "/1": 1, "/2": 1}
+        # each caller gets its own decoded copy
+        assert data[0] is not data[3]
+
+    def test_finished_urls_refetched(self, local_server):
+        hits = Counter()
+
+        async def handler(request):
+            hits[request.path] += 1
+            return web.json_response({"path": request.path})
+
+        url = local_server(handler)
+        with FPLClient(rate=None) as client:
+            client.fetch(f"{url}/a")
+            client.fetch(f"{url}/a")
+        assert hits["/a"] == 2
+
+    def test_abandoned_request_cancelled(self):
+        scheduler = RequestScheduler()
+        started, cancelled = asyncio.Event(), asyncio.Event()
+
+        async def fetch(priority):
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        async def run():
+            first = asyncio.create_task(scheduler.submit("a", fetch))
+            second = asyncio.create_task(scheduler.submit("a", fetch))
+            await started.wait()
+            first.cancel()
+            await asyncio.sleep(0)
+            # still wanted by the second caller
+            assert not cancelled.is_set()
+            second.cancel()
+            await asyncio.wait_for(cancelled.wait(), 1)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+        assert scheduler.pending == 0
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientSession, web
+
+from FPL.src import get_users
+from FPL.utils._get_api_url import _get_api_url
+from FPL.utils.concurrency import AdaptiveLimiter
+from FPL.utils.fetch import fetch_request, fetch_request_async
+from FPL.utils.telemetry import FetchTelemetry, endpoint_class, get_telemetry
+
+
+class TestEndpointClass:
+    @pytest.mark.parametrize(
+        "kwargs, expected",
+        [
+            ({"key": "bootstrap"}, "bootstrap"),
+            ({"key": "fixtures"}, "fixtures"),
+            ({"key": "element", "id": 1}, "element"),
+            ({"key": "entry", "id": 1}, "entry"),
+            ({"key": "history", "id": 1}, "history"),
+            ({"key": "transfers", "id": 1}, "transfers"),
+            ({"key": "picks", "id": 1, "gameweek": 2}, "picks"),
+            ({"key": "standings", "id": 314, "page": 3}, "standings"),
+            ({"key": "gameweek", "gameweek": 2}, "gameweek"),
+        ],
+    )
+    def test_endpoint_class(self, kwargs, expected):
+        assert endpoint_class(_get_api_url(**kwargs)) == expected
+
+    def test_unknown(self):
+        assert endpoint_class("https://example.com/") == "other"
+
+
+class TestFetchTelemetry:
+    def test_finish(self):
+        telemetry = FetchTelemetry()
+        for latency in [0.01, 0.2, 3.0]:
+            endpoint = telemetry.start(_get_api_url("picks", 1, 1))
+            telemetry.finish(endpoint, latency, n_bytes=100, retries=1)
+        summary = telemetry.summary("picks")
+        assert summary["requests"] == 3
+        assert summary["retries"] == 3
+        assert summary["bytes"] == 300
+        assert summary["in_flight"] == 0
+        assert summary["p50"] == pytest.approx(0.2)
+
+        text = telemetry.to_prometheus()
+        assert 'fpl_fetch_requests_total{endpoint="picks"} 3' in text
+        assert 'fpl_fetch_latency_seconds_bucket{endpoint="picks",le="0.05"} 1' in text
+        assert 'fpl_fetch_latency_seconds_bucket{endpoint="picks",le="+Inf"} 3' in text
+
+    @pytest.mark.parametrize(
+        "mock_api", [{"data": {"league_size": 50}, "error_rate": 0.3}], indirect=True
+    )
+    def test_fetch_records(self, mock_api, mock_server):
+        telemetry = get_telemetry()
+        telemetry.reset()
+        get_users(list(range(1, 31)), 2, max_attempts=30, refresh=0)
+        mock_server(data={"league_size": 50})
+        fetch_request(_get_api_url("bootstrap"))
+        fetch_request(_get_api_url("bootstrap"))
+
+        picks = telemetry.summary("picks")
+        assert picks["requests"] == 30
+        assert picks["retries"] == mock_api.requests["picks"] - 30
+        assert picks["bytes"] > 0
+        bootstrap = telemetry.summary("bootstrap")
+        assert bootstrap["requests"] == 2
+        assert bootstrap["cache_hits"] == 1
+
+    @pytest.mark.parametrize(
+        "mock_api", [{"data": {"league_size": 50}, "latency": 0.05}], indirect=True
+    )
+    def test_queue_wait_not_in_flight(self, mock_api):
+        telemetry = get_telemetry()
+        telemetry.reset()
+        controller = AdaptiveLimiter(initial=2, min_limit=2, max_limit=2)
+
+        async def _fetch_all():
+            async with ClientSession() as session:
+                urls = [_get_api_url("picks", id, 2) for id in range(1, 21)]
+                await asyncio.gather(
+                    *[
+                        fetch_request_async(url, session, controller=controller)
+                        for url in urls
+                    ]
+                )
+
+        asyncio.run(_fetch_all())
+
+        picks = telemetry.summary("picks")
+        assert picks["requests"] == 20
+        assert picks["max_in_flight"] <= 2
+        assert picks["in_flight"] == 0
+        # ten rounds of two requests, the queue is not latency
+        assert picks["p90"] < 0.3
+        assert picks["mean_queue_wait"] > 0.1
+        assert "fpl_fetch_queue_wait_seconds_total" in telemetry.to_prometheus()
+
+    def test_cancelled_retries(self, local_server):
+        telemetry = get_telemetry()
+        telemetry.reset()
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return web.json_response({})
+
+        url = f"{local_server(handler)}/api/entry/1/"
+
+        async def _fetch():
+            async with ClientSession() as session:
+                with pytest.raises(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        fetch_request_async(url, session, max_attempts=10), 0.1
+                    )
+
+        asyncio.run(_fetch())
+        entry = telemetry.summary("entry")
+        assert entry["requests"] == 1
+        # cancelled during the first attempt
+        assert entry["retries"] == 0
+        assert entry["in_flight"] == 0
@@ -0,0 +1,132 @@
+import os
+
+import pandas as pd
+import pytest
+
+from FPL.utils import bootstrap
+from FPL.utils.bootstrap import BootstrapSnapshot, clear_bootstrap
+from FPL.utils.caching import dir_cache, get_memory_cache
+from FPL.utils.ttl import GameweekTTL
+
+NOW = pd.Timestamp("2024-01-10T12:00:00Z")
+
+
+@pytest.fixture
+def snapshot():
+    data = {
+        "elements": [{"id": 1, "first_name": "A", "second_name": "B", "team": 1}],
+        "teams": [{"id": 1, "name": "Arsenal"}],
+        "events": [
+            # checked, finished without checked data, being played and upcoming
+            {
+                "id": 1,
+                "deadline_time": "2023-12-20T11:00:00Z",
+                "finished": True,
+                "data_checked": True,
+            },
+            {
+                "id": 2,
+                "deadline_time": "2023-12-27T11:00:00Z",
+                "finished": True,
+                "data_checked": False,
+            },
+            {
+                "id": 3,
+                "deadline_time": "2024-01-09T11:00:00Z",
+                "finished": False,
+                "data_checked": False,
+            },
+            {
+                "id": 4,
+                "deadline_time": "2024-01-20T11:00:00Z",
+                "finished": False,
+                "data_checked": False,
+            },
+        ],
+    }
+    return BootstrapSnapshot(data)
+
+
+@pytest.fixture
+def events(snapshot):
+    return snapshot.events
+
+
+class TestGameweekTTL:
+    def test_gameweek_phases(self, events):
+        policy = GameweekTTL(live=5, checking=30, idle=360)
+        assert policy.gameweek_ttl(1, events, NOW) is None
+        assert policy.gameweek_ttl(2, events, NOW) == 30
+        assert policy.gameweek_ttl(3, events, NOW) == 5
+        # upcoming gameweek is kept until its deadline at most
+        assert policy.gameweek_ttl(4, events, NOW) == 360
+        assert (
+            policy.gameweek_ttl(4, events, pd.Timestamp("2024-01-20T10:00:00Z")) == 60
+        )
+        assert policy.gameweek_ttl(99, events, NOW) == 360
+
+    def test_calendar_phases(self, events):
+        policy = GameweekTTL(live=5, checking=30, idle=360, deadline_window=120)
+        # gameweek 3 in progress
+        assert policy.calendar_ttl(events, NOW) == 5
+
+        events.loc[events["id"] == 3, ["finished"]] = True
+        assert policy.calendar_ttl(events, NOW) == 30
+
+        events.loc[events["id"] == 3, ["data_checked"]] = True
+        assert policy.calendar_ttl(events, NOW) == 360
+        # idle time stops at the start of the deadline window
+        assert policy.calendar_ttl(events, pd.Timestamp("2024-01-20T06:00:00Z")) == 180
+        assert policy.calendar_ttl(events, pd.Timestamp("2024-01-20T10:00:00Z")) == 5
+
+    def test_call_uses_argument(self, snapshot, monkeypatch):
+        monkeypatch.setattr(bootstrap, "_snapshot", snapshot)
+        monkeypatch.setattr(bootstrap, "_snapshot_cassette", None)
+        policy = GameweekTTL(gameweek="gw")
+        assert policy({"gw": 1}, now=NOW) is None
+        assert policy({"gw": 3}, now=NOW) == policy.live
+        assert policy({"gw": None}, now=NOW) == policy.live
+        clear_bootstrap()
+
+
+class TestExpiryPolicy:
+    def test_policy_ttl(self, tmp_path):
+        cache_dir = str(tmp_path / "cache")
+        calls = []
+
+        def policy(arguments):
+            # finished gameweeks kept forever, others not at all
+            return None if arguments["gw"] < 3 else 0
+
+        @dir_cache(refresh=policy, cache_dir=cache_dir)
+        def f(gw):
+            calls.append(gw)
+            return gw
+
+        for _ in range(2):
+            assert f(1) == 1
+            assert f(3) == 3
+        assert calls == [1, 3, 3]
+
+        # kept forever on disk too
+        get_memory_cache().clear()
+        f(1)
+        assert calls == [1, 3, 3]
+
+    def test_fixed_refresh_entry_not_reused_by_policy(self, tmp_path):
+        cache_dir = str(tmp_path / "cache")
+        calls = []
+
+        def g(refresh):
+            @dir_cache(refresh=refresh, cache_dir=cache_dir, memory=False)
+            def f():
+                calls.append(1)
+                return 1
+
+            return f()
+
+        g(60)
+        g(lambda arguments: None)
+        g(lambda arguments: None)
+        assert len(calls) == 2
+        assert len([f for f in os.listdir(cache_dir) if f.endswith(".pkl")]) == 1
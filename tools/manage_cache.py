@@ -0,0 +1,88 @@
+"""
+Command line housekeeping of `dir_cache` folders
+"""
+
+import argparse
+
+import pandas as pd
+
+from FPL.utils.cache_manager import cache_size, compact, list_entries, prune
+from FPL.utils.caching import clear_dir_cache
+
+LIST_COLUMNS = ["name", "function", "format", "size", "age", "hits", "last_access"]
+
+
+def _size(n: int) -> str:
+    for unit in ["B", "KB", "MB"]:
+        if n < 1000:
+            return f"{n:.0f}{unit}"
+        n /= 1000
+    return f"{n:.1f}GB"
+
+
+def _print_entries(entries: pd.DataFrame) -> None:
+    if entries.empty:
+        print("no entries")
+        return
+    table = entries[LIST_COLUMNS].copy()
+    table["size"] = table["size"].map(_size)
+    table["age"] = table["age"].round(1)
+    print(table.to_string(index=False))
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect and prune dir_cache folders")
+    parser.add_argument("--cache-dir", type=str, default="./.cache")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="list entries, most recently used first")
+
+    prune_parser = commands.add_parser("prune", help="remove entries")
+    prune_parser.add_argument("--max-bytes", type=int, default=None)
+    prune_parser.add_argument(
+        "--max-age", type=float, default=None, help="minutes since entry was created"
+    )
+    prune_parser.add_argument("--policy", choices=["lru", "lfu"], default="lru")
+    prune_parser.add_argument(
+        "--keep-expired",
+        action="store_true",
+        help="keep entries whose expiry policy ttl has passed",
+    )
+    prune_parser.add_argument("--dry-run", action="store_true")
+
+    compact_parser = commands.add_parser(
+        "compact", help="remove files that belong to no entry"
+    )
+    compact_parser.add_argument(
+        "--tmp-age", type=float, default=60, help="minutes before temporary files go"
+    )
+
+    commands.add_parser("clear", help="remove every file, without prompting")
+    arg = parser.parse_args(argv)
+
+    if arg.command == "list":
+        _print_entries(list_entries(arg.cache_dir))
+        print(f"total {_size(cache_size(arg.cache_dir))}")
+    elif arg.command == "prune":
+        removed = prune(
+            arg.cache_dir,
+            max_bytes=arg.max_bytes,
+            max_age=arg.max_age,
+            expired=not arg.keep_expired,
+            policy=arg.policy,
+            dry_run=arg.dry_run,
+        )
+        _print_entries(removed)
+        verb = "would remove" if arg.dry_run else "removed"
+        print(f"{verb} {len(removed)} entries ({_size(removed['size'].sum())})")
+    elif arg.command == "compact":
+        removed = compact(arg.cache_dir, tmp_age=arg.tmp_age)
+        for path in removed:
+            print(path)
+        print(f"removed {len(removed)} files")
+    elif arg.command == "clear":
+        clear_dir_cache(arg.cache_dir, confirm=False)
+
+
+if __name__ == "__main__":
+    main()
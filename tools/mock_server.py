@@ -0,0 +1,703 @@
+"""
+Local stand-in for the FPL API serving synthetic (or recorded) data, for offline load testing
+
+Example
+-------
+    python -m tools.mock_server --port 8000 --league-size 100000 --latency 0.05 --error-rate 0.01 --throttle 500
+
+    FPL_API_URL=http://127.0.0.1:8000/api python main.py
+
+Every endpoint known to `_get_api_url` is served. Synthetic data is deterministic for a given seed, so a
+manager's squad, transfers and chips are the same on every request and consistent between endpoints.
+"""
+
+import argparse
+import asyncio
+import datetime
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+OVERALL_LEAGUE_ID = 314
+# custom league ids, all non-custom leagues have ids below 320
+CUSTOM_LEAGUE_OFFSET = 1_000
+PAGE_SIZE = 50
+
+# number of players of each element type in a squad, and how many of those start
+SQUAD_SHAPE = {1: 2, 2: 5, 3: 5, 4: 3}
+STARTERS = {1: 1, 2: 4, 3: 4, 4: 2}
+CHIPS = ["wildcard", "freehit", "bboost", "3xc"]
+ELEMENT_TYPES = {1: "GKP", 2: "DEF", 3: "MID", 4: "FWD"}
+
+HTML_ERROR_PAGE = "<html><body>The game is being updated.</body></html>"
+
+
+class MockFPLData:
+    """
+    Deterministic synthetic FPL season
+
+    Parameters
+    ----------
+    `league_size (int)`: number of managers in the overall league, manager ids run from 1 to `league_size`, default=10000
+
+    `n_players (int)`: number of premier league players, default=700
+
+    `n_teams (int)`: number of premier league teams, default=20
+
+    `current_gw (int)`: most recent gameweek whose deadline has passed, default=10
+
+    `custom_league_size (int)`: number of managers in each custom league, default=20
+
+    `seed (int)`: seed of synthetic data, default=0
+
+    """
+
+    def __init__(
+        self,
+        league_size: int = 10_000,
+        n_players: int = 700,
+        n_teams: int = 20,
+        current_gw: int = 10,
+        custom_league_size: int = 20,
+        seed: int = 0,
+    ):
+        if not 1 <= current_gw <= 38:
+            raise ValueError(
+                f"current_gw must be between 1 and 38. Current Value: {current_gw}"
+            )
+
+        self.league_size = league_size
+        self.n_players = n_players
+        self.n_teams = n_teams
+        self.current_gw = current_gw
+        self.custom_league_size = custom_league_size
+        self.seed = seed
+
+        rng = self._rng("players")
+        self.players: List[Dict] = []
+        self.by_position: Dict[int, List[int]] = {pos: [] for pos in SQUAD_SHAPE}
+        for id in range(1, n_players + 1):
+            # keep the squad shape ratio so every position has enough players
+            element_type = [1, 2, 2, 3, 3, 3, 4][id % 7]
+            self.by_position[element_type].append(id)
+            self.players.append(
+                {
+                    "id": id,
+                    "first_name": f"Player{id}",
+                    "second_name": f"Surname{id}",
+                    "web_name": f"Surname{id}",
+                    "team": (id % n_teams) + 1,
+                    "element_type": element_type,
+                    "now_cost": rng.randint(40, 130),
+                    "form": f"{rng.uniform(0, 10):.1f}",
+                    "points_per_game": f"{rng.uniform(0, 8):.1f}",
+                    "total_points": rng.randint(0, 150),
+                    "event_points": rng.randint(0, 15),
+                    "value_form": f"{rng.uniform(0, 2):.1f}",
+                    "selected_by_percent": f"{rng.uniform(0, 60):.1f}",
+                    "transfers_in_event": rng.randint(0, 500_000),
+                    "transfers_out_event": rng.randint(0, 500_000),
+                    "yellow_cards": rng.randint(0, 6),
+                    "red_cards": rng.randint(0, 1),
+                    "goals_scored": rng.randint(0, 15),
+                    "assists": rng.randint(0, 10),
+                    "saves": rng.randint(0, 60) if element_type == 1 else 0,
+                    "saves_per_90": round(rng.uniform(0, 4), 2),
+                    "clean_sheets": rng.randint(0, 10),
+                    "clean_sheets_per_90": round(rng.uniform(0, 0.5), 2),
+                    "expected_goals": f"{rng.uniform(0, 12):.2f}",
+                    "expected_goals_per_90": round(rng.uniform(0, 1), 2),
+                }
+            )
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        self.events = []
+        for gw in range(1, 39):
+            deadline = now + datetime.timedelta(days=7 * (gw - current_gw) - 1)
+            self.events.append(
+                {
+                    "id": gw,
+                    "name": f"Gameweek {gw}",
+                    "deadline_time": deadline.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    "finished": gw < current_gw,
+                    "data_checked": gw < current_gw,
+                    "is_previous": gw == current_gw - 1,
+                    "is_current": gw == current_gw,
+                    "is_next": gw == current_gw + 1,
+                }
+            )
+
+    def _rng(self, *key) -> random.Random:
+        """
+        Method to get a random generator seeded from `key`, so every derived value is reproducible
+        """
+        return random.Random("-".join(str(k) for k in (self.seed,) + key))
+
+    def bootstrap(self) -> Dict:
+        return {
+            "events": self.events,
+            "game_settings": {},
+            "phases": [],
+            "teams": [
+                {"id": id, "name": f"Team {id}", "short_name": f"T{id:02d}"}
+                for id in range(1, self.n_teams + 1)
+            ],
+            "total_players": self.league_size,
+            "elements": self.players,
+            "element_stats": [],
+            "element_types": [
+                {"id": id, "plural_name_short": name, "singular_name_short": name}
+                for id, name in ELEMENT_TYPES.items()
+            ],
+        }
+
+    def fixtures(self) -> List[Dict]:
+        fixtures = []
+        teams = list(range(1, self.n_teams + 1))
+        for gw in range(1, 39):
+            rng = self._rng("fixtures", gw)
+            rng.shuffle(teams)
+            for home, away in zip(teams[::2], teams[1::2]):
+                fixtures.append(
+                    {
+                        "id": len(fixtures) + 1,
+                        "event": gw,
+                        "team_h": home,
+                        "team_a": away,
+                        "team_h_difficulty": rng.randint(2, 5),
+                        "team_a_difficulty": rng.randint(2, 5),
+                        "finished": gw < self.current_gw,
+                        "kickoff_time": self.events[gw - 1]["deadline_time"],
+                    }
+                )
+        return fixtures
+
+    def element_summary(self, id: int) -> Optional[Dict]:
+        if not 1 <= id <= self.n_players:
+            return None
+        player = self.players[id - 1]
+        history = []
+        for gw in range(1, self.current_gw + 1):
+            rng = self._rng("element", id, gw)
+            transfers_in, transfers_out = rng.randint(0, 50_000), rng.randint(0, 50_000)
+            expected_goals, expected_assists = rng.uniform(0, 1), rng.uniform(0, 0.6)
+            history.append(
+                {
+                    "element": id,
+                    "fixture": gw,
+                    "round": gw,
+                    "total_points": rng.randint(0, 15),
+                    "minutes": rng.choice([0, 45, 90]),
+                    "value": player["now_cost"],
+                    "selected": rng.randint(0, 5_000_000),
+                    "transfers_in": transfers_in,
+                    "transfers_out": transfers_out,
+                    "transfers_balance": transfers_in - transfers_out,
+                    "expected_goals": f"{expected_goals:.2f}",
+                    "expected_assists": f"{expected_assists:.2f}",
+                    "expected_goal_involvements": f"{expected_goals + expected_assists:.2f}",
+                    "expected_goals_conceded": f"{rng.uniform(0, 3):.2f}",
+                    "was_home": rng.random() < 0.5,
+                }
+            )
+        fixtures = [
+            {
+                "id": gw * 100 + player["team"],
+                "event": gw,
+                "difficulty": self._rng("difficulty", id, gw).randint(2, 5),
+                "is_home": (gw + player["team"]) % 2 == 0,
+            }
+            for gw in range(self.current_gw + 1, 39)
+        ]
+        return {"fixtures": fixtures, "history": history, "history_past": []}
+
+    def live(self, gameweek: int) -> Dict:
+        elements = []
+        for player in self.players:
+            rng = self._rng("element", player["id"], gameweek)
+            elements.append(
+                {
+                    "id": player["id"],
+                    "stats": {
+                        "total_points": rng.randint(0, 15),
+                        "minutes": rng.choice([0, 45, 90]),
+                    },
+                    "explain": [],
+                }
+            )
+        return {"elements": elements}
+
+    def _season(self, entry: int, gameweek: int) -> Tuple[Dict, List, Dict]:
+        """
+        Method to replay a manager's season up to `gameweek`
+
+        Return
+        ------
+        `Tuple[Dict, List, Dict]`: squad by element type, transfers made and chips played by gameweek
+
+        """
+        rng = self._rng("squad", entry)
+        squad = {
+            pos: rng.sample(self.by_position[pos], n) for pos, n in SQUAD_SHAPE.items()
+        }
+        transfers, chips = [], {}
+        for gw in range(2, gameweek + 1):
+            rng = self._rng("gw", entry, gw)
+            n_transfers = rng.choices([0, 1, 2], weights=[0.5, 0.35, 0.15])[0]
+            chips_left = [chip for chip in CHIPS if chip not in chips.values()]
+            if chips_left and rng.random() < 0.04:
+                chip = rng.choice(chips_left)
+                chips[gw] = chip
+                if chip in ("wildcard", "freehit"):
+                    n_transfers = rng.randint(4, 8)
+            for _ in range(n_transfers):
+                pos = rng.choice(list(SQUAD_SHAPE))
+                out = rng.choice(squad[pos])
+                element_in = rng.choice(
+                    [id for id in self.by_position[pos] if id not in squad[pos]]
+                )
+                squad[pos][squad[pos].index(out)] = element_in
+                transfers.append(
+                    {
+                        "element_in": element_in,
+                        "element_in_cost": self.players[element_in - 1]["now_cost"],
+                        "element_out": out,
+                        "element_out_cost": self.players[out - 1]["now_cost"],
+                        "entry": entry,
+                        "event": gw,
+                        "time": self.events[gw - 1]["deadline_time"],
+                    }
+                )
+        return squad, transfers, chips
+
+    def _points(self, entry: int, gameweek: int) -> int:
+        return self._rng("points", entry, gameweek).randint(20, 100)
+
+    def _valid_entry(self, entry: int) -> bool:
+        return 1 <= entry <= self.league_size
+
+    def _total_points(self, entry: int) -> int:
+        return sum(self._points(entry, gw) for gw in range(1, self.current_gw + 1))
+
+    def _custom_league(self, entry: int) -> int:
+        return CUSTOM_LEAGUE_OFFSET + (entry - 1) // self.custom_league_size
+
+    def picks(self, entry: int, gameweek: int) -> Optional[Dict]:
+        if not self._valid_entry(entry) or gameweek > self.current_gw:
+            return None
+        squad, transfers, chips = self._season(entry, gameweek)
+        chip = chips.get(gameweek)
+        rng = self._rng("captain", entry, gameweek)
+
+        starters = [id for pos in SQUAD_SHAPE for id in squad[pos][: STARTERS[pos]]]
+        bench = [id for pos in SQUAD_SHAPE for id in squad[pos][STARTERS[pos] :]]
+        captain, vice = rng.sample(starters[1:], 2)
+
+        picks = []
+        for position, element in enumerate(starters + bench, start=1):
+            multiplier = 1 if position <= 11 or chip == "bboost" else 0
+            if element == captain:
+                multiplier = 3 if chip == "3xc" else 2
+            picks.append(
+                {
+                    "element": element,
+                    "position": position,
+                    "multiplier": multiplier,
+                    "is_captain": element == captain,
+                    "is_vice_captain": element == vice,
+                    "element_type": self.players[element - 1]["element_type"],
+                }
+            )
+
+        event_transfers = sum(1 for t in transfers if t["event"] == gameweek)
+        return {
+            "active_chip": chip,
+            "automatic_subs": [],
+            "entry_history": self._history_row(entry, gameweek, event_transfers, chip),
+            "picks": picks,
+        }
+
+    def _history_row(
+        self, entry: int, gameweek: int, event_transfers: int, chip: Optional[str]
+    ) -> Dict:
+        free = chip in ("wildcard", "freehit")
+        return {
+            "event": gameweek,
+            "points": self._points(entry, gameweek),
+            "total_points": sum(
+                self._points(entry, gw) for gw in range(1, gameweek + 1)
+            ),
+            "rank": entry,
+            "overall_rank": entry,
+            "bank": 0,
+            "value": 1000,
+            "event_transfers": event_transfers,
+            "event_transfers_cost": 0 if free else max(0, event_transfers - 1) * 4,
+            "points_on_bench": self._rng("bench", entry, gameweek).randint(0, 20),
+        }
+
+    def history(self, entry: int) -> Optional[Dict]:
+        if not self._valid_entry(entry):
+            return None
+        _, transfers, chips = self._season(entry, self.current_gw)
+        per_gw = Counter(t["event"] for t in transfers)
+        return {
+            "current": [
+                self._history_row(entry, gw, per_gw[gw], chips.get(gw))
+                for gw in range(1, self.current_gw + 1)
+            ],
+            "past": [],
+            "chips": [
+                {
+                    "name": chip,
+                    "time": self.events[gw - 1]["deadline_time"],
+                    "event": gw,
+                }
+                for gw, chip in sorted(chips.items())
+            ],
+        }
+
+    def transfers(self, entry: int) -> Optional[List[Dict]]:
+        if not self._valid_entry(entry):
+            return None
+        return self._season(entry, self.current_gw)[1][::-1]
+
+    def entry(self, entry: int) -> Optional[Dict]:
+        if not self._valid_entry(entry):
+            return None
+        _, transfers, _ = self._season(entry, self.current_gw)
+        custom_id = self._custom_league(entry)
+        return {
+            "id": entry,
+            "player_first_name": "Manager",
+            "player_last_name": str(entry),
+            "name": f"Team {entry}",
+            "current_event": self.current_gw,
+            "summary_overall_points": self._total_points(entry),
+            "summary_overall_rank": entry,
+            "last_deadline_total_transfers": len(transfers),
+            "leagues": {
+                "classic": [
+                    {"id": OVERALL_LEAGUE_ID, "name": "Overall", "entry_rank": entry},
+                    {
+                        "id": custom_id,
+                        "name": f"Mock League {custom_id}",
+                        "entry_rank": None,
+                    },
+                ],
+                "h2h": [],
+            },
+        }
+
+    def standings(self, league_id: int, page: int) -> Optional[Dict]:
+        if league_id == OVERALL_LEAGUE_ID:
+            name = "Overall"
+            start = (page - 1) * PAGE_SIZE + 1
+            members = range(max(start, 1), min(start + PAGE_SIZE, self.league_size + 1))
+            # overall league is ranked by manager id
+            ranked = [(start + i, entry) for i, entry in enumerate(members)]
+            size = self.league_size
+        elif league_id >= CUSTOM_LEAGUE_OFFSET:
+            k = league_id - CUSTOM_LEAGUE_OFFSET
+            first = k * self.custom_league_size + 1
+            entries = range(
+                first, min(first + self.custom_league_size, self.league_size + 1)
+            )
+            if not entries:
+                return None
+            name = f"Mock League {league_id}"
+            totals = sorted(entries, key=self._total_points, reverse=True)
+            start = (page - 1) * PAGE_SIZE + 1
+            ranked = [
+                (rank, entry)
+                for rank, entry in enumerate(totals, start=1)
+                if start <= rank < start + PAGE_SIZE
+            ]
+            size = len(entries)
+        else:
+            return None
+
+        results = [
+            {
+                "id": entry,
+                "event_total": self._points(entry, self.current_gw),
+                "player_name": f"Manager {entry}",
+                "rank": rank,
+                "last_rank": rank,
+                "rank_sort": rank,
+                "total": self._total_points(entry),
+                "entry": entry,
+                "entry_name": f"Team {entry}",
+            }
+            for rank, entry in ranked
+        ]
+        return {
+            "league": {"id": league_id, "name": name},
+            "new_entries": {"has_next": False, "page": 1, "results": []},
+            "standings": {
+                "has_next": page < 1 or page * PAGE_SIZE < size,
+                "page": page,
+                "results": results,
+            },
+        }
+
+
+def _endpoint(request: web.Request) -> str:
+    """
+    Function to get the endpoint class (bootstrap/picks/standings/...) of a request
+    """
+    route = request.match_info.route
+    return route.name or "unknown"
+
+
+def _json_response(request: web.Request, payload) -> web.Response:
+    """
+    Function to serialise payload with an ETag, replying 304 when the client already has it
+    """
+    if payload is None:
+        return web.json_response({"detail": "Not found."}, status=404)
+    body = json.dumps(payload).encode()
+    etag = f'"{hashlib.md5(body).hexdigest()}"'
+    if request.headers.get("If-None-Match") == etag:
+        return web.Response(status=304, headers={"ETag": etag})
+    return web.Response(
+        body=body, content_type="application/json", headers={"ETag": etag}
+    )
+
+
+def create_app(
+    data: Optional[MockFPLData] = None,
+    latency: float = 0.0,
+    error_rate: float = 0.0,
+    throttle: Optional[float] = None,
+    data_dir: Optional[str] = None,
+    seed: int = 0,
+    requests: Optional[Counter] = None,
+) -> web.Application:
+    """
+    Function to create the mock FPL API application
+
+    Parameters
+    ----------
+    `data (MockFPLData)`: synthetic season to serve, if None then uses `MockFPLData()`
+
+    `latency (float)`: mean latency (seconds) added to each response, actual latency is uniform between 0.5x and 1.5x, default=0
+
+    `error_rate (float)`: fraction of requests answered with a 503 or an html error page, default=0
+
+    `throttle (float)`: requests per second served before replying 429 with a Retry-After header, no throttling if None, default=None
+
+    `data_dir (str)`: folder of recorded responses, `<data_dir>/<path>.json` is served in place of synthetic data when it exists, with standings pages stored as `<path>_page<P>.json`, default=None
+
+    `seed (int)`: seed of latency and error sampling, default=0
+
+    `requests (Counter)`: counter incremented with the endpoint class of every request received, default=None
+
+    Return
+    ------
+    `web.Application`: application with every endpoint under `/api/`
+
+    """
+    if data is None:
+        data = MockFPLData()
+
+    rng = random.Random(seed)
+    bucket = {"tokens": throttle, "updated": time.monotonic()}
+
+    @web.middleware
+    async def _middleware(request: web.Request, handler):
+        if requests is not None:
+            requests[_endpoint(request)] += 1
+
+        if throttle is not None:
+            now = time.monotonic()
+            bucket["tokens"] = min(
+                throttle, bucket["tokens"] + (now - bucket["updated"]) * throttle
+            )
+            bucket["updated"] = now
+            if bucket["tokens"] < 1:
+                return web.Response(status=429, headers={"Retry-After": "1"})
+            bucket["tokens"] -= 1
+
+        if latency > 0:
+            await asyncio.sleep(latency * rng.uniform(0.5, 1.5))
+
+        if error_rate > 0 and rng.random() < error_rate:
+            if rng.random() < 0.5:
+                return web.Response(status=503)
+            return web.Response(text=HTML_ERROR_PAGE, content_type="text/html")
+
+        if data_dir is not None:
+            path = request.path[len("/api/") :].strip("/")
+            if "page_standings" in request.query:
+                path = f"{path}_page{request.query['page_standings']}"
+            recorded = os.path.join(data_dir, f"{path}.json")
+            if os.path.exists(recorded):
+                with open(recorded, "rb") as f:
+                    return web.Response(body=f.read(), content_type="application/json")
+
+        return await handler(request)
+
+    def _int(request: web.Request, key: str) -> int:
+        try:
+            return int(request.match_info[key])
+        except ValueError as err:
+            raise web.HTTPNotFound() from err
+
+    async def _bootstrap(request):
+        return _json_response(request, data.bootstrap())
+
+    async def _fixtures(request):
+        return _json_response(request, data.fixtures())
+
+    async def _element(request):
+        return _json_response(request, data.element_summary(_int(request, "id")))
+
+    async def _entry(request):
+        return _json_response(request, data.entry(_int(request, "id")))
+
+    async def _history(request):
+        return _json_response(request, data.history(_int(request, "id")))
+
+    async def _transfers(request):
+        return _json_response(request, data.transfers(_int(request, "id")))
+
+    async def _picks(request):
+        return _json_response(
+            request, data.picks(_int(request, "id"), _int(request, "gw"))
+        )
+
+    async def _standings(request):
+        try:
+            page = int(request.query.get("page_standings", 1))
+        except ValueError as err:
+            raise web.HTTPNotFound() from err
+        return _json_response(request, data.standings(_int(request, "id"), page))
+
+    async def _live(request):
+        return _json_response(request, data.live(_int(request, "gw")))
+
+    app = web.Application(middlewares=[_middleware])
+    app.router.add_get("/api/bootstrap-static/", _bootstrap, name="bootstrap")
+    app.router.add_get("/api/fixtures/", _fixtures, name="fixtures")
+    app.router.add_get("/api/element-summary/{id}/", _element, name="element")
+    app.router.add_get("/api/entry/{id}/", _entry, name="entry")
+    app.router.add_get("/api/entry/{id}/history/", _history, name="history")
+    app.router.add_get("/api/entry/{id}/transfers/", _transfers, name="transfers")
+    app.router.add_get("/api/entry/{id}/event/{gw}/picks/", _picks, name="picks")
+    app.router.add_get(
+        "/api/leagues-classic/{id}/standings/", _standings, name="standings"
+    )
+    app.router.add_get("/api/event/{gw}/live/", _live, name="gameweek")
+    return app
+
+
+class MockFPLServer:
+    """
+    Mock FPL API running on a background thread, use as a context manager
+
+    Parameters
+    ----------
+    `host (str)`: host to bind, default="127.0.0.1"
+
+    `port (int)`: port to bind, 0 picks a free port, default=0
+
+    `**kwargs`: keyword arguments passed to `create_app`
+
+    The `requests` attribute counts the requests received for each endpoint class.
+
+    Example
+    -------
+        with MockFPLServer(data=MockFPLData(league_size=1000), latency=0.01) as server:
+            os.environ["FPL_API_URL"] = server.url
+
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **kwargs):
+        self.host = host
+        self.port = port
+        self.requests: Counter = Counter()
+        self.app = create_app(requests=self.requests, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        """`str`: base url of the api, to be used as `FPL_API_URL`"""
+        return f"http://{self.host}:{self.port}/api"
+
+    def start(self) -> "MockFPLServer":
+        self._loop = asyncio.new_event_loop()
+        self._runner = web.AppRunner(self.app)
+        self._loop.run_until_complete(self._runner.setup())
+        site = web.TCPSite(self._runner, self.host, self.port)
+        self._loop.run_until_complete(site.start())
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = self._thread = self._runner = None
+
+    def __enter__(self) -> "MockFPLServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the FPL API for offline load testing"
+    )
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--league-size", type=int, default=10_000)
+    parser.add_argument("--custom-league-size", type=int, default=20)
+    parser.add_argument("--players", type=int, default=700)
+    parser.add_argument("--gameweek", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument(
+        "--throttle", type=float, default=None, help="requests per second before 429"
+    )
+    parser.add_argument("--data-dir", type=str, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    arg = parser.parse_args()
+
+    mock_data = MockFPLData(
+        league_size=arg.league_size,
+        custom_league_size=arg.custom_league_size,
+        n_players=arg.players,
+        current_gw=arg.gameweek,
+        seed=arg.seed,
+    )
+    print(f"Serving mock FPL API on http://{arg.host}:{arg.port}/api")
+    web.run_app(
+        create_app(
+            mock_data,
+            latency=arg.latency,
+            error_rate=arg.error_rate,
+            throttle=arg.throttle,
+            data_dir=arg.data_dir,
+            seed=arg.seed,
+        ),
+        host=arg.host,
+        port=arg.port,
+        print=None,
+    )